@@ -0,0 +1,98 @@
+# Measures allocation in interpreterv4: a loop doing integer and boolean arithmetic
+# (allocation churn) and a deep recursion that keeps many Values alive at once (peak
+# size). For each engine it prints how many Values the run allocated, how many that is
+# per loop iteration or call, and the peak memory tracemalloc traced. To compare with
+# the interpreter before a change, point --project at the proj4 of another checkout:
+#
+#   git worktree add /tmp/before <commit>
+#   python benchmarks/bench_alloc.py --project /tmp/before/proj4
+#   python benchmarks/bench_alloc.py
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+PROGRAMS = {
+    "loop": """
+func main() {
+  i = 0;
+  evens = 0;
+  while (i < 5000) {
+    if (i - (i / 2) * 2 == 0 && !(i < 0)) { evens = evens + 1; }
+    i = i + 1;
+  }
+  print(evens);
+}
+""",
+    "deep": """
+func down(n, a, b, c) {
+  if (n == 0) { return 0; }
+  x = n * 2;
+  y = x > 100;
+  return down(n - 1, a + 1, b, !c) + 1;
+}
+func main() { print(down(300, 0, 1, true)); }
+""",
+}
+# loop iterations or calls of down() each program makes
+STEPS = {"loop": 5000, "deep": 301}
+
+
+def timed_run(interpreter_class, program, engine):
+    interpreter = interpreter_class(console_output=False, engine=engine)
+    start = time.perf_counter()
+    interpreter.run(program)
+    return time.perf_counter() - start
+
+
+# the number of Values a run allocated: every one goes through Value.__init__, which
+# the profile hook sees called
+def count_values(interpreter_class, value_class, program, engine):
+    init_code = value_class.__init__.__code__
+    count = 0
+
+    def profile(frame, event, arg):
+        nonlocal count
+        if event == "call" and frame.f_code is init_code:
+            count += 1
+
+    sys.setprofile(profile)
+    try:
+        timed_run(interpreter_class, program, engine)
+    finally:
+        sys.setprofile(None)
+    return count
+
+
+def measure(interpreter_class, value_class, program, engine):
+    values = count_values(interpreter_class, value_class, program, engine)
+    tracemalloc.start()
+    timed_run(interpreter_class, program, engine)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return values, peak
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument(
+        "--project", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "proj4")
+    )
+    args = arg_parser.parse_args()
+    sys.path.insert(0, os.path.abspath(args.project))
+    sys.setrecursionlimit(100000)
+    from interpreterv4 import Interpreter
+    from type_valuev3 import Value
+
+    for name, program in PROGRAMS.items():
+        for engine in sorted(Interpreter.ENGINES):
+            values, peak = measure(Interpreter, Value, program, engine)
+            print(
+                f"{name:6} {engine:8} {values:8d} Values  {values / STEPS[name]:6.2f} per step  "
+                f"peak {peak / 1024:7.1f} KiB"
+            )
+
+
+if __name__ == "__main__":
+    main()
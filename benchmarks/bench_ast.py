@@ -0,0 +1,100 @@
+# Measures the parsed AST of a large generated Brewin program: how many nodes it has,
+# how much memory they hold once parsing is done (and at the peak while parsing), how
+# long parsing takes, and how long Element.get() takes for a present and a missing field.
+#
+#   python benchmarks/bench_ast.py [--project proj4] [--funcs 400]
+import argparse
+import gc
+import os
+import sys
+import time
+import timeit
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+
+
+# funcs functions of a dozen statements each, mixing every kind of expression the
+# grammar allows in proj2 onward
+def generate_program(funcs):
+    lines = []
+    for i in range(funcs):
+        lines.append(f"func f{i}(a, b) {{")
+        lines.append("  x = a + b * 2 - (a / 3);")
+        lines.append('  s = "name" + "suffix";')
+        lines.append("  ok = !(x < 10) && (b >= 4 || a != 7);")
+        lines.append("  n = nil;")
+        lines.append("  while (x > 0) {")
+        lines.append("    x = x - 1;")
+        lines.append("    if (x == 5) { print(x, s); } else { y = -x; }")
+        lines.append("  }")
+        lines.append(f"  return f{i}(x, b);")
+        lines.append("}")
+    lines.append("func main() {")
+    lines.append("  print(f0(1, 2));")
+    lines.append("}")
+    return "\n".join(lines) + "\n"
+
+
+def count_nodes(ast, element_class):
+    count = 0
+    pending = [ast]
+    while pending:
+        node = pending.pop()
+        count += 1
+        for key in ("functions", "args", "statements", "else_statements", "expression",
+                    "condition", "op1", "op2"):
+            value = node.get(key)
+            if isinstance(value, element_class):
+                pending.append(value)
+            elif isinstance(value, list):
+                pending.extend(item for item in value if isinstance(item, element_class))
+    return count
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--project", default="proj4")
+    arg_parser.add_argument("--funcs", type=int, default=400)
+    args = arg_parser.parse_args()
+
+    os.chdir(os.path.join(REPO_DIR, args.project))
+    sys.path.insert(0, os.getcwd())
+    from brewparse import parse_program
+    from element import Element
+
+    program = generate_program(args.funcs)
+    parse_program(program)  # warm up PLY
+
+    best = None
+    for _ in range(3):
+        start = time.perf_counter()
+        parse_program(program)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    gc.collect()
+    tracemalloc.start()
+    ast = parse_program(program)
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    nodes = count_nodes(ast, Element)
+    statement = ast.get("functions")[0].get("statements")[0]
+    number = 1000000
+    present = min(timeit.repeat(lambda: statement.get("name"), number=number, repeat=5))
+    missing = min(timeit.repeat(lambda: statement.get("else_statements"), number=number, repeat=5))
+    baseline = min(timeit.repeat(lambda: statement, number=number, repeat=5))
+
+    print(f"program      {len(program)} bytes, {nodes} nodes")
+    print(f"parse time   {best * 1000:.1f} ms")
+    print(f"AST memory   {retained / 1024:.0f} KiB retained ({retained / nodes:.0f} B/node), "
+          f"{peak / 1024:.0f} KiB peak while parsing")
+    print(f"get() field  {(present - baseline) / number * 1e9:.1f} ns")
+    print(f"get() absent {(missing - baseline) / number * 1e9:.1f} ns")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+# Micro-benchmark of Brewin function call overhead in interpreterv4: recursive
+# fib and ackermann, which are almost nothing but calls, argument passing and
+# returns. Prints the best wall time of a few runs for each engine.
+#
+#   python benchmarks/bench_calls.py [--repeat N]
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "proj4"))
+sys.setrecursionlimit(100000)
+
+from interpreterv4 import Interpreter  # noqa: E402
+
+PROGRAMS = {
+    "fib(20)": """
+func fib(n) {
+  if (n < 2) { return n; }
+  return fib(n - 1) + fib(n - 2);
+}
+func main() { print(fib(20)); }
+""",
+    "ackermann(2, 100)": """
+func ack(m, n) {
+  if (m == 0) { return n + 1; }
+  if (n == 0) { return ack(m - 1, 1); }
+  return ack(m - 1, ack(m, n - 1));
+}
+func main() { print(ack(2, 100)); }
+""",
+}
+
+
+def best_time(program, engine, repeat):
+    best = None
+    for _ in range(repeat):
+        interpreter = Interpreter(console_output=False, engine=engine)
+        start = time.perf_counter()
+        interpreter.run(program)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    args = arg_parser.parse_args()
+    for name, program in PROGRAMS.items():
+        for engine in sorted(Interpreter.ENGINES):
+            print(f"{name:20} {engine:8} {best_time(program, engine, args.repeat):8.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+# Checks that every engine of interpreterv3 (tree, closure) and interpreterv4 (tree, vm,
+# closure) gives the same get_output() log as the tree walker on the same programs,
+# and fails the same way when the program has an error. The programs are those in
+# benchmarks/corpus that the interpreter can run, and the ones in
+# benchmarks/engine_corpus/<project>, which cover errors, input, lambdas, references,
+# objects and scoping quirks. Programs that ask for input get 3, then 4, then nothing.
+# A program there with a .out file next to it must also give the output in it, with the
+# error, if any, on a last line starting "error: ", which catches bugs every engine
+# shares. Prints the total time each engine took over the programs. Exits with status 1
+# if any engine's output or error differs from the tree walker's or from the .out file.
+#
+#   python benchmarks/bench_engines.py [--projects proj3 proj4]
+import argparse
+import glob
+import importlib
+import os
+import sys
+import time
+
+from harness import CORPUS
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+INTERPRETERS = {"proj3": ("interpreterv3", 3), "proj4": ("interpreterv4", 4)}
+INPUT = ["3", "4"]
+
+
+def programs_for(project, version):
+    paths = [
+        os.path.join(BENCH_DIR, "corpus", name + ".br")
+        for name, (first_version, _) in sorted(CORPUS.items())
+        if first_version <= version
+    ]
+    paths += sorted(glob.glob(os.path.join(BENCH_DIR, "engine_corpus", project, "*.br")))
+    programs = []
+    for path in paths:
+        with open(path) as program_file:
+            programs.append((os.path.basename(path), program_file.read(), expected_for(path)))
+    return programs
+
+
+# the output and error in the .out file for a program, or None if it has none
+def expected_for(path):
+    out_path = os.path.splitext(path)[0] + ".out"
+    if not os.path.exists(out_path):
+        return None
+    with open(out_path) as out_file:
+        lines = out_file.read().splitlines()
+    if lines and lines[-1].startswith("error: "):
+        return lines[:-1], lines[-1][len("error: "):]
+    return lines, None
+
+
+# the output log and the error message (or None), and how long the run took
+def run(interpreter_class, engine, program):
+    interpreter = interpreter_class(console_output=False, inp=list(INPUT), engine=engine)
+    start = time.perf_counter()
+    try:
+        interpreter.run(program)
+        error = None
+    except Exception as e:  # interpreter errors are plain Exceptions
+        error = f"{type(e).__name__}: {e}"
+    return (interpreter.get_output(), error), time.perf_counter() - start
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--projects", nargs="+", default=sorted(INTERPRETERS))
+    args = arg_parser.parse_args()
+    sys.setrecursionlimit(100000)
+
+    mismatches = 0
+    for project in args.projects:
+        module, version = INTERPRETERS[project]
+        project_dir = os.path.join(REPO_DIR, project)
+        sys.path.insert(0, project_dir)
+        interpreter_class = importlib.import_module(module).Interpreter
+        engines = ["tree"] + sorted(interpreter_class.ENGINES - {"tree"})
+        programs = programs_for(project, version)
+        totals = dict.fromkeys(engines, 0.0)
+        for name, program, recorded in programs:
+            expected, elapsed = run(interpreter_class, "tree", program)
+            totals["tree"] += elapsed
+            if recorded is not None and expected != recorded:
+                mismatches += 1
+                print(f"MISMATCH {project} tree {name}:")
+                print(f"  .out:    {recorded}")
+                print(f"  tree:    {expected}")
+            for engine in engines[1:]:
+                actual, elapsed = run(interpreter_class, engine, program)
+                totals[engine] += elapsed
+                if actual != expected:
+                    mismatches += 1
+                    print(f"MISMATCH {project} {engine} {name}:")
+                    print(f"  tree:    {expected}")
+                    print(f"  {engine + ':':8} {actual}")
+        times = "  ".join(f"{engine} {totals[engine]:6.3f} s" for engine in engines)
+        print(f"{project} {len(programs)} programs  {times}")
+        # every project has its own modules under the same names
+        sys.path.pop(0)
+        for name, loaded in list(sys.modules.items()):
+            if os.path.dirname(getattr(loaded, "__file__", None) or "") == project_dir:
+                del sys.modules[name]
+    print(f"{mismatches} outputs differ from the tree walker's or the .out file")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+# Runs a guard-heavy program in interpreterv2 through interpreterv4 with and without
+# short_circuit: a loop whose if and while conditions put a cheap test in front of a call
+# that is only worth making when the test passes, the way code written for short-circuit
+# languages does. With short_circuit the call is skipped whenever the guard decides the
+# result. Prints the time for each project and engine in both modes, and checks that
+# both modes print the same thing.
+#
+# It also checks that interpreterv4s in different modes can share one brewcache.ASTCache:
+# programs whose result depends on short_circuit (and on whether constants are folded
+# under it) are run by every engine, short_circuit and optimize setting in turn through
+# the same cache, and each must print, or fail with, what an interpreter of the same
+# mode that parsed the program itself does. Exits with status 1 if any of them differs.
+#
+#   python benchmarks/bench_guard.py [--iterations 2000] [--repeat 3] [--projects proj2 proj3 proj4]
+import argparse
+import importlib
+import os
+import sys
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INTERPRETERS = {"proj2": "interpreterv2", "proj3": "interpreterv3", "proj4": "interpreterv4"}
+
+# the guards are false (for &&) or true (for ||) three times out of four; interpreterv2
+# only accepts bools on either side of && and ||
+PROGRAM = """
+func expensive(n) {
+  k = 0;
+  while (k < 20) { k = k + 1; }
+  return n + k;
+}
+func main() {
+  i = 0;
+  hits = 0;
+  phase = 0;
+  while (i < ITERATIONS) {
+    cheap = phase == 0;
+    if (cheap && expensive(i) > 20) { hits = hits + 1; }
+    if (!cheap || expensive(i) < 0) { hits = hits + 1; }
+    phase = phase + 1;
+    if (phase == 4) { phase = 0; }
+    i = i + 1;
+  }
+  print(hits);
+}
+"""
+
+
+def best_run(interpreter_class, kwargs, program, repeat):
+    best = None
+    for _ in range(repeat):
+        interpreter = interpreter_class(console_output=False, **kwargs)
+        start = time.perf_counter()
+        interpreter.run(program)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return " ".join(interpreter.get_output()), best
+
+
+# constant and variable operands, so both the folded and the evaluated paths are checked
+MODE_PROGRAMS = [
+    'func main() { print(false && "x"); }',
+    'func main() { print(true || 1 / 0); }',
+    'func main() { print(true && "x"); }',
+    'func main() { a = false; print(a && "x"); print(!a || nil); }',
+    'func main() { if (false && "x") { print(1); } else { print(2); } }',
+    'func main() { x = 1 + 2; while (x > 0 && (false || x < 5)) { x = x - 1; } print(x); }',
+]
+
+
+def run_output(interpreter_class, kwargs, program):
+    interpreter = interpreter_class(console_output=False, **kwargs)
+    try:
+        interpreter.run(program)
+    except Exception as e:  # interpreter errors are plain Exceptions
+        return interpreter.get_output(), str(e)
+    return interpreter.get_output(), None
+
+
+def check_shared_cache(project_dir):
+    from brewcache import ASTCache
+    from interpreterv4 import Interpreter
+
+    modes = [
+        {"engine": engine, "short_circuit": short_circuit, "optimize": optimize}
+        for engine in sorted(Interpreter.ENGINES)
+        for short_circuit in (False, True)
+        for optimize in (True, False)
+    ]
+    mismatches = 0
+    for program in MODE_PROGRAMS:
+        expected = [run_output(Interpreter, mode, program) for mode in modes]
+        # each mode goes first in one of the orders
+        for first in range(len(modes)):
+            cache = ASTCache()
+            for i in list(range(first, len(modes))) + list(range(first)):
+                actual = run_output(Interpreter, dict(modes[i], ast_cache=cache), program)
+                if actual != expected[i]:
+                    mismatches += 1
+                    if mismatches <= 5:
+                        print(f"SHARED CACHE MISMATCH {modes[i]} after {modes[first]}: "
+                              f"{program!r}: {actual} != {expected[i]}")
+    print(f"proj4 shared ASTCache: {len(MODE_PROGRAMS)} programs x {len(modes)} modes, "
+          f"{mismatches} differ")
+    return mismatches
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--iterations", type=int, default=2000)
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    arg_parser.add_argument("--projects", nargs="+", default=sorted(INTERPRETERS))
+    args = arg_parser.parse_args()
+    program = PROGRAM.replace("ITERATIONS", str(args.iterations))
+
+    mismatches = 0
+
+    for project in args.projects:
+        project_dir = os.path.join(REPO_DIR, project)
+        sys.path.insert(0, project_dir)
+        interpreter_class = importlib.import_module(INTERPRETERS[project]).Interpreter
+        # interpreterv2 has a single engine and no engine argument
+        for engine in sorted(getattr(interpreter_class, "ENGINES", [None])):
+            kwargs = {} if engine is None else {"engine": engine}
+            full_output, full = best_run(interpreter_class, kwargs, program, args.repeat)
+            kwargs["short_circuit"] = True
+            short_output, short = best_run(interpreter_class, kwargs, program, args.repeat)
+            line = (f"{project} {engine or 'tree':8} full {full:7.3f} s  "
+                    f"short-circuit {short:7.3f} s  {full / short:5.2f}x")
+            if short_output != full_output:
+                line += f"  OUTPUT DIFFERS: {full_output!r} vs {short_output!r}"
+            print(line)
+        if project == "proj4":
+            mismatches += check_shared_cache(project_dir)
+        # every project has its own modules under the same names
+        sys.path.pop(0)
+        for name, module in list(sys.modules.items()):
+            if os.path.dirname(getattr(module, "__file__", None) or "") == project_dir:
+                del sys.modules[name]
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+# Checks that brewscan's hand-written lexer produces the same tokens as the PLY lexer in
+# brewlex, then compares their speed. The check runs over every program in
+# benchmarks/corpus, a set of edge cases (comments, unterminated strings, illegal
+# characters, keywords used as prefixes...) and a large generated program, and compares
+# each token's type, value, line and position, and anything printed along the way. The
+# timings are for lexing the generated program alone and for parsing it with each lexer.
+#
+#   python benchmarks/bench_lexer.py [--project proj4] [--funcs 2000] [--repeat 3]
+import argparse
+import contextlib
+import glob
+import io
+import os
+import sys
+import time
+
+from bench_ast import generate_program
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+
+EDGE_CASES = [
+    "",
+    "func main() { print(1); }",
+    "func main(){x=1;y=x>=2<=3==4!=5&&!true||false;}\n",
+    "func main() {\n  /* a comment\n over lines */ x = 10 / 2 * 3;\n}\n",
+    "func main() { x = 1 /* unterminated comment\n y = 2; }",
+    'func main() { s = "unterminated; print(s); }',
+    'func main() { s = "a" + "" + "b c"; }\n\n\n',
+    "func main() { x = 1 $ 2 # 3; }",
+    "func main() {\r\n\tx = 1;\r\n}\r\n",
+    "funcx iff elsewhere whiler returning truex nil_ lambda2 refs FUNC If",
+    "func main() { o = @; o.x = 5; o.f = lambda(ref a) { return a; }; o.f(o.x); }",
+    "123abc 0 007 x1_2 _y",
+    "===!==>=<=<>!!&&&|||",
+    "\n\n\n",
+]
+
+
+def ply_tokens(brewlex, program):
+    lexer = brewlex.lex.lexer.clone()
+    lexer.lineno = 1
+    lexer.input(program)
+    return list(iter(lexer.token, None))
+
+
+def scan_tokens(brewscan, program):
+    lexer = brewscan.Lexer()
+    lexer.input(program)
+    return list(iter(lexer.token, None))
+
+
+def fields(tokens):
+    return [(tok.type, tok.value, tok.lineno, tok.lexpos) for tok in tokens]
+
+
+def lex_with_output(lex, *args):
+    printed = io.StringIO()
+    with contextlib.redirect_stdout(printed):
+        tokens = lex(*args)
+    return fields(tokens), printed.getvalue()
+
+
+def best_time(function, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--project", default="proj4")
+    arg_parser.add_argument("--funcs", type=int, default=2000)
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    args = arg_parser.parse_args()
+
+    os.chdir(os.path.join(REPO_DIR, args.project))
+    sys.path.insert(0, os.getcwd())
+    import brewlex
+    import brewparse
+    import brewscan
+
+    big_program = generate_program(args.funcs)
+    programs = {f"edge case {i}": program for i, program in enumerate(EDGE_CASES)}
+    for path in sorted(glob.glob(os.path.join(BENCH_DIR, "corpus", "*.br"))):
+        with open(path) as program_file:
+            programs[os.path.basename(path)] = program_file.read()
+    programs["generated"] = big_program
+
+    mismatches = 0
+    for name, program in programs.items():
+        expected = lex_with_output(ply_tokens, brewlex, program)
+        actual = lex_with_output(scan_tokens, brewscan, program)
+        if actual != expected:
+            mismatches += 1
+            print(f"MISMATCH in {name}")
+            for ply_token, scan_token in zip(expected[0], actual[0]):
+                if ply_token != scan_token:
+                    print(f"  first difference: PLY {ply_token}, brewscan {scan_token}")
+                    break
+            if expected[1] != actual[1]:
+                print(f"  PLY printed {expected[1]!r}, brewscan printed {actual[1]!r}")
+    print(f"{len(programs)} programs, {mismatches} with different tokens")
+
+    megabytes = len(big_program.encode()) / 1e6
+    timings = {
+        "PLY lex": lambda: ply_tokens(brewlex, big_program),
+        "brewscan lex": lambda: scan_tokens(brewscan, big_program),
+        "PLY lex + parse": lambda: brewparse.parser.parse(
+            big_program, lexer=brewlex.lex.lexer.clone()
+        ),
+        "brewscan lex + parse": lambda: brewparse.parser.parse(
+            big_program, lexer=brewscan.Lexer()
+        ),
+    }
+    print(f"generated program: {megabytes:.2f} MB")
+    for name, function in timings.items():
+        elapsed = best_time(function, args.repeat)
+        print(f"{name:22} {elapsed * 1000:8.1f} ms  {megabytes / elapsed:6.2f} MB/s")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
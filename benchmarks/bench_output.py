@@ -0,0 +1,79 @@
+# Runs a print-heavy program in interpreterv4 with each way of handling its output:
+# printing every line and keeping it in output_log (the default), and the StreamSink,
+# RingSink and DiscardSink output sinks. Output that would reach the console goes to
+# os.devnull. Prints the run time, the number of write calls that reached the stream
+# and the peak memory traced while running for each.
+#
+#   python benchmarks/bench_output.py [--lines 100000] [--flush-lines 1024] [--engine tree]
+import argparse
+import contextlib
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "proj4"))
+
+from interpreterv4 import Interpreter  # noqa: E402
+from intbase import DiscardSink, RingSink, StreamSink  # noqa: E402
+
+PROGRAM = """
+func main() {
+  i = 0;
+  while (i < LINES) {
+    print("line ", i);
+    i = i + 1;
+  }
+}
+"""
+
+
+# a stream that throws its text away and counts how often it's written to
+class CountingStream:
+    def __init__(self):
+        self.devnull = open(os.devnull, "w")
+        self.writes = 0
+
+    def write(self, text):
+        self.writes += 1
+        return self.devnull.write(text)
+
+    def flush(self):
+        self.devnull.flush()
+
+
+def measure(program, engine, make_sink):
+    stream = CountingStream()
+    sink = make_sink(stream)
+    interpreter = Interpreter(console_output=sink is None, engine=engine, output_sink=sink)
+    tracemalloc.start()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(stream):
+        interpreter.run(program)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, stream.writes, peak
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--lines", type=int, default=100000)
+    arg_parser.add_argument("--flush-lines", type=int, default=1024)
+    arg_parser.add_argument("--engine", default="tree", choices=sorted(Interpreter.ENGINES))
+    args = arg_parser.parse_args()
+
+    program = PROGRAM.replace("LINES", str(args.lines))
+    sinks = {
+        "print": lambda stream: None,
+        "StreamSink": lambda stream: StreamSink(stream, args.flush_lines),
+        "RingSink": lambda stream: RingSink(100),
+        "DiscardSink": lambda stream: DiscardSink(),
+    }
+    for name, make_sink in sinks.items():
+        elapsed, writes, peak = measure(program, args.engine, make_sink)
+        print(f"{name:12} {elapsed:7.3f} s  {writes:8} writes  {peak / 1024:9.0f} KiB peak")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+# Checks that parse_program(program, backend="pratt") gives the same result as the PLY
+# backend, then compares their parsing throughput. The differential corpus is the
+# programs in benchmarks/corpus, bench_lexer's edge cases, a list of precedence and
+# error-recovery cases below, and (from a fixed seed, so every run checks the same
+# programs) randomly generated valid programs plus copies of them with tokens deleted,
+# inserted, swapped or duplicated. For each program both backends must build the same
+# tree, node class by node class and field by field, or both raise SyntaxError, and
+# both must print the same thing. Exits with status 1 if any program differs.
+#
+#   python benchmarks/bench_parse.py [--project proj4] [--cases 3000] [--funcs 2000]
+import argparse
+import contextlib
+import glob
+import io
+import os
+import random
+import sys
+import time
+
+from bench_ast import generate_program
+from bench_lexer import EDGE_CASES
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+
+CASES = [
+    "func main() { x = 1 + 2 * 3 - 4 / 5; }",
+    "func main() { x = a || b && c == d < e + f * g; }",
+    "func main() { x = a * b + c < d == e && f || g; }",
+    "func main() { x = -a * -b - - c; y = !a == !b; z = !!a && -(-b); }",
+    "func main() { x = a < b < c; y = a - b - c; z = a / b / c; }",
+    "func main() { x = ((a)); (f(1)); (o.x); }",
+    "func main() { o.x = o.y; o.f(o.x, p.g(), -1); f(g(h(1)), (2)); }",
+    "func main() { x = lambda(a, ref b) { return a + b; }; y = lambda() { return; }; }",
+    "func main() { if (x) { y = 1; } else { if (y) { z = 2; } } while (!x) { x = true; } }",
+    "func f(ref a, b) { return; } func main() { return nil; return @; return \"s\"; }",
+    "func main() { (x) = 1; }",
+    "func main() { o.x.y = 1; }",
+    "func main() { f()(); }",
+    "func main() { x = ; } func g() { y = 1; }",
+    "func main() { x = 1 } func g() { y = 1; } func h() { z = 1; }",
+    "func main() { x = 1; ; func g() { y = 1; }",
+    "} } func main() { print(1); }",
+    "func main() { print(1); } }",
+    "func main() { print(1); } func",
+    "func main() { if (x) { } }",
+    "func main() { x = 1; } else { y = 2; } func g() { a = 1; }",
+    "func f() { return 1 2; } func g() { x = 1 $ 2; } func h() { y = 1; }",
+]
+
+# token texts for building and mutating programs
+NAMES = ["a", "b", "x", "o", "f", "print", "main"]
+VOCAB = NAMES + [
+    "func", "if", "else", "while", "return", "true", "false", "nil", "lambda", "ref",
+    "(", ")", "{", "}", ",", ".", "@", ";", "==", "!=", ">=", ">", "<=", "<", "=", "+",
+    "-", "*", "/", "&&", "||", "!", "1", "23", '"s"', '"', "$", "/* c */",
+]
+BINARY_OPERATORS = ["+", "-", "*", "/", "==", "!=", "<", "<=", ">", ">=", "&&", "||"]
+
+
+def generate_expression(rng, depth):
+    choice = rng.randrange(14 if depth > 0 else 7)
+    if choice == 0:
+        return [str(rng.randrange(100))]
+    if choice == 1:
+        return ['"' + rng.choice(["", "s", "a b"]) + '"']
+    if choice == 2:
+        return [rng.choice(["true", "false", "nil", "@"])]
+    if choice in (3, 4, 5):
+        return [rng.choice(NAMES)]
+    if choice == 6:
+        return [rng.choice(NAMES), ".", rng.choice(NAMES)]
+    if choice in (7, 8, 9):
+        return (generate_expression(rng, depth - 1) + [rng.choice(BINARY_OPERATORS)]
+                + generate_expression(rng, depth - 1))
+    if choice == 10:
+        return [rng.choice(["-", "!"])] + generate_expression(rng, depth - 1)
+    if choice == 11:
+        return ["("] + generate_expression(rng, depth - 1) + [")"]
+    if choice == 12:
+        callee = [rng.choice(NAMES)] if rng.random() < 0.5 else [rng.choice(NAMES), ".", "m"]
+        args = []
+        for i in range(rng.randrange(3)):
+            args += ([","] if i else []) + generate_expression(rng, depth - 1)
+        return callee + ["("] + args + [")"]
+    return (["lambda"] + generate_formal_args(rng) + ["{"]
+            + generate_statements(rng, depth - 1) + ["}"])
+
+
+def generate_formal_args(rng):
+    tokens = ["("]
+    for i in range(rng.randrange(3)):
+        tokens += ([","] if i else []) + (["ref"] if rng.random() < 0.3 else []) + [rng.choice(NAMES)]
+    return tokens + [")"]
+
+
+def generate_statements(rng, depth):
+    tokens = []
+    for _ in range(rng.randrange(1, 4)):
+        tokens += generate_statement(rng, depth)
+    return tokens
+
+
+def generate_statement(rng, depth):
+    choice = rng.randrange(7 if depth > 0 else 4)
+    if choice == 0:
+        target = [rng.choice(NAMES)] if rng.random() < 0.6 else [rng.choice(NAMES), ".", "y"]
+        return target + ["="] + generate_expression(rng, depth) + [";"]
+    if choice == 1:
+        return generate_expression(rng, depth) + [";"]
+    if choice == 2:
+        return ["return"] + generate_expression(rng, depth) + [";"]
+    if choice == 3:
+        return ["return", ";"]
+    block = ["{"] + generate_statements(rng, depth - 1) + ["}"]
+    condition = ["("] + generate_expression(rng, depth - 1) + [")"]
+    if choice == 4:
+        return ["while"] + condition + block
+    if choice == 5:
+        return ["if"] + condition + block
+    return ["if"] + condition + block + ["else", "{"] + generate_statements(rng, depth - 1) + ["}"]
+
+
+def generate_tokens(rng):
+    tokens = []
+    for _ in range(rng.randrange(1, 4)):
+        tokens += (["func", rng.choice(NAMES)] + generate_formal_args(rng) + ["{"]
+                   + generate_statements(rng, 3) + ["}"])
+    return tokens
+
+
+def mutate(rng, tokens):
+    tokens = list(tokens)
+    for _ in range(rng.randrange(1, 4)):
+        position = rng.randrange(len(tokens) + 1)
+        mutation = rng.randrange(4)
+        if mutation == 0 and position < len(tokens):
+            del tokens[position]
+        elif mutation == 1:
+            tokens.insert(position, rng.choice(VOCAB))
+        elif mutation == 2 and position + 1 < len(tokens):
+            tokens[position], tokens[position + 1] = tokens[position + 1], tokens[position]
+        elif position < len(tokens):
+            tokens.insert(position, tokens[position])
+    return tokens
+
+
+def generate_corpus(rng, cases):
+    programs = []
+    for _ in range(cases):
+        tokens = generate_tokens(rng)
+        programs.append(" ".join(tokens))
+        programs.append(" ".join(mutate(rng, tokens)))
+    return programs
+
+
+# the tree or the exception, and what was printed
+def parse_result(parse_program, program, backend):
+    printed = io.StringIO()
+    with contextlib.redirect_stdout(printed):
+        try:
+            result = parse_program(program, backend=backend)
+        except SyntaxError as e:
+            result = e
+    return result, printed.getvalue()
+
+
+def same_tree(a, b, element_class):
+    if isinstance(a, element_class):
+        return type(a) is type(b) and a.elem_type == b.elem_type and all(
+            same_tree(getattr(a, field), getattr(b, field), element_class)
+            for field in a.fields
+        )
+    if isinstance(a, list):
+        return (isinstance(b, list) and len(a) == len(b)
+                and all(same_tree(x, y, element_class) for x, y in zip(a, b)))
+    if isinstance(a, Exception):
+        return type(a) is type(b) and str(a) == str(b)
+    return type(a) is type(b) and a == b
+
+
+def best_time(function, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--project", default="proj4")
+    arg_parser.add_argument("--cases", type=int, default=3000)
+    arg_parser.add_argument("--seed", type=int, default=0)
+    arg_parser.add_argument("--funcs", type=int, default=2000)
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    args = arg_parser.parse_args()
+
+    os.chdir(os.path.join(REPO_DIR, args.project))
+    sys.path.insert(0, os.getcwd())
+    sys.setrecursionlimit(100000)
+    from brewparse import parse_program
+    from element import Element
+
+    programs = CASES + EDGE_CASES
+    for path in sorted(glob.glob(os.path.join(BENCH_DIR, "corpus", "*.br"))):
+        with open(path) as program_file:
+            programs.append(program_file.read())
+    programs += generate_corpus(random.Random(args.seed), args.cases)
+
+    mismatches = rejected = 0
+    for program in programs:
+        expected = parse_result(parse_program, program, "ply")
+        actual = parse_result(parse_program, program, "pratt")
+        rejected += isinstance(expected[0], SyntaxError)
+        if not same_tree(expected[0], actual[0], Element) or expected[1] != actual[1]:
+            mismatches += 1
+            if mismatches <= 5:
+                print(f"MISMATCH: {program!r}")
+                print(f"  ply:   {expected[0]} {expected[1]!r}")
+                print(f"  pratt: {actual[0]} {actual[1]!r}")
+    print(f"{len(programs)} programs ({rejected} with syntax errors), {mismatches} parsed differently")
+
+    big_program = generate_program(args.funcs)
+    megabytes = len(big_program.encode()) / 1e6
+    print(f"generated program: {megabytes:.2f} MB")
+    for backend in ("ply", "pratt"):
+        elapsed = best_time(lambda: parse_program(big_program, backend=backend), args.repeat)
+        print(f"{backend:12} {elapsed * 1000:8.1f} ms  {megabytes / elapsed:6.2f} MB/s")
+    # both backends read their tokens from brewscan, so this much of each is lexing
+    from brewscan import Lexer
+
+    def lex():
+        lexer = Lexer()
+        lexer.input(big_program)
+        for _ in lexer:
+            pass
+
+    elapsed = best_time(lex, args.repeat)
+    print(f"{'(lexing)':12} {elapsed * 1000:8.1f} ms  {megabytes / elapsed:6.2f} MB/s")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+# Parses a batch of programs with brewparse.parse_many on a thread pool and on a process
+# pool, checks that every AST matches what parse_program builds for the same program on
+# its own, and compares the time each takes with parsing them one after another. As a
+# control it also parses the batch from several threads through the module's single
+# PLY parser and PLY's global lexer, which is what parse_program did before each thread
+# had a BrewinParser of its own, and counts the ASTs that come out wrong. Threads switch
+# as often as Python allows while checking, so that parses really do overlap. Exits
+# with status 1 if parse_many gets any AST wrong.
+#
+#   python benchmarks/bench_parse_many.py [--project proj4] [--programs 200] [--workers 4]
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from bench_ast import generate_program
+from bench_parse import generate_tokens, same_tree
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+
+
+# valid programs of a range of sizes, from a fixed seed
+def generate_batch(rng, count):
+    programs = []
+    for i in range(count):
+        if i % 4 == 0:
+            programs.append(generate_program(rng.randrange(20, 200)))
+        else:
+            programs.append(" ".join(generate_tokens(rng)))
+    return programs
+
+
+def count_wrong(expected, actual, element_class):
+    return sum(not same_tree(a, b, element_class) for a, b in zip(expected, actual))
+
+
+# what parsing from threads used to give: the AST, or the exception, since a parse
+# whose lexer another thread has given new input can fail in any way
+def shared_parses(brewparse, programs, workers):
+    def parse(program):
+        try:
+            # with no lexer of its own, PLY reads from the last one built
+            return brewparse.parser.parse(program)
+        except Exception as e:
+            return e
+
+    with ThreadPoolExecutor(workers) as executor:
+        return list(executor.map(parse, programs))
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--project", default="proj4")
+    arg_parser.add_argument("--programs", type=int, default=200)
+    arg_parser.add_argument("--workers", type=int, default=4)
+    arg_parser.add_argument("--backend", default="ply", choices=["ply", "pratt"])
+    arg_parser.add_argument("--seed", type=int, default=0)
+    args = arg_parser.parse_args()
+
+    os.chdir(os.path.join(REPO_DIR, args.project))
+    sys.path.insert(0, os.getcwd())
+    import brewparse
+    from element import Element
+
+    programs = generate_batch(random.Random(args.seed), args.programs)
+    megabytes = sum(len(program.encode()) for program in programs) / 1e6
+    print(f"{len(programs)} programs, {megabytes:.2f} MB, {args.workers} workers")
+
+    start = time.perf_counter()
+    expected = [brewparse.parse_program(program, args.backend) for program in programs]
+    sequential = time.perf_counter() - start
+    print(f"{'sequential':12} {sequential * 1000:8.1f} ms  {megabytes / sequential:6.2f} MB/s")
+
+    wrong = 0
+    switch_interval = sys.getswitchinterval()
+    for pool in ("thread", "process"):
+        sys.setswitchinterval(1e-6 if pool == "thread" else switch_interval)
+        start = time.perf_counter()
+        actual = brewparse.parse_many(programs, args.backend, pool, args.workers)
+        elapsed = time.perf_counter() - start
+        sys.setswitchinterval(switch_interval)
+        pool_wrong = count_wrong(expected, actual, Element)
+        wrong += pool_wrong
+        print(f"{pool:12} {elapsed * 1000:8.1f} ms  {megabytes / elapsed:6.2f} MB/s  "
+              f"{pool_wrong} wrong")
+
+    if args.backend == "ply":
+        sys.setswitchinterval(1e-6)
+        # a corrupted parse can end up anywhere in p_error
+        with contextlib.redirect_stdout(io.StringIO()):
+            shared = shared_parses(brewparse, programs, args.workers)
+        sys.setswitchinterval(switch_interval)
+        print(f"{'shared':12} {count_wrong(expected, shared, Element)} wrong "
+              f"(one PLY parser and lexer for all the threads)")
+    return 1 if wrong else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+# Micro-benchmark of member lookups through prototype chains in interpreterv4: a loop
+# that reads a field and calls a method defined on the far end of a chain of the given
+# depth. Without caching, each lookup costs one dict probe per prototype, so the time
+# per lookup grows with the depth. Prints the time per loop iteration (one field read
+# and one method call) for each depth and engine.
+#
+#   python benchmarks/bench_proto.py [--repeat N] [--depths 1 4 16 64]
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "proj4"))
+sys.setrecursionlimit(100000)
+
+from interpreterv4 import Interpreter  # noqa: E402
+
+ITERATIONS = 1000
+
+
+def chain_program(depth):
+    lines = [
+        "func main() {",
+        "  p0 = @;",
+        "  p0.x = 1;",
+        "  p0.get = lambda() { return 1; };",
+    ]
+    for level in range(1, depth + 1):
+        lines.append(f"  p{level} = @; p{level}.proto = p{level - 1};")
+    lines += [
+        "  i = 0;",
+        "  total = 0;",
+        f"  while (i < {ITERATIONS}) {{",
+        f"    total = total + p{depth}.x + p{depth}.get();",
+        "    i = i + 1;",
+        "  }",
+        "  print(total);",
+        "}",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def best_time(program, engine, repeat):
+    best = None
+    for _ in range(repeat):
+        interpreter = Interpreter(console_output=False, engine=engine)
+        start = time.perf_counter()
+        interpreter.run(program)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--repeat", type=int, default=5)
+    arg_parser.add_argument("--depths", type=int, nargs="+", default=[1, 4, 16, 64])
+    args = arg_parser.parse_args()
+    for depth in args.depths:
+        program = chain_program(depth)
+        for engine in sorted(Interpreter.ENGINES):
+            per_iteration = best_time(program, engine, args.repeat) / ITERATIONS
+            print(f"depth {depth:3} {engine:8} {per_iteration * 1e6:8.2f} us/iteration")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+# Checks that brewparse.reparse_program gives the same result as parsing the whole edited
+# program again, then compares how long each takes for a one-character edit in a large
+# program. The check starts from programs made of several that bench_parse generates
+# (from a fixed seed), including ones that only parse by recovering from a syntax error,
+# and makes a run of random edits to each: ones that keep the program valid, and ones that
+# insert or delete text, replace a whole function, or open comments and strings. After
+# every edit, reparse_program on the last AST must build the same tree as parse_program
+# on the new source, or both must raise SyntaxError, and every function must record
+# where it now is in the source. An edit that leaves the program without an AST is
+# undone before the next.
+#
+# For proj4 it also runs a program and the ones reparse_program builds from it as it is
+# edited, which share nodes, through every engine of interpreterv4: after each edit,
+# every version so far is run again, and each must print, or fail with, what it does
+# when parsed on its own. Exits with status 1 if any edit or run gives a different
+# result.
+#
+#   python benchmarks/bench_reparse.py [--project proj4] [--cases 500] [--edits 20]
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+
+from bench_ast import generate_program
+from bench_parse import VOCAB, best_time, generate_corpus, same_tree
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+
+
+# an edit to program as (start, old_end, text): text replaces program[start:old_end].
+# Half the edits keep the program valid, as most keystrokes in a finished program do.
+def random_edit(rng, program, functions):
+    if rng.random() < 0.5:
+        return valid_edit(rng, program)
+    start = rng.randrange(len(program) + 1)
+    choice = rng.randrange(6)
+    if choice == 0:
+        return start, start, rng.choice(VOCAB)
+    if choice == 1:
+        return start, start, " " + rng.choice(VOCAB) + " "
+    if choice == 2:
+        return start, min(len(program), start + rng.randrange(1, 8)), ""
+    if choice == 3:
+        return start, min(len(program), start + rng.randrange(1, 4)), rng.choice(VOCAB)
+    if choice == 4 and functions:
+        function = rng.choice(functions)
+        replacement = rng.choice(["", "func g() { x = 1; }", "func h(a) { return a; } func k() { }"])
+        return function.start, function.end, replacement
+    return start, start, rng.choice(["/*", "*/", '"', "\n"])
+
+
+def valid_edit(rng, program):
+    choice = rng.randrange(3)
+    if choice == 0:
+        # a statement at the start of a block or after another
+        positions = [i + 1 for i, c in enumerate(program) if c in ";{"]
+        text = " y = 2; "
+    elif choice == 1:
+        positions = [i for i, c in enumerate(program) if c.isdigit()]
+        if positions:
+            start = rng.choice(positions)
+            return start, start + 1, str(rng.randrange(10))
+        positions, text = [], ""
+    else:
+        positions = [i for i, c in enumerate(program) if c.isspace()]
+        text = rng.choice([" ", "\n", " /* c */ "])
+    start = rng.choice(positions) if positions else len(program)
+    return start, start, text
+
+
+def check_edits(brewparse, element_class, program, edits, rng, backend):
+    def full_parse(source):
+        try:
+            return brewparse.parse_program(source, backend)
+        except SyntaxError as e:
+            return e
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        ast = full_parse(program)
+        if isinstance(ast, SyntaxError):
+            return 0, 0
+        wrong = 0
+        for _ in range(edits):
+            start, old_end, text = random_edit(rng, program, ast.functions)
+            edited = program[:start] + text + program[old_end:]
+            expected = full_parse(edited)
+            try:
+                actual = brewparse.reparse_program(ast, edited, start, old_end, start + len(text), backend)
+            except SyntaxError as e:
+                actual = e
+            if not same_tree(expected, actual, element_class) or (
+                not isinstance(actual, SyntaxError)
+                and [(f.start, f.end) for f in actual.functions]
+                != [(f.start, f.end) for f in expected.functions]
+            ):
+                wrong += 1
+                if wrong <= 3:
+                    sys.__stdout__.write(f"MISMATCH: {program!r} -> {edited!r}\n")
+            if not isinstance(actual, SyntaxError):
+                program, ast = edited, actual
+    return edits, wrong
+
+
+RUN_PROGRAM = """func apply(f, v) { return f(v); }
+func scale(n) { return n * k; }
+func main() {
+  k = 3;
+  add = lambda(a) { return a + scale(a); };
+  x = 1;
+  y = 2;
+  print(apply(add, x), y - x);
+  o = @;
+  o.v = 5;
+  o.get = lambda() { return this.v + k; };
+  print(o.get());
+}
+"""
+
+# edits to RUN_PROGRAM, one after another, as (text to replace, replacement): ones that
+# bring in new names, which moves the slots of the rest, and one that changes what the
+# lambdas have to capture
+RUN_EDITS = [
+    ("", "func extra() { zz = 1; q = 2; y = 3; return zz; }\n"),
+    ("return n * k;", "return n * k + x;"),
+    ("func apply", "func first() { m = 4; return m; }\nfunc apply"),
+    ("func extra() { zz = 1; q = 2; y = 3; return zz; }\n", ""),
+]
+
+
+# stands in for brewcache.ASTCache to have an interpreter run a given AST
+class GivenAST:
+    def __init__(self, ast):
+        self.ast = ast
+
+    def parse(self, program):
+        return self.ast
+
+
+def check_runs(brewparse, interpreter_class):
+    def output(program, **kwargs):
+        interpreter = interpreter_class(console_output=False, **kwargs)
+        try:
+            interpreter.run(program)
+        except Exception as e:  # interpreter errors are plain Exceptions
+            return interpreter.get_output(), str(e)
+        return interpreter.get_output(), None
+
+    versions = [(RUN_PROGRAM, brewparse.parse_program(RUN_PROGRAM))]
+    runs = wrong = 0
+    for old_text, new_text in RUN_EDITS:
+        program, ast = versions[-1]
+        start = program.index(old_text) if old_text else len(program)
+        edited = program[:start] + new_text + program[start + len(old_text):]
+        end = start + len(new_text)
+        versions.append((edited, brewparse.reparse_program(ast, edited, start, start + len(old_text), end)))
+        for engine in sorted(interpreter_class.ENGINES):
+            for program, ast in versions:
+                runs += 1
+                if output(program, engine=engine, ast_cache=GivenAST(ast)) != output(program, engine=engine):
+                    wrong += 1
+                    print(f"RUN MISMATCH {engine}: {program!r}")
+    return runs, wrong
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--project", default="proj4")
+    arg_parser.add_argument("--cases", type=int, default=500)
+    arg_parser.add_argument("--edits", type=int, default=20)
+    arg_parser.add_argument("--seed", type=int, default=0)
+    arg_parser.add_argument("--funcs", type=int, default=2000)
+    arg_parser.add_argument("--repeat", type=int, default=5)
+    args = arg_parser.parse_args()
+
+    os.chdir(os.path.join(REPO_DIR, args.project))
+    sys.path.insert(0, os.getcwd())
+    import brewparse
+    from element import Element
+
+    rng = random.Random(args.seed)
+    corpus = generate_corpus(rng, args.cases)
+    # several of bench_parse's programs in one, so that most edits leave functions alone
+    programs = [" ".join(corpus[i:i + 6]) for i in range(0, len(corpus), 6)]
+    programs += [" ".join(corpus[i:i + 6:2]) for i in range(0, len(corpus), 6)]
+    wrong = 0
+    for backend in ("ply", "pratt"):
+        edits = backend_wrong = 0
+        for program in programs:
+            checked, program_wrong = check_edits(brewparse, Element, program, args.edits, rng, backend)
+            edits += checked
+            backend_wrong += program_wrong
+        print(f"{backend:6} {edits} edits, {backend_wrong} re-parsed differently")
+        wrong += backend_wrong
+    if os.path.exists("interpreterv4.py"):
+        from interpreterv4 import Interpreter
+
+        runs, runs_wrong = check_runs(brewparse, Interpreter)
+        print(f"{runs} runs of re-parsed programs, {runs_wrong} differ")
+        wrong += runs_wrong
+
+    # change one digit in the middle of a large program
+    program = generate_program(args.funcs)
+    position = program.index("x = x - 1", len(program) // 2) + len("x = x - ")
+    edited = program[:position] + "2" + program[position + 1:]
+    megabytes = len(edited.encode()) / 1e6
+    print(f"generated program: {megabytes:.2f} MB, editing one character")
+    for backend in ("ply", "pratt"):
+        ast = brewparse.parse_program(program, backend)
+        full = best_time(lambda: brewparse.parse_program(edited, backend), args.repeat)
+        incremental = best_time(
+            lambda: brewparse.reparse_program(ast, edited, position, position + 1, position + 1, backend),
+            args.repeat,
+        )
+        print(f"{backend:6} parse_program {full * 1000:8.1f} ms  "
+              f"reparse_program {incremental * 1000:8.3f} ms  ({full / incremental:.0f}x)")
+    return 1 if wrong else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
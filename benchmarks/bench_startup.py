@@ -0,0 +1,58 @@
+# Measures how long a fresh Python process takes to import brewparse (which builds the
+# lexer and the parser) with and without BREWIN_FAST_STARTUP, against a process that
+# imports nothing. Each import runs in its own interpreter so nothing is warm but the
+# bytecode cache, which one untimed run of each mode fills first; runs of the modes are
+# interleaved to even out noise. Prints the median and best time of each, and the import
+# cost over the empty process.
+#
+#   python benchmarks/bench_startup.py [--project proj4] [--runs 20]
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODES = {
+    "empty process": ("pass", {}),
+    "import brewparse": ("import brewparse", {}),
+    "  fast startup": ("import brewparse", {"BREWIN_FAST_STARTUP": "1"}),
+}
+
+
+def time_process(code, extra_env, cwd):
+    env = dict(os.environ)
+    env.pop("BREWIN_FAST_STARTUP", None)
+    # compiling every module from source would swamp the time spent building the parser
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    env.update(extra_env)
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", code], cwd=cwd, env=env, check=True)
+    return time.perf_counter() - start
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--project", default="proj4")
+    arg_parser.add_argument("--runs", type=int, default=20)
+    args = arg_parser.parse_args()
+
+    project_dir = os.path.join(REPO_DIR, args.project)
+    times = {name: [] for name in MODES}
+    for code, extra_env in MODES.values():
+        time_process(code, extra_env, project_dir)
+    for _ in range(args.runs):
+        for name, (code, extra_env) in MODES.items():
+            times[name].append(time_process(code, extra_env, project_dir))
+
+    baseline = statistics.median(times["empty process"])
+    for name, samples in times.items():
+        median = statistics.median(samples)
+        print(f"{name:18} median {median * 1000:6.1f} ms  best {min(samples) * 1000:6.1f} ms  "
+              f"import {(median - baseline) * 1000:6.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
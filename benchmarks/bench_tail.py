@@ -0,0 +1,103 @@
+# Runs deep tail recursion in interpreterv3 and interpreterv4 under Python's default
+# recursion limit: a function that counts down by calling itself in tail position, and a
+# pair of mutually recursive functions, started both from a call in main and by main
+# returning the call. Engines that run tail calls in a loop finish at any depth; the
+# others run out of Python stack. Prints the time per call for each project, engine and
+# program, or the error that stopped it. Exits with status 1 if a program that finishes
+# prints something other than what it should.
+#
+#   python benchmarks/bench_tail.py [--depth 1000000] [--projects proj3 proj4]
+import argparse
+import importlib
+import os
+import sys
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INTERPRETERS = {"proj3": "interpreterv3", "proj4": "interpreterv4"}
+
+# acc + 0 rather than acc: interpreterv3 only accepts a bare variable in a return when it
+# holds a function
+PROGRAMS = {
+    "self": """
+func count(n, acc) {
+  if (n == 0) { return acc + 0; }
+  return count(n - 1, acc + 1);
+}
+func main() { print(count(DEPTH, 0)); }
+""",
+    "mutual": """
+func even(n) {
+  if (n == 0) { return true; }
+  return odd(n - 1);
+}
+func odd(n) {
+  if (n == 0) { return false; }
+  return even(n - 1);
+}
+func main() { print(even(DEPTH)); }
+""",
+    "main": """
+func count(n) {
+  if (n == 0) { print("done"); return 0; }
+  return count(n - 1);
+}
+func main() { return count(DEPTH); }
+""",
+}
+
+
+# what each program prints at a given depth
+def expected_output(name, depth):
+    if name == "self":
+        return str(depth)
+    if name == "mutual":
+        return "true" if depth % 2 == 0 else "false"
+    return "done"
+
+
+def run(interpreter_class, engine, program):
+    interpreter = interpreter_class(console_output=False, engine=engine)
+    start = time.perf_counter()
+    try:
+        interpreter.run(program)
+    except RecursionError:
+        return "RecursionError", None
+    except Exception as e:  # interpreter errors are plain Exceptions
+        return f"{type(e).__name__}: {e}", None
+    return " ".join(interpreter.get_output()), time.perf_counter() - start
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--depth", type=int, default=1000000)
+    arg_parser.add_argument("--projects", nargs="+", default=sorted(INTERPRETERS))
+    args = arg_parser.parse_args()
+
+    wrong = 0
+    for project in args.projects:
+        project_dir = os.path.join(REPO_DIR, project)
+        sys.path.insert(0, project_dir)
+        interpreter_class = importlib.import_module(INTERPRETERS[project]).Interpreter
+        for engine in sorted(interpreter_class.ENGINES):
+            for name, source in PROGRAMS.items():
+                program = source.replace("DEPTH", str(args.depth))
+                output, elapsed = run(interpreter_class, engine, program)
+                if elapsed is None:
+                    print(f"{project} {engine:8} {name:7} failed: {output}")
+                    continue
+                print(f"{project} {engine:8} {name:7} {elapsed:7.2f} s "
+                      f"{elapsed / args.depth * 1e6:6.2f} us/call  -> {output}")
+                if output != expected_output(name, args.depth):
+                    wrong += 1
+                    print(f"WRONG OUTPUT: expected {expected_output(name, args.depth)}")
+        # every project has its own modules under the same names
+        sys.path.pop(0)
+        for name, module in list(sys.modules.items()):
+            if os.path.dirname(getattr(module, "__file__", None) or "") == project_dir:
+                del sys.modules[name]
+    return 1 if wrong else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,48 @@
+# Compares two result files written by harness.py, e.g. from before and after a change:
+#
+#   python benchmarks/harness.py -o before.json
+#   ... make the change ...
+#   python benchmarks/harness.py -o after.json
+#   python benchmarks/compare.py before.json after.json
+#
+# For every (interpreter, program) pair measured in both, prints both wall times and the
+# speedup, and flags pairs whose output changed.
+import argparse
+import json
+
+
+def load_results(path):
+    with open(path) as results_file:
+        report = json.load(results_file)
+    return {
+        (result["interpreter"], result["program"]): result
+        for result in report["results"]
+        if "wall_time" in result
+    }
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("before")
+    arg_parser.add_argument("after")
+    args = arg_parser.parse_args()
+
+    before = load_results(args.before)
+    after = load_results(args.after)
+    print(f"{'program':14} {'interpreter':32} {'before (s)':>10} {'after (s)':>10} {'speedup':>8}")
+    for key, new in after.items():
+        old = before.get(key)
+        if old is None:
+            continue
+        interpreter, program = key
+        line = (
+            f"{program:14} {interpreter:32} {old['wall_time']:10.4f} {new['wall_time']:10.4f} "
+            f"{old['wall_time'] / new['wall_time']:7.2f}x"
+        )
+        if old["output"] != new["output"]:
+            line += "  OUTPUT CHANGED"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
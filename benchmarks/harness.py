@@ -0,0 +1,151 @@
+# Runs the Brewin programs in benchmarks/corpus on every interpreter generation it can
+# run on (proj1/interpreterv1 through proj4/interpreterv4, plus the other v4 engines)
+# and reports wall time, ops/sec and peak memory as JSON, for comparing versions.
+#
+#   python benchmarks/harness.py [--repeat N] [--only NAME ...] [-o results.json]
+#
+# Every project directory has its own brewparse, element, intbase and so on, so each
+# (interpreter, program) pair runs in a fresh Python process started with --worker.
+import argparse
+import contextlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+CORPUS_DIR = os.path.join(BENCH_DIR, "corpus")
+
+# (project directory, interpreter module, extra Interpreter() arguments)
+INTERPRETERS = [
+    ("proj1", "interpreterv1", {}),
+    ("proj2", "interpreterv2", {}),
+    ("proj3", "interpreterv3", {}),
+    ("proj3", "interpreterv3", {"engine": "closure"}),
+    ("proj4", "interpreterv4", {}),
+    ("proj4", "interpreterv4", {"engine": "vm"}),
+    ("proj4", "interpreterv4", {"engine": "closure"}),
+]
+
+# program -> (first interpreter version that can run it, ops it performs). An op is
+# one unit of the program's main workload: a statement for straight_line, an inner
+# loop iteration, a function call or a member lookup.
+CORPUS = {
+    "straight_line": (1, 303),
+    "while_loop": (2, 10000),
+    "recursion": (2, 2374),
+    "overloads": (2, 4000),
+    "lambdas": (3, 1000),
+    "proto_chain": (4, 2000),
+}
+
+
+def interpreter_label(project, module, kwargs):
+    label = f"{project}/{module}"
+    if "engine" in kwargs:
+        label += f"[{kwargs['engine']}]"
+    return label
+
+
+def run_worker(project, module, kwargs, program_name, repeat):
+    os.chdir(os.path.join(REPO_DIR, project))
+    sys.path.insert(0, os.getcwd())
+    sys.setrecursionlimit(100000)
+    interpreter_class = __import__(module).Interpreter
+    with open(os.path.join(CORPUS_DIR, program_name + ".br")) as program_file:
+        program = program_file.read()
+
+    def run_once():
+        interpreter = interpreter_class(console_output=False, **kwargs)
+        # some generations print debugging output of their own
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            interpreter.run(program)
+        return interpreter.get_output()
+
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = run_once()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+
+    # measured separately, since tracing every allocation slows the run down
+    tracemalloc.start()
+    run_once()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    json.dump({"wall_time": best, "peak_memory": peak, "output": output}, sys.stdout)
+
+
+def run_benchmark(project, module, kwargs, program_name, repeat):
+    version = int(module[len("interpreterv"):])
+    min_version, ops = CORPUS[program_name]
+    result = {
+        "interpreter": interpreter_label(project, module, kwargs),
+        "program": program_name,
+        "ops": ops,
+    }
+    if version < min_version:
+        result["skipped"] = f"needs interpreterv{min_version} or later"
+        return result
+
+    command = [sys.executable, os.path.abspath(__file__), "--worker", project, module,
+               json.dumps(kwargs), program_name, "--repeat", str(repeat)]
+    completed = subprocess.run(command, capture_output=True, text=True)
+    if completed.returncode != 0:
+        result["error"] = completed.stderr.strip().splitlines()[-1]
+        return result
+    measured = json.loads(completed.stdout)
+    result["wall_time"] = measured["wall_time"]
+    result["ops_per_sec"] = ops / measured["wall_time"]
+    result["peak_memory"] = measured["peak_memory"]
+    result["output"] = measured["output"]
+    return result
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--repeat", type=int, default=3,
+                            help="timed runs per benchmark; the fastest is reported")
+    arg_parser.add_argument("--only", nargs="+", choices=sorted(CORPUS),
+                            help="run just these programs")
+    arg_parser.add_argument("-o", "--output", help="write the JSON here instead of stdout")
+    arg_parser.add_argument("--worker", nargs=4, help=argparse.SUPPRESS)
+    args = arg_parser.parse_args()
+
+    if args.worker:
+        project, module, kwargs, program_name = args.worker
+        run_worker(project, module, json.loads(kwargs), program_name, args.repeat)
+        return
+
+    results = []
+    for program_name in args.only or CORPUS:
+        for project, module, kwargs in INTERPRETERS:
+            result = run_benchmark(project, module, kwargs, program_name, args.repeat)
+            results.append(result)
+            if "wall_time" in result:
+                status = f"{result['wall_time']:.4f}s {result['ops_per_sec']:.0f} ops/s"
+            else:
+                status = result.get("skipped") or result["error"]
+            print(f"{program_name:14} {result['interpreter']:32} {status}", file=sys.stderr)
+
+    report = {
+        "python": platform.python_version(),
+        "repeat": args.repeat,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(report, output_file, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+# A hand-written lexer for Brewin that produces the same tokens as the PLY lexer built by
+# brewlex, for the parser to use as yacc.parse(program, lexer=Lexer()). Every token rule
+# in brewlex becomes an alternative of one regex, in the order PLY tries them, and a
+# single finditer pass over the program yields the tokens, so there's no per-token trip
+# through PLY's rule tables and token functions.
+import functools
+import re
+
+import brewlex
+
+# brewlex's operator rules are plain escaped strings. PLY tries them longest first,
+# which is what makes == win over =.
+OPERATORS = {
+    re.sub(r"\\(.)", r"\1", getattr(brewlex, "t_" + name)): name
+    for name in brewlex.tokens
+    if isinstance(getattr(brewlex, "t_" + name, None), str)
+}
+
+# Alternatives come in PLY's order: rules defined by functions, then the string rules,
+# then (as the fallback when none of them match) a single literal or illegal character.
+# Nothing matches the t_ignore characters, so finditer's search skips over them without
+# stopping at each run of spaces.
+TOKEN_RE = re.compile(
+    "|".join(
+        f"(?P<{name}>{pattern})"
+        for name, pattern in (
+            ("NUMBER", brewlex.t_NUMBER.__doc__),
+            ("NAME", brewlex.t_NAME.__doc__),
+            ("newline", brewlex.t_newline.__doc__),
+            ("comment", brewlex.t_comment.__doc__),
+            ("STRING", brewlex.t_STRING.__doc__),
+            ("op", "|".join(re.escape(op) for op in sorted(OPERATORS, key=len, reverse=True))),
+            ("other", f"[^{re.escape(brewlex.t_ignore)}]"),
+        )
+    ),
+    re.VERBOSE,
+)
+
+
+# the parser only reads type and value, and lineno and lexpos for error messages; it
+# sets lexer on the token it reports a syntax error at
+class Token:
+    __slots__ = ("type", "value", "lineno", "lexpos", "lexer")
+
+    def __str__(self):
+        return f"LexToken({self.type},{self.value!r},{self.lineno},{self.lexpos})"
+
+    def __repr__(self):
+        return str(self)
+
+
+# Implements the parts of ply.lex.Lexer the parser uses: input(), token(), clone(), and
+# the lineno and lexpos of where it has got to.
+class Lexer:
+    def __init__(self):
+        self.lineno = 1
+        self.lexpos = 0
+        self.tokens = iter(())
+
+    # input() shadows this with next() bound to the token generator, which saves a
+    # Python call for every token the parser asks for
+    def token(self):
+        return next(self.tokens, None)
+
+    # start is where in data to start lexing; positions still count from the start of data
+    def input(self, data, start=0):
+        self.lexpos = start
+        self.tokens = self.__scan(data, start)
+        self.token = functools.partial(next, self.tokens, None)
+
+    def __iter__(self):
+        return self.tokens
+
+    # a lexer of its own at the same line, for another parser to use. Unlike PLY's, the
+    # clone doesn't carry on through this lexer's input: a generator can't be copied, and
+    # parsers call input() before they read any tokens anyway.
+    def clone(self):
+        lexer = Lexer()
+        lexer.lineno = self.lineno
+        return lexer
+
+    def __scan(self, data, start):
+        operators = OPERATORS
+        reserved_map = brewlex.reserved_map
+        lineno = self.lineno
+        for match in TOKEN_RE.finditer(data, start):
+            kind = match.lastgroup
+            value = match.group()
+            if kind == "op":
+                token_type = operators[value]
+            elif kind == "NAME":
+                token_type = reserved_map.get(value, "NAME")
+            elif kind == "NUMBER":
+                token_type = kind
+                value = int(value)
+            elif kind == "newline" or kind == "comment":
+                lineno += value.count("\n")
+                self.lineno = lineno
+                continue
+            elif kind == "STRING":
+                token_type = kind
+                value = value[1:-1]
+            elif value in brewlex.literals:
+                token_type = value
+            else:
+                # what brewlex.t_error does, and PLY then carries on with the next character
+                print(f"Illegal character {value}")
+                continue
+            # setting the slots here is faster than calling an __init__
+            token = Token()
+            token.type = token_type
+            token.value = value
+            token.lineno = lineno
+            token.lexpos = match.start()
+            self.lexpos = match.end()
+            yield token
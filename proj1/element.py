@@ -1,19 +1,30 @@
+from intbase import InterpreterBase
+
+
+# AST nodes. Every node type has its own class that keeps its fields in __slots__
+# rather than a per-node dict, which makes the tree about a third of the size and reading a
+# field a plain attribute load. The field names are the ones the interpreters pass to
+# get(), and fields lists them in the order str() prints them.
 class Element:
-    def __init__(self, elem_type, **kwargs):
+    __slots__ = ("elem_type", "__weakref__")
+    fields = ()
+
+    # nodes with no fields of their own: nil and @
+    def __init__(self, elem_type):
         self.elem_type = elem_type
-        self.dict = {}
-        for key, value in kwargs.items():
-            self.dict[key] = value
 
     def get(self, key):
-        if key not in self.dict:
-            return None
-        return self.dict[key]
+        return getattr(self, key, None)
+
+    # the fields as a dict, for code that predates get()
+    @property
+    def dict(self):
+        return {field: getattr(self, field) for field in self.fields}
 
     def __str__(self):
         s = f"{self.elem_type}: "
-        for key, value in self.dict.items():
-            s += key + ": " + self.__val(value) + ", "
+        for field in self.fields:
+            s += field + ": " + self.__val(getattr(self, field)) + ", "
         return s[0:-2]
 
     def __val(self, v):
@@ -27,3 +38,147 @@ class Element:
                 return "[" + s[0:-2] + "]"
             return "[" + s + "]"
         return str(v)
+
+
+class Program(Element):
+    __slots__ = ("functions",)
+    fields = ("functions",)
+
+    def __init__(self, functions):
+        super().__init__(InterpreterBase.PROGRAM_DEF)
+        self.functions = functions
+
+
+# start and end are where the function is in the program's source, from its func up to
+# just past its closing brace, for brewparse.reparse_program
+class Function(Element):
+    __slots__ = ("name", "args", "statements", "start", "end")
+    fields = ("name", "args", "statements")
+
+    def __init__(self, name, args, statements, start=None, end=None):
+        super().__init__(InterpreterBase.FUNC_DEF)
+        self.name = name
+        self.args = args
+        self.statements = statements
+        self.start = start
+        self.end = end
+
+
+class Lambda(Element):
+    __slots__ = ("args", "statements")
+    fields = ("args", "statements")
+
+    def __init__(self, args, statements):
+        super().__init__(InterpreterBase.LAMBDA_DEF)
+        self.args = args
+        self.statements = statements
+
+
+# a formal parameter, arg or refarg
+class Argument(Element):
+    __slots__ = ("name",)
+    fields = ("name",)
+
+    def __init__(self, elem_type, name):
+        super().__init__(elem_type)
+        self.name = name
+
+
+class Assignment(Element):
+    __slots__ = ("name", "expression")
+    fields = ("name", "expression")
+
+    def __init__(self, name, expression):
+        super().__init__("=")
+        self.name = name
+        self.expression = expression
+
+
+class If(Element):
+    __slots__ = ("condition", "statements", "else_statements")
+    fields = ("condition", "statements", "else_statements")
+
+    def __init__(self, condition, statements, else_statements):
+        super().__init__(InterpreterBase.IF_DEF)
+        self.condition = condition
+        self.statements = statements
+        self.else_statements = else_statements
+
+
+class While(Element):
+    __slots__ = ("condition", "statements")
+    fields = ("condition", "statements")
+
+    def __init__(self, condition, statements):
+        super().__init__(InterpreterBase.WHILE_DEF)
+        self.condition = condition
+        self.statements = statements
+
+
+class Return(Element):
+    __slots__ = ("expression",)
+    fields = ("expression",)
+
+    def __init__(self, expression):
+        super().__init__(InterpreterBase.RETURN_DEF)
+        self.expression = expression
+
+
+# neg and !
+class UnaryOp(Element):
+    __slots__ = ("op1",)
+    fields = ("op1",)
+
+    def __init__(self, elem_type, op1):
+        super().__init__(elem_type)
+        self.op1 = op1
+
+
+class BinaryOp(Element):
+    __slots__ = ("op1", "op2")
+    fields = ("op1", "op2")
+
+    def __init__(self, elem_type, op1, op2):
+        super().__init__(elem_type)
+        self.op1 = op1
+        self.op2 = op2
+
+
+# int, string and bool constants
+class Literal(Element):
+    __slots__ = ("val",)
+    fields = ("val",)
+
+    def __init__(self, elem_type, val):
+        super().__init__(elem_type)
+        self.val = val
+
+
+class Variable(Element):
+    __slots__ = ("name",)
+    fields = ("name",)
+
+    def __init__(self, name):
+        super().__init__(InterpreterBase.VAR_DEF)
+        self.name = name
+
+
+class FunctionCall(Element):
+    __slots__ = ("name", "args")
+    fields = ("name", "args")
+
+    def __init__(self, name, args):
+        super().__init__(InterpreterBase.FCALL_DEF)
+        self.name = name
+        self.args = args
+
+
+class MethodCall(Element):
+    __slots__ = ("objref", "name", "args")
+    fields = ("objref", "name", "args")
+
+    def __init__(self, objref, name, args):
+        super().__init__(InterpreterBase.MCALL_DEF)
+        self.objref = objref
+        self.name = name
+        self.args = args
@@ -3,27 +3,29 @@ from element import Element
 from intbase import InterpreterBase, ErrorType
 
 class Interpreter(InterpreterBase):
-    def __init__(self, console_output=True, inp=None, trace_output=False):
-        super().__init__(console_output, inp)   # call InterpreterBase's constructor
+    def __init__(self, console_output=True, inp=None, trace_output=False, output_sink=None):
+        super().__init__(console_output, inp, output_sink)   # call InterpreterBase's constructor
         self.variables = {}
         self.functions = {}
     
     # Main worker function
     def run(self, program):
-        # Create Abstract Syntax Tree
-        ast = parse_program(program)
-        # Load in all the function definitions
-        self.load_in_functions(ast)
-        # Get the main function node
-        main_func_node = self.get_main_func_node(ast)
-        # Run the main node
-        self.run_func(main_func_node)
-        pass
+        try:
+            # Create Abstract Syntax Tree
+            ast = parse_program(program)
+            # Load in all the function definitions
+            self.load_in_functions(ast)
+            # Get the main function node
+            main_func_node = self.get_main_func_node(ast)
+            # Run the main node
+            self.run_func(main_func_node)
+        finally:
+            super().flush_output()
 
     # Loads in function definitions from AST
     def load_in_functions(self, ast):
-        for function_node in ast.dict['functions']:
-            self.functions[function_node.dict['name']] = function_node
+        for function_node in ast.get('functions'):
+            self.functions[function_node.get('name')] = function_node
 
     # Gets main() from AST; basic check on operatability
     def get_main_func_node(self, ast):
@@ -33,7 +35,7 @@ class Interpreter(InterpreterBase):
     
     # Run function-type call
     def run_func(self, func_node):
-        for statement_node in func_node.dict['statements']:
+        for statement_node in func_node.get('statements'):
             self.run_statement(statement_node)
     
     # Run statement
@@ -50,18 +52,18 @@ class Interpreter(InterpreterBase):
             self.do_function_call(statement_node)
 
     def do_function_call(self, statement_node):
-        function_name = statement_node.dict['name']
+        function_name = statement_node.get('name')
         # Run a defined function
         if function_name in self.functions:
             self.run_func(self.functions[function_name])
 
         # Run print
         elif function_name == 'print':
-            self.print(statement_node.dict['args'])
+            self.print(statement_node.get('args'))
 
         # Run inputi
         elif function_name == 'inputi':
-            self.inputi(statement_node.dict['args'])
+            self.inputi(statement_node.get('args'))
         
         # If function does not exist:
         else:
@@ -70,14 +72,14 @@ class Interpreter(InterpreterBase):
     # Process assignment call
     def do_assignment(self, statement_node):
         # Get target variable name
-        var_name = statement_node.dict['name']
+        var_name = statement_node.get('name')
 
         # Create variable in variable dictionary
         if var_name not in self.variables:
             self.variables[var_name] = None
 
         # Evaluate expression
-        expression_node = statement_node.dict['expression']
+        expression_node = statement_node.get('expression')
         self.variables[var_name] = self.evaluate_expression(expression_node)
 
         print(self.variables)
@@ -103,19 +105,19 @@ class Interpreter(InterpreterBase):
             return self.eval_neg(expression_node)
 
         # Evaluate inputi function
-        elif expression_type == 'fcall' and expression_node.dict['name'] == 'inputi':
-            return self.inputi(expression_node.dict['args'])
+        elif expression_type == 'fcall' and expression_node.get('name') == 'inputi':
+            return self.inputi(expression_node.get('args'))
         
-        elif expression_type == 'fcall' and expression_node.dict['name'] in self.functions:
-            return self.do_function_call(self.functions[expression_node.dict['name']])
+        elif expression_type == 'fcall' and expression_node.get('name') in self.functions:
+            return self.do_function_call(self.functions[expression_node.get('name')])
         
         # For future use: if function is declared otherwise
-        # elif expression_type == 'fcall' and expression_node.dict['name'] in self.functions:
-        #       return self.run_func(self.functions[expression_node.dict['name']])
+        # elif expression_type == 'fcall' and expression_node.get('name') in self.functions:
+        #       return self.run_func(self.functions[expression_node.get('name')])
 
         # Evaluate impossible behavior
         else:
-            super().error(ErrorType.NAME_ERROR, f"Call to '{expression_node.dict['name']}' fails.")
+            super().error(ErrorType.NAME_ERROR, f"Call to '{expression_node.get('name')}' fails.")
 
     
 
@@ -123,11 +125,11 @@ class Interpreter(InterpreterBase):
 
     # Handle value nodes
     def get_val_node(self, val_node):
-        return val_node.dict['val']
+        return val_node.get('val')
 
     # Handle variable assignments
     def get_var_node(self, var_node):
-        var_name = var_node.dict['name']
+        var_name = var_node.get('name')
         if var_name not in self.variables:
             super().error(ErrorType.NAME_ERROR, f"Variable {var_name} has not been defined")
         return self.variables[var_name]
@@ -135,8 +137,8 @@ class Interpreter(InterpreterBase):
     # Handle binary operator
     def eval_binary_operator(self, operator_node):
         # Evaluate the operands post-order
-        op1 = self.evaluate_expression(operator_node.dict['op1'])
-        op2 = self.evaluate_expression(operator_node.dict['op2'])
+        op1 = self.evaluate_expression(operator_node.get('op1'))
+        op2 = self.evaluate_expression(operator_node.get('op2'))
         
         operator_type = operator_node.elem_type
         self.check_operand_types(op1, op2)
@@ -153,7 +155,7 @@ class Interpreter(InterpreterBase):
     # Evaluates negative operator
     def eval_neg(self, neg_node):
         #return -1 * 
-        return -1 * self.evaluate_expression(neg_node.dict['op1'])
+        return -1 * self.evaluate_expression(neg_node.get('op1'))
     
     # Checks operand types for operations
     def check_operand_types(self, op1, op2):
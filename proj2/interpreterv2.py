@@ -2,6 +2,7 @@ from env_v1 import EnvironmentManager
 from type_valuev1 import Type, Value, create_value, get_printable
 from intbase import InterpreterBase, ErrorType
 from brewparse import parse_program
+from element import kind_table
 from copy import deepcopy
 
 
@@ -14,28 +15,36 @@ class Interpreter(InterpreterBase):
     COM_OPS = {"==", "!=", "<", "<=", ">", ">=", "||", "&&"}
 
     # METHODS
-    def __init__(self, console_output=True, inp=None, trace_output=False):
-        super().__init__(console_output, inp)
+    # short_circuit makes && and || skip their right operand when the left one decides
+    # the result (by default both operands are always evaluated)
+    def __init__(self, console_output=True, inp=None, trace_output=False, short_circuit=False,
+                 output_sink=None):
+        super().__init__(console_output, inp, output_sink)
         self.trace_output = trace_output
+        self.short_circuit = short_circuit
         self.__setup_ops()
+        self.__setup_handlers()
 
     def run(self, program):
-        # Create an AST
-        ast = parse_program(program)
-        # Set up function definitions connected to the "root" node
-        self.__set_up_function_table(ast)
-        # Obtain the "main" function node: the root of the execution
-        main_func = self.__get_func_by_name("main", 0)
-
-        # Set up the variable dictionary (environmentManager) for the main function, along with a stack implementation for the various scopes.
-        self.env = [EnvironmentManager()]
-        # Run main() in sequence
-        if self.trace_output:
-            print("Entering main()...")
-        main_exec = self.__run_statements(main_func.get("statements"))
+        try:
+            # Create an AST
+            ast = parse_program(program)
+            # Set up function definitions connected to the "root" node
+            self.__set_up_function_table(ast)
+            # Obtain the "main" function node: the root of the execution
+            main_func = self.__get_func_by_name("main", 0)
+
+            # Set up the variable dictionary (environmentManager) for the main function, along with a stack implementation for the various scopes.
+            self.env = [EnvironmentManager()]
+            # Run main() in sequence
+            if self.trace_output:
+                print("Entering main()...")
+            main_exec = self.__run_statements(main_func.get("statements"))
 
-        if self.trace_output:
-            print("MAIN OUTPUT: ", main_exec.value())
+            if self.trace_output:
+                print("MAIN OUTPUT: ", main_exec.value())
+        finally:
+            super().flush_output()
 
 
     # Runs the statements associated in the function's node.
@@ -46,40 +55,52 @@ class Interpreter(InterpreterBase):
         for statement in statements:
             if self.trace_output:
                 print(" statement", statement)
-            # Function call
-            if statement.elem_type == InterpreterBase.FCALL_DEF:
-                if self.trace_output:
-                    print("  entering function call...")
-                call = self.__call_func(statement)
-            # Assignment
-            elif statement.elem_type == "=":
-                if self.trace_output:
-                    print("  entering assignment call...")
-                call = self.__assign(statement)
-            # If
-            elif statement.elem_type == "if":
-                if self.trace_output:
-                    print("  entering if call...")
-                call = self.__run_if(statement)
-                if call.value() != None:
-                    return deepcopy(call)
-            # While
-            elif statement.elem_type == "while":
-                if self.trace_output:
-                    print("  entering while call...")
-                call = self.__run_while(statement)
-                if call.value() != None:
-                    return deepcopy(call)
-            # Return
-            elif statement.elem_type == "return":
-                if self.trace_output:
-                    print("  entering return call...")
-                if statement.get("expression") == None:
-                    break
-                call = self.__eval_expr(statement.get("expression"))
-                return deepcopy(call)
+            handler = self.statement_handlers[statement.kind]
+            if handler is None:
+                continue
+            # a handler returns None to go on to the next statement, or the value to return
+            result = handler(statement)
+            if result is not None:
+                return result
         return Interpreter.NIL_VALUE
 
+    # Function call
+    def __exec_call(self, statement):
+        if self.trace_output:
+            print("  entering function call...")
+        self.__call_func(statement)
+
+    # Assignment
+    def __exec_assign(self, statement):
+        if self.trace_output:
+            print("  entering assignment call...")
+        self.__assign(statement)
+
+    # If
+    def __exec_if(self, statement):
+        if self.trace_output:
+            print("  entering if call...")
+        call = self.__run_if(statement)
+        if call.value() != None:
+            return deepcopy(call)
+
+    # While
+    def __exec_while(self, statement):
+        if self.trace_output:
+            print("  entering while call...")
+        call = self.__run_while(statement)
+        if call.value() != None:
+            return deepcopy(call)
+
+    # Return
+    def __exec_return(self, statement):
+        if self.trace_output:
+            print("  entering return call...")
+        if statement.get("expression") == None:
+            return Interpreter.NIL_VALUE
+        call = self.__eval_expr(statement.get("expression"))
+        return deepcopy(call)
+
         
     ### IF AND WHILE LOOPS ###
     # Run if statement
@@ -247,6 +268,9 @@ class Interpreter(InterpreterBase):
     def __eval_expr(self, expr_ast):
         if self.trace_output:
             print("    evaluating expression...")
+        # values, variables and calls, which most expressions bottom out in, are tested
+        # for first as they always were, sparing them a handler call; operators are
+        # dispatched through expr_handlers rather than tested against one set after another
         # VARIABLES
         # Int var
         if expr_ast.elem_type == InterpreterBase.INT_DEF:
@@ -268,7 +292,7 @@ class Interpreter(InterpreterBase):
             if self.trace_output:
                 print("     returning nil of value", expr_ast.get("val"))
             return Value(Type.NIL, expr_ast.get("val"))
-        
+
         # Preexisting var
         if expr_ast.elem_type == InterpreterBase.VAR_DEF:
             var_name = expr_ast.get("name")
@@ -278,24 +302,14 @@ class Interpreter(InterpreterBase):
             if self.trace_output:
                 print("     returning var of value", val.value())
             return val
-        
+
         # If recursed to a function call, call the function
         if expr_ast.elem_type == InterpreterBase.FCALL_DEF:
             if self.trace_output:
                     print("     calling function", expr_ast.get("name"))
             return self.__call_func(expr_ast)
-        
-        # Handle binary operators
-        if expr_ast.elem_type in Interpreter.BIN_OPS:
-            return self.__eval_bin_op(expr_ast)
-        
-        # Handle unary operators
-        if expr_ast.elem_type in Interpreter.UNR_OPS:
-            return self.__eval_unary_op(expr_ast)
 
-        # Handle comparison operators
-        if expr_ast.elem_type in Interpreter.COM_OPS:
-            return self.__eval_comp_op(expr_ast)
+        return self.expr_handlers[expr_ast.kind](expr_ast)
 
     # Evaluates unary operation.
     def __eval_unary_op(self, arith_ast):
@@ -345,7 +359,20 @@ class Interpreter(InterpreterBase):
         # Conclude the expressions to be evaluated.
         left_value_obj = self.__eval_expr(arith_ast.get("op1"))
         right_value_obj = self.__eval_expr(arith_ast.get("op2"))
+        return self.__apply_comp_op(arith_ast, left_value_obj, right_value_obj)
 
+    # Evaluates && and || in short-circuit mode. A false left operand of && (or a true
+    # one of ||) is the result, and the right operand is never evaluated; any other left
+    # operand is checked against the right one as usual.
+    def __eval_short_circuit_op(self, arith_ast):
+        left_value_obj = self.__eval_expr(arith_ast.get("op1"))
+        if left_value_obj.type() == Type.BOOL and left_value_obj.value() == (arith_ast.elem_type == "||"):
+            return Value(Type.BOOL, left_value_obj.value())
+        right_value_obj = self.__eval_expr(arith_ast.get("op2"))
+        return self.__apply_comp_op(arith_ast, left_value_obj, right_value_obj)
+
+    # Applies a comparison operator to its evaluated operands
+    def __apply_comp_op(self, arith_ast, left_value_obj, right_value_obj):
         # Handle special case for '==' and '!='
         if arith_ast.elem_type == "==" or arith_ast.elem_type == "!=":
             f = self.op_to_lambda[Type.BOOL][arith_ast.elem_type]
@@ -389,6 +416,30 @@ class Interpreter(InterpreterBase):
             #                           KEY : VALUE = ARGLEN : FUNC_NODE
 
     # Set up various operators to be called upon in dictionary
+    # Statements and expressions are dispatched through tables indexed by node kind
+    def __setup_handlers(self):
+        self.statement_handlers = kind_table({
+            InterpreterBase.FCALL_DEF: self.__exec_call,
+            "=": self.__exec_assign,
+            "if": self.__exec_if,
+            "while": self.__exec_while,
+            "return": self.__exec_return,
+        })
+
+        expr_handlers = {}
+        # Handle binary operators
+        for oper in Interpreter.BIN_OPS:
+            expr_handlers[oper] = self.__eval_bin_op
+        # Handle unary operators
+        for oper in Interpreter.UNR_OPS:
+            expr_handlers[oper] = self.__eval_unary_op
+        # Handle comparison operators
+        for oper in Interpreter.COM_OPS:
+            expr_handlers[oper] = self.__eval_comp_op
+        if self.short_circuit:
+            expr_handlers["&&"] = expr_handlers["||"] = self.__eval_short_circuit_op
+        self.expr_handlers = kind_table(expr_handlers, default=lambda expr_ast: None)
+
     def __setup_ops(self):
         # Instantiate the dictionary of OPERATORS_FOR_EACH_TYPE
         self.op_to_lambda = {}
@@ -0,0 +1,10 @@
+# lextab.py. This file automatically created by PLY (version 3.11). Don't edit!
+_tabversion   = '3.10'
+_lextokens    = set(('AND', 'ASSIGN', 'AT', 'COMMA', 'DIVIDE', 'DOT', 'ELSE', 'EQ', 'FALSE', 'FUNC', 'GREATER', 'GREATER_EQ', 'IF', 'LAMBDA', 'LBRACE', 'LESS', 'LESS_EQ', 'LPAREN', 'MINUS', 'MULTIPLY', 'NAME', 'NIL', 'NOT', 'NOT_EQ', 'NUMBER', 'OR', 'PLUS', 'RBRACE', 'REF', 'RETURN', 'RPAREN', 'SEMI', 'STRING', 'TRUE', 'WHILE'))
+_lexreflags   = 64
+_lexliterals  = '=+-*/(),{};><".!@'
+_lexstateinfo = {'INITIAL': 'inclusive'}
+_lexstatere   = {'INITIAL': [('(?P<t_NUMBER>\\d+)|(?P<t_NAME>[A-Za-z_][\\w_]*)|(?P<t_newline>\\n+)|(?P<t_comment>/\\*(.|\\n)*?\\*/)|(?P<t_STRING>".*?")|(?P<t_OR>\\|\\|)|(?P<t_LPAREN>\\()|(?P<t_RPAREN>\\))|(?P<t_LBRACE>\\{)|(?P<t_RBRACE>\\})|(?P<t_DOT>\\.)|(?P<t_EQ>==)|(?P<t_GREATER_EQ>>=)|(?P<t_LESS_EQ><=)|(?P<t_NOT_EQ>!=)|(?P<t_PLUS>\\+)|(?P<t_MINUS>\\-)|(?P<t_MULTIPLY>\\*)|(?P<t_AT>\\@)|(?P<t_AND>&&)|(?P<t_COMMA>,)|(?P<t_SEMI>;)|(?P<t_GREATER>>)|(?P<t_LESS><)|(?P<t_ASSIGN>=)|(?P<t_DIVIDE>/)|(?P<t_NOT>!)', [None, ('t_NUMBER', 'NUMBER'), ('t_NAME', 'NAME'), ('t_newline', 'newline'), ('t_comment', 'comment'), None, ('t_STRING', 'STRING'), (None, 'OR'), (None, 'LPAREN'), (None, 'RPAREN'), (None, 'LBRACE'), (None, 'RBRACE'), (None, 'DOT'), (None, 'EQ'), (None, 'GREATER_EQ'), (None, 'LESS_EQ'), (None, 'NOT_EQ'), (None, 'PLUS'), (None, 'MINUS'), (None, 'MULTIPLY'), (None, 'AT'), (None, 'AND'), (None, 'COMMA'), (None, 'SEMI'), (None, 'GREATER'), (None, 'LESS'), (None, 'ASSIGN'), (None, 'DIVIDE'), (None, 'NOT')])]}
+_lexstateignore = {'INITIAL': ' \t'}
+_lexstateerrorf = {'INITIAL': 't_error'}
+_lexstateeoff = {}
@@ -1,3 +1,5 @@
+import os
+
 from ply import lex
 
 reserved = (
@@ -126,5 +128,19 @@ def t_error(t):
     t.lexer.skip(1)
 
 
+# Set BREWIN_FAST_STARTUP in the environment to load the lexer and the parser from their
+# precomputed tables (lextab.py and parsetab.py) without checking them against the rules,
+# which saves validating every rule and building the master regex from them on each
+# import. The tables are only as current as the last time they were written: after
+# changing the rules, run this file to rewrite lextab.py, and import brewparse without
+# BREWIN_FAST_STARTUP to rewrite parsetab.py.
+FAST_STARTUP = bool(os.environ.get("BREWIN_FAST_STARTUP"))
+
 # Build the lexer
-lex.lex()
+if FAST_STARTUP:
+    lex.lex(optimize=True, lextab="lextab")
+else:
+    lex.lex()
+
+if __name__ == "__main__":
+    lex.lexer.writetab("lextab", os.path.dirname(os.path.abspath(__file__)))
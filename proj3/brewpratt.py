@@ -0,0 +1,289 @@
+# A recursive-descent parser for Brewin, with Pratt-style precedence climbing for
+# expressions, that builds the same Element trees as the PLY grammar in brewparse from
+# the same (brewscan) tokens, without the LALR driver's symbol stacks and a production
+# object for every reduction. Like the LALR parser it never looks more than one token
+# ahead, so it finds a syntax error at the same token. Nested blocks, parentheses and
+# unary operators recurse in Python, so how deep they can nest is up to the recursion
+# limit; a long run of binary operators doesn't nest.
+#
+# It also recovers from syntax errors the way PLY does for a grammar without error
+# rules: report the error (unless the last one was less than three tokens ago), throw
+# away everything parsed so far along with the offending token, skip to the next func
+# and parse the rest of the program from there. A program with an error can therefore
+# still come back as the functions after it, exactly as from the PLY parser.
+import functools
+
+from brewscan import Lexer, Token
+from element import (
+    Argument, Assignment, BinaryOp, Element, Function, FunctionCall, If, Lambda, Literal,
+    MethodCall, Program, Return, UnaryOp, Variable, While,
+)
+from intbase import InterpreterBase
+
+# how tightly each binary operator binds, from brewparse's precedence table; all are
+# left associative. The operand of a unary operator binds tighter than any of them.
+BINARY_POWER = {
+    "OR": 1,
+    "AND": 2,
+    "GREATER_EQ": 3, "GREATER": 3, "LESS_EQ": 3, "LESS": 3, "EQ": 3, "NOT_EQ": 3,
+    "PLUS": 4, "MINUS": 4,
+    "MULTIPLY": 5, "DIVIDE": 5,
+}
+UNARY_POWER = 6
+
+# the lookahead once the tokens run out
+END = Token()
+END.type = "$end"
+END.value = None
+
+# PLY only reports an error once this many tokens have been shifted since the last one
+ERROR_COUNT = 3
+
+
+class ParseError(Exception):
+    pass
+
+
+class Parser:
+    def __init__(self):
+        self.lookahead = END
+        self.shifted = 0
+
+    # the program's AST, or None if it has a syntax error PLY couldn't recover from
+    def parse(self, program, lexer=None):
+        if lexer is None:
+            lexer = Lexer()
+        lexer.input(program)
+        self.start(iter(lexer))
+        reported = False
+        while True:
+            start = self.shifted
+            try:
+                return self.program()
+            except ParseError:
+                pass
+            if not reported or self.shifted - start >= ERROR_COUNT:
+                if self.lookahead is END:
+                    print("Syntax error at EOF")
+                else:
+                    print(f"Syntax error at '{self.lookahead.value}'")
+            reported = True
+            # only a func can start the program again
+            while self.lookahead is not END:
+                self.lookahead = self.next_token()
+                if self.lookahead.type == "FUNC":
+                    break
+            if self.lookahead is END:
+                return None
+
+    # the functions in a run of tokens, raising ParseError at the first syntax error
+    # rather than reporting it and recovering
+    def parse_functions(self, tokens):
+        self.start(tokens)
+        functions = []
+        while self.lookahead is not END:
+            functions.append(self.function())
+        return functions
+
+    def start(self, tokens):
+        self.next_token = functools.partial(next, tokens, END)
+        self.lookahead = self.next_token()
+        self.shifted = 0
+
+    def advance(self):
+        token = self.lookahead
+        self.lookahead = self.next_token()
+        self.shifted += 1
+        return token
+
+    def expect(self, token_type):
+        if self.lookahead.type != token_type:
+            raise ParseError()
+        return self.advance()
+
+    def program(self):
+        functions = [self.function()]
+        while self.lookahead is not END:
+            functions.append(self.function())
+        return Program(functions)
+
+    def function(self):
+        start = self.expect("FUNC").lexpos
+        name = self.expect("NAME").value
+        args = self.formal_args()
+        self.expect("LBRACE")
+        statements = self.statements()
+        end = self.expect("RBRACE").lexpos + 1
+        return Function(name, args, statements, start, end)
+
+    def lambda_expression(self):
+        self.expect("LAMBDA")
+        args = self.formal_args()
+        self.expect("LBRACE")
+        statements = self.statements()
+        self.expect("RBRACE")
+        return Lambda(args, statements)
+
+    # the parenthesized formal arguments of a func or lambda
+    def formal_args(self):
+        self.expect("LPAREN")
+        args = []
+        if self.lookahead.type != "RPAREN":
+            args.append(self.formal_arg())
+            while self.lookahead.type == "COMMA":
+                self.advance()
+                args.append(self.formal_arg())
+        self.expect("RPAREN")
+        return args
+
+    def formal_arg(self):
+        if self.lookahead.type == "REF":
+            self.advance()
+            return Argument(InterpreterBase.REFARG_DEF, self.expect("NAME").value)
+        return Argument(InterpreterBase.ARG_DEF, self.expect("NAME").value)
+
+    # one or more statements, up to the closing brace
+    def statements(self):
+        statements = [self.statement()]
+        while self.lookahead.type != "RBRACE":
+            statements.append(self.statement())
+        return statements
+
+    def statement(self):
+        token_type = self.lookahead.type
+        if token_type == "NAME":
+            statement = self.name_statement()
+        elif token_type == "IF":
+            return self.if_statement()
+        elif token_type == "WHILE":
+            self.advance()
+            self.expect("LPAREN")
+            condition = self.expression(0)
+            self.expect("RPAREN")
+            self.expect("LBRACE")
+            statements = self.statements()
+            self.expect("RBRACE")
+            return While(condition, statements)
+        elif token_type == "RETURN":
+            self.advance()
+            if self.lookahead.type == "SEMI":
+                statement = Return(None)
+            else:
+                statement = Return(self.expression(0))
+        else:
+            statement = self.expression(0)
+        self.expect("SEMI")
+        return statement
+
+    def if_statement(self):
+        self.advance()
+        self.expect("LPAREN")
+        condition = self.expression(0)
+        self.expect("RPAREN")
+        self.expect("LBRACE")
+        statements = self.statements()
+        self.expect("RBRACE")
+        if self.lookahead.type != "ELSE":
+            return If(condition, statements, None)
+        self.advance()
+        self.expect("LBRACE")
+        else_statements = self.statements()
+        self.expect("RBRACE")
+        return If(condition, statements, else_statements)
+
+    # a statement that starts with a name: an assignment to a variable or field, or an
+    # expression that starts with one. Telling them apart takes no more lookahead than
+    # the LALR parser has.
+    def name_statement(self):
+        name = self.advance().value
+        token_type = self.lookahead.type
+        if token_type == "ASSIGN":
+            self.advance()
+            return Assignment(name, self.expression(0))
+        if token_type == "DOT":
+            self.advance()
+            member = self.expect("NAME").value
+            if self.lookahead.type == "ASSIGN":
+                self.advance()
+                return Assignment(name + "." + member, self.expression(0))
+            left = self.member_expression(name, member)
+        else:
+            left = self.name_expression(name)
+        return self.infix(left, 0)
+
+    # an expression whose operators all bind more tightly than min_power
+    def expression(self, min_power):
+        token = self.lookahead
+        token_type = token.type
+        if token_type == "NAME":
+            self.advance()
+            left = self.name_expression(token.value)
+        elif token_type == "NUMBER":
+            self.advance()
+            left = Literal(InterpreterBase.INT_DEF, token.value)
+        elif token_type == "STRING":
+            self.advance()
+            left = Literal(InterpreterBase.STRING_DEF, token.value)
+        elif token_type == "LPAREN":
+            self.advance()
+            left = self.expression(0)
+            self.expect("RPAREN")
+        elif token_type == "MINUS":
+            self.advance()
+            left = UnaryOp(InterpreterBase.NEG_DEF, self.expression(UNARY_POWER))
+        elif token_type == "NOT":
+            self.advance()
+            left = UnaryOp(InterpreterBase.NOT_DEF, self.expression(UNARY_POWER))
+        elif token_type == "TRUE" or token_type == "FALSE":
+            self.advance()
+            left = Literal(InterpreterBase.BOOL_DEF, token.value == InterpreterBase.TRUE_DEF)
+        elif token_type == "NIL":
+            self.advance()
+            left = Element(InterpreterBase.NIL_DEF)
+        elif token_type == "AT":
+            self.advance()
+            left = Element(InterpreterBase.OBJ_DEF)
+        elif token_type == "LAMBDA":
+            left = self.lambda_expression()
+        else:
+            raise ParseError()
+        return self.infix(left, min_power)
+
+    # left followed by any binary operators that bind more tightly than min_power
+    def infix(self, left, min_power):
+        while True:
+            power = BINARY_POWER.get(self.lookahead.type)
+            if power is None or power <= min_power:
+                return left
+            operator = self.advance().value
+            left = BinaryOp(operator, left, self.expression(power))
+
+    # a variable, function call, field or method call, after its first name
+    def name_expression(self, name):
+        token_type = self.lookahead.type
+        if token_type == "LPAREN":
+            return FunctionCall(name, self.call_args())
+        if token_type == "DOT":
+            self.advance()
+            return self.member_expression(name, self.expect("NAME").value)
+        return Variable(name)
+
+    def member_expression(self, name, member):
+        if self.lookahead.type == "LPAREN":
+            return MethodCall(name, member, self.call_args())
+        return Variable(name + "." + member)
+
+    def call_args(self):
+        self.expect("LPAREN")
+        args = []
+        if self.lookahead.type != "RPAREN":
+            args.append(self.expression(0))
+            while self.lookahead.type == "COMMA":
+                self.advance()
+                args.append(self.expression(0))
+        self.expect("RPAREN")
+        return args
+
+
+def parse(program):
+    return Parser().parse(program)
@@ -115,3 +115,26 @@ class EnvironmentManager:
     # used when we exit a nested block to discard the environment for that block
     def pop(self):
         self.environment.pop()
+
+    # the number of environments currently pushed
+    def depth(self):
+        return len(self.environment)
+
+    # pops environments until only depth of them are left
+    def pop_to(self, depth):
+        del self.environment[depth:]
+
+    # whether the top-most environment hides every variable in the environments from depth
+    # up to it, and has no refargs that would assign through to them
+    def top_hides(self, depth):
+        top_vars, top_refargs = self.environment[-1]
+        if top_refargs:
+            return False
+        for env in self.environment[depth:-1]:
+            if not env[0].keys() <= top_vars.keys():
+                return False
+        return True
+
+    # discards the environments from depth up to, but not including, the top-most one
+    def discard_below_top(self, depth):
+        del self.environment[depth:-1]
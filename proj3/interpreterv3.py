@@ -1,7 +1,9 @@
 import copy
+import weakref
 from enum import Enum
 
 from brewparse import parse_program
+from element import kind_table
 from env_v2 import EnvironmentManager
 from intbase import InterpreterBase, ErrorType
 from type_valuev2 import Type, Value, create_value, get_printable
@@ -11,6 +13,16 @@ TRACE_OUTPUT = False
 class ExecStatus(Enum):
     CONTINUE = 1
     RETURN = 2
+    TAIL_CALL = 3  # return f(...): the value is the AST of the function still to run
+
+
+# what a compiled return f(...) gives back in the closure engine: the function still to
+# run, whose environment and arguments are already set up
+class TailCall:
+    __slots__ = ("func_ast",)
+
+    def __init__(self, func_ast):
+        self.func_ast = func_ast
 
 
 # Main interpreter class
@@ -19,23 +31,56 @@ class Interpreter(InterpreterBase):
     NIL_VALUE = create_value(InterpreterBase.NIL_DEF)
     TRUE_VALUE = create_value(InterpreterBase.TRUE_DEF)
     BIN_OPS = {"+", "-", "*", "/", "==", "!=", ">", ">=", "<", "<=", "||", "&&"}
+    LITERAL_TYPES = {
+        InterpreterBase.INT_DEF: Type.INT,
+        InterpreterBase.STRING_DEF: Type.STRING,
+        InterpreterBase.BOOL_DEF: Type.BOOL,
+    }
+    UNARY_OPS = {
+        InterpreterBase.NEG_DEF: (Type.INT, lambda x: -1 * x),
+        InterpreterBase.NOT_DEF: (Type.BOOL, lambda x: not x),
+    }
+    # "tree" walks the AST directly, "closure" compiles each AST node into a Python closure first
+    ENGINES = {"tree", "closure"}
+    # functions __call_func handles itself instead of running one of the program's
+    BUILTIN_FUNCS = {"print", "inputi", "inputs"}
 
     # methods
-    def __init__(self, console_output=True, inp=None, trace_output=TRACE_OUTPUT):
-        super().__init__(console_output, inp)
+    # short_circuit makes && and || skip their right operand when the left one decides
+    # the result (by default both operands are always evaluated)
+    def __init__(self, console_output=True, inp=None, trace_output=TRACE_OUTPUT, engine="tree",
+                 short_circuit=False, output_sink=None):
+        super().__init__(console_output, inp, output_sink)
+        if engine not in Interpreter.ENGINES:
+            raise ValueError(f"Unknown engine {engine}")
         self.trace_output = trace_output
+        self.engine = engine
+        self.short_circuit = short_circuit
         self.__setup_ops()
+        self.__setup_handlers()
 
     # run a program that's provided in a string
     # usese the provided Parser found in brewparse.py to parse the program
     # into an abstract syntax tree (ast)
     def run(self, program):
-        ast = parse_program(program)
-        self.lambda_functions = []
-        self.__set_up_function_table(ast)
-        self.env = EnvironmentManager()
-        main_func = self.__get_func_by_name("main", 0)
-        self.__run_statements(main_func.get("statements"))
+        try:
+            ast = parse_program(program)
+            self.lambda_functions = []
+            self.__set_up_function_table(ast)
+            self.env = EnvironmentManager()
+            main_func = self.__get_func_by_name("main", 0)
+            # main is entered like any other call, so a return f(...) in it is run by the
+            # call loop
+            self.env.push()
+            if self.engine == "closure":
+                # lambdas are deep copied (AST included) whenever their value is, so key
+                # compiled bodies weakly to let those copies be collected
+                self.compiled_bodies = weakref.WeakKeyDictionary()
+                self.__run_compiled(main_func)
+            else:
+                self.__run_function(main_func)
+        finally:
+            super().flush_output()
 
     def __set_up_function_table(self, ast):
         self.func_name_to_ast = {}
@@ -73,34 +118,38 @@ class Interpreter(InterpreterBase):
         for statement in statements:
             if self.trace_output:
                 print(statement)
-            status = ExecStatus.CONTINUE
-            if statement.elem_type == InterpreterBase.FCALL_DEF:
-                self.__call_func(statement)
-            elif statement.elem_type == "=":
-                self.__assign(statement)
-            elif statement.elem_type == InterpreterBase.RETURN_DEF:
-                status, return_val = self.__do_return(statement)
-
-                # Find out if returned val_obj is a Lambda
-                if statement.get("expression").get("name"):
-                    if self.env.get(statement.get("expression").get("name")):
-                        if self.env.get(statement.get("expression").get("name")).value():
-                            if self.env.get(statement.get("expression").get("name")).value().elem_type == InterpreterBase.LAMBDA_DEF:
-                                self.lambda_functions.append(statement.get("expression").get("name"))
-                
-                
-            elif statement.elem_type == Interpreter.IF_DEF:
-                status, return_val = self.__do_if(statement)
-            elif statement.elem_type == Interpreter.WHILE_DEF:
-                status, return_val = self.__do_while(statement)
-
-            if status == ExecStatus.RETURN:
-                self.env.pop()
-                return (status, return_val)
+            handler = self.statement_handlers[statement.kind]
+            if handler is None:
+                continue
+            result = handler(statement)
+            if result is not None and result[0] != ExecStatus.CONTINUE:
+                # a pending tail call still sees this scope; __run_function pops it
+                if result[0] == ExecStatus.RETURN:
+                    self.env.pop()
+                return result
 
         self.env.pop()
         return (ExecStatus.CONTINUE, Interpreter.NIL_VALUE)
 
+    # a call used as a statement; its value is discarded
+    def __exec_call(self, call_node):
+        self.__call_func(call_node)
+
+    def __exec_return(self, return_ast):
+        result = self.__do_return(return_ast)
+        # a tail call never returns a lambda through a variable (see __is_tail_call)
+        if result[0] == ExecStatus.RETURN:
+            self.__track_returned_lambda(return_ast)
+        return result
+
+    def __track_returned_lambda(self, return_ast):
+        # Find out if returned val_obj is a Lambda
+        if return_ast.get("expression").get("name"):
+            if self.env.get(return_ast.get("expression").get("name")):
+                if self.env.get(return_ast.get("expression").get("name")).value():
+                    if self.env.get(return_ast.get("expression").get("name")).value().elem_type == InterpreterBase.LAMBDA_DEF:
+                        self.lambda_functions.append(return_ast.get("expression").get("name"))
+
     def __call_func(self, call_node):
         func_name = call_node.get("name")
         if func_name == "print":
@@ -110,6 +159,48 @@ class Interpreter(InterpreterBase):
         if func_name == "inputs":
             return self.__call_input(call_node)
 
+        func_ast = self.__enter_call(call_node)
+        self.__bind_args(func_ast, call_node)
+        return self.__run_function(func_ast)
+
+    # Runs the body of a function whose environment __enter_call has pushed. When the
+    # body ends with a tail call (see __do_return), the callee runs in this same loop
+    # instead of a nested Python call, so tail recursion is limited by memory rather than
+    # the Python stack. Scoping is dynamic, so the caller's environments stay visible to
+    # the callee; they are only dropped early when the callee's own environment hides
+    # every one of their variables.
+    def __run_function(self, func_ast):
+        env = self.env
+        base = frame_base = env.depth() - 1
+        tail_called = False
+        while True:
+            status, return_val = self.__run_statements(func_ast.get("statements"))
+            if status != ExecStatus.TAIL_CALL:
+                break
+            func_ast = return_val
+            tail_called = True
+            if env.top_hides(frame_base):
+                env.discard_below_top(frame_base)
+            else:
+                frame_base = env.depth() - 1
+        env.pop_to(base)
+        if tail_called:
+            # the copy the caller's own return would have made
+            return copy.deepcopy(return_val)
+        return return_val
+
+    # only calls to functions defined by the program are run as tail calls; calls through
+    # variables holding lambdas keep the lambda bookkeeping in __track_returned_lambda
+    def __is_tail_call(self, expr_ast):
+        return (
+            expr_ast.elem_type == InterpreterBase.FCALL_DEF
+            and expr_ast.get("name") not in Interpreter.BUILTIN_FUNCS
+            and self.env.get(expr_ast.get("name")) is None
+        )
+
+    # finds the called function and pushes the environment its arguments are added to
+    def __enter_call(self, call_node):
+        func_name = call_node.get("name")
         actual_args = call_node.get("args")
         func_ast = self.__get_func_by_name(func_name, len(actual_args))
         formal_args = func_ast.get("args")
@@ -132,20 +223,21 @@ class Interpreter(InterpreterBase):
             self.env.push_new_env(found_env)
         else:
             self.env.push()
-        
-        # Add arguments to environment
-        for formal_ast, actual_ast in zip(formal_args, actual_args):
-            result = copy.deepcopy(self.__eval_expr(actual_ast))
-            arg_name = formal_ast.get("name")
-            self.env.create(arg_name, result)
+        return func_ast
 
-            # Append refarg to list of refarged variables
-            if formal_ast.elem_type == InterpreterBase.REFARG_DEF and actual_ast.elem_type == InterpreterBase.VAR_DEF:
-                self.env.add_refarg(arg_name, actual_ast.get("name"))
+    # adds the arguments of a call to the environment __enter_call pushed
+    def __bind_args(self, func_ast, call_node):
+        for formal_ast, actual_ast in zip(func_ast.get("args"), call_node.get("args")):
+            self.__bind_param(formal_ast, actual_ast, self.__eval_expr(actual_ast))
 
-        _, return_val = self.__run_statements(func_ast.get("statements"))
-        self.env.pop()
-        return return_val
+    def __bind_param(self, formal_ast, actual_ast, value_obj):
+        result = copy.deepcopy(value_obj)
+        arg_name = formal_ast.get("name")
+        self.env.create(arg_name, result)
+
+        # Append refarg to list of refarged variables
+        if formal_ast.elem_type == InterpreterBase.REFARG_DEF and actual_ast.elem_type == InterpreterBase.VAR_DEF:
+            self.env.add_refarg(arg_name, actual_ast.get("name"))
 
     def __call_print(self, call_ast):
         output = ""
@@ -171,8 +263,10 @@ class Interpreter(InterpreterBase):
             return Value(Type.STRING, inp)
 
     def __assign(self, assign_ast):
+        self.__assign_value(assign_ast, self.__eval_expr(assign_ast.get("expression")))
+
+    def __assign_value(self, assign_ast, value_obj):
         var_name = assign_ast.get("name")
-        value_obj = self.__eval_expr(assign_ast.get("expression"))
 
         # Handle Lambda assignment
         if value_obj.type() == Type.FUNC and value_obj.value().elem_type == InterpreterBase.LAMBDA_DEF:
@@ -193,69 +287,99 @@ class Interpreter(InterpreterBase):
         self.env.set(var_name, value_obj)
 
     def __eval_expr(self, expr_ast):
-        if expr_ast.elem_type == InterpreterBase.NIL_DEF:
-            # print("getting as nil")
-            return Interpreter.NIL_VALUE
-        if expr_ast.elem_type == InterpreterBase.INT_DEF:
-            return Value(Type.INT, expr_ast.get("val"))
-        if expr_ast.elem_type == InterpreterBase.STRING_DEF:
-            # print("getting as str")
-            return Value(Type.STRING, expr_ast.get("val"))
-        if expr_ast.elem_type == InterpreterBase.BOOL_DEF:
-            return Value(Type.BOOL, expr_ast.get("val"))
-
-        # Must conditionally evaluate for function assignment
-        if expr_ast.elem_type == InterpreterBase.VAR_DEF:
-            var_name = expr_ast.get("name")
-            val = None
-            if var_name in self.func_name_to_ast and self.env.get(var_name) != None:
-                super().error(ErrorType.NAME_ERROR, f"'{var_name}' is both function and variable.")
-            
-            # Variable assignment
-            if self.env.get(var_name):
-                val = self.env.get(var_name)
-                    
-            
-            # Function assignment
-            if var_name in self.func_name_to_ast:
-                pot_args = list(self.func_name_to_ast[var_name].keys())
-                if len(pot_args) != 1:
-                    super().error(ErrorType.NAME_ERROR, f"Assignment of '{var_name}' is overloaded")
-                val = Value(Type.FUNC, (self.func_name_to_ast[var_name][pot_args[0]]))
-            
-            if val is None:
-                super().error(ErrorType.NAME_ERROR, f"Variable or function {var_name} not found")
-            return val
+        return self.expr_handlers[expr_ast.kind](expr_ast)
+
+    # the tree engine dispatches statements and expressions through tables indexed by node kind
+    def __setup_handlers(self):
+        # a handler returns None, or (ExecStatus, return value) for control flow
+        self.statement_handlers = kind_table({
+            InterpreterBase.FCALL_DEF: self.__exec_call,
+            "=": self.__assign,
+            InterpreterBase.RETURN_DEF: self.__exec_return,
+            InterpreterBase.IF_DEF: self.__do_if,
+            InterpreterBase.WHILE_DEF: self.__do_while,
+        })
+
+        expr_handlers = {
+            InterpreterBase.NIL_DEF: lambda expr_ast: Interpreter.NIL_VALUE,
+            InterpreterBase.INT_DEF: lambda expr_ast: Value(Type.INT, expr_ast.get("val")),
+            InterpreterBase.STRING_DEF: lambda expr_ast: Value(Type.STRING, expr_ast.get("val")),
+            InterpreterBase.BOOL_DEF: lambda expr_ast: Value(Type.BOOL, expr_ast.get("val")),
+            # Must conditionally evaluate for function assignment
+            InterpreterBase.VAR_DEF: lambda expr_ast: self.__eval_name(expr_ast.get("name")),
+            InterpreterBase.LAMBDA_DEF: lambda expr_ast: Value(Type.FUNC, copy.deepcopy(expr_ast)),
+            InterpreterBase.FCALL_DEF: self.__call_func,
+        }
+        for oper in Interpreter.BIN_OPS:
+            expr_handlers[oper] = self.__eval_op
+        if self.short_circuit:
+            expr_handlers["&&"] = expr_handlers["||"] = self.__eval_short_circuit
+        for oper, (t, f) in Interpreter.UNARY_OPS.items():
+            expr_handlers[oper] = lambda expr_ast, t=t, f=f: self.__eval_unary(expr_ast, t, f)
+        self.expr_handlers = kind_table(expr_handlers, default=lambda expr_ast: None)
+
+    def __eval_name(self, var_name):
+        val = None
+        if var_name in self.func_name_to_ast and self.env.get(var_name) != None:
+            super().error(ErrorType.NAME_ERROR, f"'{var_name}' is both function and variable.")
+        
+        # Variable assignment
+        if self.env.get(var_name):
+            val = self.env.get(var_name)
+                
+        
+        # Function assignment
+        if var_name in self.func_name_to_ast:
+            pot_args = list(self.func_name_to_ast[var_name].keys())
+            if len(pot_args) != 1:
+                super().error(ErrorType.NAME_ERROR, f"Assignment of '{var_name}' is overloaded")
+            val = Value(Type.FUNC, (self.func_name_to_ast[var_name][pot_args[0]]))
         
-        if expr_ast.elem_type == InterpreterBase.LAMBDA_DEF:
-            return Value(Type.FUNC, copy.deepcopy(expr_ast))
-        if expr_ast.elem_type == InterpreterBase.FCALL_DEF:
-            return self.__call_func(expr_ast)
-        if expr_ast.elem_type in Interpreter.BIN_OPS:
-            return self.__eval_op(expr_ast)
-        if expr_ast.elem_type == Interpreter.NEG_DEF:
-            return self.__eval_unary(expr_ast, Type.INT, lambda x: -1 * x)
-        if expr_ast.elem_type == Interpreter.NOT_DEF:
-            return self.__eval_unary(expr_ast, Type.BOOL, lambda x: not x)
+        if val is None:
+            super().error(ErrorType.NAME_ERROR, f"Variable or function {var_name} not found")
+        return val
 
     def __eval_op(self, arith_ast):
         left_value_obj = self.__eval_expr(arith_ast.get("op1"))
         right_value_obj = self.__eval_expr(arith_ast.get("op2"))
+        return self.__apply_op(arith_ast.elem_type, left_value_obj, right_value_obj)
+
+    def __eval_short_circuit(self, arith_ast):
+        left_value_obj = self.__eval_expr(arith_ast.get("op1"))
+        result = Interpreter.__decided_by(arith_ast.elem_type, left_value_obj)
+        if result is not None:
+            return result
+        right_value_obj = self.__eval_expr(arith_ast.get("op2"))
+        return self.__apply_op(arith_ast.elem_type, left_value_obj, right_value_obj)
+
+    # the result of && or || when its left operand decides it alone (false for &&, true
+    # for ||, ints counting as bools as in __coercion_check), otherwise None. Any other
+    # type needs the right operand evaluated too, and then fails as it always did.
+    @staticmethod
+    def __decided_by(oper, left_value_obj):
+        if left_value_obj.type() != Type.BOOL and left_value_obj.type() != Type.INT:
+            return None
+        truth = bool(left_value_obj.value())
+        if truth == (oper == "||"):
+            return Value(Type.BOOL, truth)
+        return None
+
+    def __apply_op(self, oper, left_value_obj, right_value_obj):
         # Perform type coercions if necessary
-        left_value_obj, right_value_obj = self.__coercion_check(left_value_obj, right_value_obj, arith_ast)
+        left_value_obj, right_value_obj = self.__coercion_check(left_value_obj, right_value_obj, oper)
         if not self.__compatible_types(
-            arith_ast.elem_type, left_value_obj, right_value_obj
+            oper, left_value_obj, right_value_obj
         ):
             super().error(
                 ErrorType.TYPE_ERROR,
-                f"Incompatible types {left_value_obj.type()} and {right_value_obj.type()}for {arith_ast.elem_type} operation",
+                f"Incompatible types {left_value_obj.type()} and {right_value_obj.type()}for {oper} operation",
             )
-        if arith_ast.elem_type not in self.op_to_lambda[left_value_obj.type()]:
+        if oper not in self.op_to_lambda[left_value_obj.type()]:
             super().error(
                 ErrorType.TYPE_ERROR,
-                f"Incompatible operator {arith_ast.elem_type} for type {left_value_obj.type()}",
+                f"Incompatible operator {oper} for type {left_value_obj.type()}",
             )
-        f = self.op_to_lambda[left_value_obj.type()][arith_ast.elem_type]
+        f = self.op_to_lambda[left_value_obj.type()][oper]
         return f(left_value_obj, right_value_obj)
 
     def __compatible_types(self, oper, obj1, obj2):
@@ -264,20 +388,20 @@ class Interpreter(InterpreterBase):
             return True
         return obj1.type() == obj2.type()
 
-    def __coercion_check(self, left_value_obj, right_value_obj, arith_ast):
+    def __coercion_check(self, left_value_obj, right_value_obj, oper):
         # Perform necessary coercions
         # Boolean Conversions
-        if arith_ast.elem_type in ["&&", "||"]:
+        if oper in ["&&", "||"]:
             left_value_obj = self.__coerce_val(left_value_obj, Type.BOOL)
             right_value_obj = self.__coerce_val(right_value_obj, Type.BOOL)
         # Int to Bool value comparison Conversions
-        if arith_ast.elem_type in ["==", "!="] and left_value_obj.type() != right_value_obj.type():
+        if oper in ["==", "!="] and left_value_obj.type() != right_value_obj.type():
             if ((left_value_obj.type() == Type.BOOL and right_value_obj.type() == Type.INT) or 
                 (left_value_obj.type() == Type.INT and right_value_obj.type() == Type.BOOL)):
                 left_value_obj = self.__coerce_val(left_value_obj, Type.BOOL)
                 right_value_obj = self.__coerce_val(right_value_obj, Type.BOOL)
         # Bool to Int for binary operands
-        if arith_ast.elem_type in ["+", "-", "*", "/"]:
+        if oper in ["+", "-", "*", "/"]:
             if left_value_obj.type() == Type.BOOL or right_value_obj.type() == Type.BOOL:
                 left_value_obj = self.__coerce_val(left_value_obj, Type.INT)
                 right_value_obj = self.__coerce_val(right_value_obj, Type.INT)
@@ -304,7 +428,9 @@ class Interpreter(InterpreterBase):
 
     def __eval_unary(self, arith_ast, t, f):
         value_obj = self.__eval_expr(arith_ast.get("op1"))
+        return self.__apply_unary(arith_ast.elem_type, value_obj, t, f)
 
+    def __apply_unary(self, oper, value_obj, t, f):
         # Coerce Int to Bool for logical negation.
         if value_obj.type() == Type.INT:
             value_obj = self.__coerce_val(value_obj, t)
@@ -313,7 +439,7 @@ class Interpreter(InterpreterBase):
         if value_obj.type() != t:
             super().error(
                 ErrorType.TYPE_ERROR,
-                f"Incompatible type for {arith_ast.elem_type} operation",
+                f"Incompatible type for {oper} operation",
             )
         return Value(t, f(value_obj.value()))
 
@@ -425,16 +551,7 @@ class Interpreter(InterpreterBase):
 
     def __do_if(self, if_ast):
         cond_ast = if_ast.get("condition")
-        result = self.__eval_expr(cond_ast)
-        
-        if result.type() != Type.BOOL:
-            if result.type() == Type.INT:
-                result = self.__coerce_val(result, Type.BOOL)
-            else:
-                super().error(
-                    ErrorType.TYPE_ERROR,
-                    "Incompatible type for if condition",
-                )
+        result = self.__check_condition(self.__eval_expr(cond_ast), Interpreter.IF_DEF)
         if result.value():
             statements = if_ast.get("statements")
             status, return_val = self.__run_statements(statements)
@@ -451,29 +568,267 @@ class Interpreter(InterpreterBase):
         cond_ast = while_ast.get("condition")
         run_while = Interpreter.TRUE_VALUE
         while run_while.value():
-            run_while = self.__eval_expr(cond_ast)
-            if run_while.type() != Type.BOOL:
-                if run_while.type() == Type.INT:
-                    run_while = self.__coerce_val(run_while, Type.BOOL)
-                else:
-                    super().error(
-                        ErrorType.TYPE_ERROR,
-                        "Incompatible type for while condition",
-                    )
+            run_while = self.__check_condition(
+                self.__eval_expr(cond_ast), Interpreter.WHILE_DEF
+            )
             if run_while.value():
                 statements = while_ast.get("statements")
                 status, return_val = self.__run_statements(statements)
-                if status == ExecStatus.RETURN:
+                if status != ExecStatus.CONTINUE:
                     return status, return_val
 
         return (ExecStatus.CONTINUE, Interpreter.NIL_VALUE)
 
+    # coerces an if/while condition to a bool
+    def __check_condition(self, result, statement_type):
+        if result.type() != Type.BOOL:
+            if result.type() == Type.INT:
+                result = self.__coerce_val(result, Type.BOOL)
+            else:
+                super().error(
+                    ErrorType.TYPE_ERROR,
+                    f"Incompatible type for {statement_type} condition",
+                )
+        return result
+
     def __do_return(self, return_ast):
         expr_ast = return_ast.get("expression")
         if expr_ast is None:
             return (ExecStatus.RETURN, Interpreter.NIL_VALUE)
+        if self.__is_tail_call(expr_ast):
+            func_ast = self.__enter_call(expr_ast)
+            self.__bind_args(func_ast, expr_ast)
+            return (ExecStatus.TAIL_CALL, func_ast)
         value_obj = copy.deepcopy(self.__eval_expr(expr_ast))
         return (ExecStatus.RETURN, value_obj)
+
+    # closure engine: every AST node is compiled once into a Python closure, so running
+    # it no longer dispatches on elem_type or looks up the node's fields. A compiled
+    # statement returns None to continue, the Value being returned, or a TailCall.
+    def __compiled_body(self, func_ast):
+        body = self.compiled_bodies.get(func_ast)
+        if body is None:
+            body = self.__compile_block(func_ast.get("statements"))
+            self.compiled_bodies[func_ast] = body
+        return body
+
+    def __compile_block(self, statements):
+        env = self.env
+        compiled = []
+        for statement in statements:
+            compiled_statement = self.__compile_statement(statement)
+            if compiled_statement is not None:
+                compiled.append(compiled_statement)
+
+        def run_block():
+            env.push()
+            for statement in compiled:
+                return_val = statement()
+                if return_val is not None:
+                    # a pending tail call still sees this scope; the call loop pops it
+                    if type(return_val) is not TailCall:
+                        env.pop()
+                    return return_val
+            env.pop()
+            return None
+
+        return run_block
+
+    def __compile_statement(self, statement):
+        if statement.elem_type == InterpreterBase.FCALL_DEF:
+            call = self.__compile_expr(statement)
+
+            def run_call():
+                call()
+
+            return run_call
+        if statement.elem_type == "=":
+            expr = self.__compile_expr(statement.get("expression"))
+            assign_value = self.__assign_value
+            return lambda: assign_value(statement, expr())
+        if statement.elem_type == InterpreterBase.RETURN_DEF:
+            return self.__compile_return(statement)
+        if statement.elem_type == Interpreter.IF_DEF:
+            return self.__compile_if(statement)
+        if statement.elem_type == Interpreter.WHILE_DEF:
+            return self.__compile_while(statement)
+        return None
+
+    def __compile_return(self, return_ast):
+        expr_ast = return_ast.get("expression")
+        expr = None if expr_ast is None else self.__compile_expr(expr_ast)
+        track_returned_lambda = self.__track_returned_lambda
+        if expr_ast is not None and expr_ast.elem_type == InterpreterBase.FCALL_DEF:
+            prepare = self.__compile_prepare(expr_ast)
+            is_tail_call = self.__is_tail_call
+        else:
+            is_tail_call = None
+
+        def run_return():
+            if is_tail_call is not None and is_tail_call(expr_ast):
+                return TailCall(prepare())
+            if expr is None:
+                return_val = Interpreter.NIL_VALUE
+            else:
+                return_val = copy.deepcopy(expr())
+            track_returned_lambda(return_ast)
+            return return_val
+
+        return run_return
+
+    def __compile_if(self, if_ast):
+        condition = self.__compile_expr(if_ast.get("condition"))
+        statements = self.__compile_block(if_ast.get("statements"))
+        else_statements = None
+        if if_ast.get("else_statements") is not None:
+            else_statements = self.__compile_block(if_ast.get("else_statements"))
+        check_condition = self.__check_condition
+
+        def run_if():
+            if check_condition(condition(), Interpreter.IF_DEF).value():
+                return statements()
+            if else_statements is not None:
+                return else_statements()
+            return None
+
+        return run_if
+
+    def __compile_while(self, while_ast):
+        condition = self.__compile_expr(while_ast.get("condition"))
+        statements = self.__compile_block(while_ast.get("statements"))
+        check_condition = self.__check_condition
+
+        def run_while():
+            while check_condition(condition(), Interpreter.WHILE_DEF).value():
+                return_val = statements()
+                if return_val is not None:
+                    return return_val
+            return None
+
+        return run_while
+
+    def __compile_expr(self, expr_ast):
+        kind = expr_ast.elem_type
+        if kind == InterpreterBase.NIL_DEF:
+            return lambda: Interpreter.NIL_VALUE
+        if kind in Interpreter.LITERAL_TYPES:
+            t, val = Interpreter.LITERAL_TYPES[kind], expr_ast.get("val")
+            return lambda: Value(t, val)
+        if kind == InterpreterBase.VAR_DEF:
+            eval_name, var_name = self.__eval_name, expr_ast.get("name")
+            return lambda: eval_name(var_name)
+        if kind == InterpreterBase.LAMBDA_DEF:
+            return lambda: Value(Type.FUNC, copy.deepcopy(expr_ast))
+        if kind == InterpreterBase.FCALL_DEF:
+            return self.__compile_call(expr_ast)
+        if self.short_circuit and (kind == "&&" or kind == "||"):
+            op1 = self.__compile_expr(expr_ast.get("op1"))
+            op2 = self.__compile_expr(expr_ast.get("op2"))
+            decided_by, apply_op = Interpreter.__decided_by, self.__apply_op
+
+            def run_short_circuit():
+                left_value_obj = op1()
+                result = decided_by(kind, left_value_obj)
+                if result is not None:
+                    return result
+                return apply_op(kind, left_value_obj, op2())
+
+            return run_short_circuit
+        if kind in Interpreter.BIN_OPS:
+            op1 = self.__compile_expr(expr_ast.get("op1"))
+            op2 = self.__compile_expr(expr_ast.get("op2"))
+            apply_op = self.__apply_op
+            return lambda: apply_op(kind, op1(), op2())
+        if kind in Interpreter.UNARY_OPS:
+            op1 = self.__compile_expr(expr_ast.get("op1"))
+            t, f = Interpreter.UNARY_OPS[kind]
+            apply_unary = self.__apply_unary
+            return lambda: apply_unary(kind, op1(), t, f)
+        return lambda: None
+
+    def __compile_call(self, call_node):
+        func_name = call_node.get("name")
+        actual_args = call_node.get("args")
+        args = [self.__compile_expr(arg) for arg in actual_args]
+        if func_name == "print":
+            return self.__compile_print(args)
+        if func_name == "inputi" or func_name == "inputs":
+            return self.__compile_input(func_name, args)
+
+        prepare = self.__compile_prepare(call_node, args)
+        run_compiled = self.__run_compiled
+
+        def call():
+            return run_compiled(prepare())
+
+        return call
+
+    # runs the compiled body of a function whose environment __enter_call has pushed,
+    # and its tail calls in a loop the same way as __run_function does for the tree walker
+    def __run_compiled(self, func_ast):
+        env = self.env
+        base = frame_base = env.depth() - 1
+        tail_called = False
+        while True:
+            return_val = self.__compiled_body(func_ast)()
+            if type(return_val) is not TailCall:
+                break
+            func_ast = return_val.func_ast
+            tail_called = True
+            if env.top_hides(frame_base):
+                env.discard_below_top(frame_base)
+            else:
+                frame_base = env.depth() - 1
+        env.pop_to(base)
+        if return_val is None:
+            return_val = Interpreter.NIL_VALUE
+        if tail_called:
+            return copy.deepcopy(return_val)
+        return return_val
+
+    # returns a function that enters the call and binds its arguments, giving back the AST
+    # of the function to run
+    def __compile_prepare(self, call_node, args=None):
+        actual_args = call_node.get("args")
+        if args is None:
+            args = [self.__compile_expr(arg) for arg in actual_args]
+        enter_call = self.__enter_call
+        bind_param = self.__bind_param
+
+        def prepare():
+            func_ast = enter_call(call_node)
+            for formal_ast, actual_ast, arg in zip(func_ast.get("args"), actual_args, args):
+                bind_param(formal_ast, actual_ast, arg())
+            return func_ast
+
+        return prepare
+
+    def __compile_print(self, args):
+        output = self.output
+
+        def call_print():
+            printed = ""
+            for arg in args:
+                printed = printed + get_printable(arg())
+            output(printed)
+            return Interpreter.NIL_VALUE
+
+        return call_print
+
+    def __compile_input(self, func_name, args):
+        output, error, get_input = self.output, self.error, self.get_input
+
+        def call_input():
+            if len(args) == 1:
+                output(get_printable(args[0]()))
+            elif len(args) > 1:
+                error(ErrorType.NAME_ERROR, "No inputi() function that takes > 1 parameter")
+            inp = get_input()
+            if func_name == "inputi":
+                return Value(Type.INT, int(inp))
+            return Value(Type.STRING, inp)
+
+        return call_input
     
 
 if __name__ == "__main__":
@@ -0,0 +1,107 @@
+# Content-addressed cache of parsed Brewin programs, so running the same source
+# again skips lexing and parsing. ASTs are keyed by a hash of the program source
+# and of the grammar that produced them, kept in memory with LRU eviction, and
+# optionally pickled to a cache directory shared between processes.
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+from collections import OrderedDict
+
+import brewlex
+import brewparse
+import brewscan
+import element
+import parsetab
+
+
+def _grammar_signature():
+    # the LALR table signature covers the grammar itself; the module sources cover
+    # the token rules, the lexer and the Elements each rule builds
+    digest = hashlib.sha256(parsetab._lr_signature.encode())
+    for module in (brewlex, brewscan, brewparse, element):
+        with open(module.__file__, "rb") as source_file:
+            digest.update(source_file.read())
+    return digest.hexdigest()
+
+
+GRAMMAR_SIGNATURE = _grammar_signature()
+
+
+class ASTCache:
+    def __init__(self, max_entries=128, cache_dir=None):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def key(program):
+        digest = hashlib.sha256(GRAMMAR_SIGNATURE.encode())
+        digest.update(program.encode())
+        return digest.hexdigest()
+
+    # returns the AST for a program, parsing it only if it's not cached yet. The
+    # returned AST is shared between callers, so it must not be modified, apart from
+    # what env_v4.resolve_slots writes on it: annotations that depend only on the
+    # program, made once and the same way by every interpreter (see there).
+    def parse(self, program):
+        key = ASTCache.key(program)
+        with self.lock:
+            ast = self.entries.get(key)
+            if ast is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return ast
+
+        ast = self.__load(key)
+        loaded = ast is not None
+        if not loaded:
+            ast = brewparse.parse_program(program)
+            self.__store(key, ast)
+        with self.lock:
+            if loaded:
+                self.disk_hits += 1
+            else:
+                self.misses += 1
+            self.entries[key] = ast
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return ast
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def __path(self, key):
+        return os.path.join(self.cache_dir, key + ".pickle")
+
+    def __load(self, key):
+        if self.cache_dir is None:
+            return None
+        try:
+            with open(self.__path(key), "rb") as cache_file:
+                return pickle.load(cache_file)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+            return None
+
+    def __store(self, key, ast):
+        if self.cache_dir is None:
+            return
+        # write to a temporary file first so concurrent readers never see a partial pickle
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as cache_file:
+                pickle.dump(ast, cache_file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.__path(key))
+        except (OSError, pickle.PicklingError, RecursionError):
+            # a program too deeply nested to pickle is still cached in memory
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
@@ -1,5 +1,19 @@
-from element import Element
+import bisect
+import copy
+import functools
+import itertools
+import operator
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+from element import (
+    Argument, Assignment, BinaryOp, Element, FieldRef, Function, FunctionCall, If, Lambda,
+    Literal, MethodCall, Program, Return, UnaryOp, Variable, While,
+)
 from brewlex import *
+from brewscan import Lexer
+import brewpratt
 from intbase import InterpreterBase
 from ply import yacc
 
@@ -25,7 +39,7 @@ def collapse_items(p, group_index, singleton_index):
 
 def p_program(p):
     "program : funcs"
-    p[0] = Element(InterpreterBase.PROGRAM_DEF, functions=p[1])
+    p[0] = Program(p[1])
 
 
 def p_funcs(p):
@@ -37,19 +51,21 @@ def p_funcs(p):
 def p_func(p):
     """func : FUNC NAME LPAREN formal_args RPAREN LBRACE statements RBRACE
     | FUNC NAME LPAREN RPAREN LBRACE statements RBRACE"""
+    start = p.lexpos(1)
+    end = p.lexpos(len(p) - 1) + 1
     if len(p) == 9:  # handle with 1+ formal args
-        p[0] = Element(InterpreterBase.FUNC_DEF, name=p[2], args=p[4], statements=p[7])
+        p[0] = Function(p[2], p[4], p[7], start, end)
     else:  # handle no formal args
-        p[0] = Element(InterpreterBase.FUNC_DEF, name=p[2], args=[], statements=p[6])
+        p[0] = Function(p[2], [], p[6], start, end)
 
 
 def p_lambda(p):
     """lambda : LAMBDA LPAREN formal_args RPAREN LBRACE statements RBRACE
     | LAMBDA LPAREN RPAREN LBRACE statements RBRACE"""
     if len(p) == 8:  # handle with 1+ formal args
-        p[0] = Element(InterpreterBase.LAMBDA_DEF, args=p[3], statements=p[6])
+        p[0] = Lambda(p[3], p[6])
     else:  # handle no formal args
-        p[0] = Element(InterpreterBase.LAMBDA_DEF, args=[], statements=p[5])
+        p[0] = Lambda([], p[5])
 
 
 def p_formal_args(p):
@@ -60,12 +76,12 @@ def p_formal_args(p):
 
 def p_formal_arg(p):
     "formal_arg : NAME"
-    p[0] = Element(InterpreterBase.ARG_DEF, name=p[1])
+    p[0] = Argument(InterpreterBase.ARG_DEF, p[1])
 
 
 def p_formal_ref_arg(p):
     "formal_arg : REF NAME"
-    p[0] = Element(InterpreterBase.REFARG_DEF, name=p[2])
+    p[0] = Argument(InterpreterBase.REFARG_DEF, p[2])
 
 
 def p_statements(p):
@@ -76,14 +92,14 @@ def p_statements(p):
 
 def p_statement___assign(p):
     "statement : variable ASSIGN expression SEMI"
-    p[0] = Element("=", name=p[1], expression=p[3])
+    p[0] = Assignment(p[1], p[3])
 
 
 def p_variable(p):
     """variable : NAME DOT NAME
     | NAME"""
     if len(p) == 4:
-        p[0] = p[1] + "." + p[3]
+        p[0] = FieldRef(p[1], p[3])
     else:
         p[0] = p[1]
 
@@ -93,24 +109,14 @@ def p_statement_if(p):
     | IF LPAREN expression RPAREN LBRACE statements RBRACE ELSE LBRACE statements RBRACE
     """
     if len(p) == 8:
-        p[0] = Element(
-            InterpreterBase.IF_DEF,
-            condition=p[3],
-            statements=p[6],
-            else_statements=None,
-        )
+        p[0] = If(p[3], p[6], None)
     else:
-        p[0] = Element(
-            InterpreterBase.IF_DEF,
-            condition=p[3],
-            statements=p[6],
-            else_statements=p[10],
-        )
+        p[0] = If(p[3], p[6], p[10])
 
 
 def p_statement_while(p):
     "statement : WHILE LPAREN expression RPAREN LBRACE statements RBRACE"
-    p[0] = Element(InterpreterBase.WHILE_DEF, condition=p[3], statements=p[6])
+    p[0] = While(p[3], p[6])
 
 
 def p_statement_expr(p):
@@ -125,17 +131,17 @@ def p_statement_return(p):
         expr = p[2]
     else:
         expr = None
-    p[0] = Element(InterpreterBase.RETURN_DEF, expression=expr)
+    p[0] = Return(expr)
 
 
 def p_expression_not(p):
     "expression : NOT expression"
-    p[0] = Element(InterpreterBase.NOT_DEF, op1=p[2])
+    p[0] = UnaryOp(InterpreterBase.NOT_DEF, p[2])
 
 
 def p_expression_uminus(p):
     "expression : MINUS expression %prec UMINUS"
-    p[0] = Element(InterpreterBase.NEG_DEF, op1=p[2])
+    p[0] = UnaryOp(InterpreterBase.NEG_DEF, p[2])
 
 
 def p_arith_expression_binop(p):
@@ -149,7 +155,7 @@ def p_arith_expression_binop(p):
     | expression MINUS expression
     | expression MULTIPLY expression
     | expression DIVIDE expression"""
-    p[0] = Element(p[2], op1=p[1], op2=p[3])
+    p[0] = BinaryOp(p[2], p[1], p[3])
 
 
 def p_expression_group(p):
@@ -160,12 +166,12 @@ def p_expression_group(p):
 def p_expression_and_or(p):
     """expression : expression OR expression
     | expression AND expression"""
-    p[0] = Element(p[2], op1=p[1], op2=p[3])
+    p[0] = BinaryOp(p[2], p[1], p[3])
 
 
 def p_expression_number(p):
     "expression : NUMBER"
-    p[0] = Element(InterpreterBase.INT_DEF, val=p[1])
+    p[0] = Literal(InterpreterBase.INT_DEF, p[1])
 
 
 def p_expression_lambda(p):
@@ -177,7 +183,7 @@ def p_expression_bool(p):
     """expression : TRUE
     | FALSE"""
     bool_val = p[1] == InterpreterBase.TRUE_DEF
-    p[0] = Element(InterpreterBase.BOOL_DEF, val=bool_val)
+    p[0] = Literal(InterpreterBase.BOOL_DEF, bool_val)
 
 
 def p_expression_nil(p):
@@ -194,30 +200,33 @@ def p_expression_obj(
 
 def p_expression_string(p):
     "expression : STRING"
-    p[0] = Element(InterpreterBase.STRING_DEF, val=p[1])
+    p[0] = Literal(InterpreterBase.STRING_DEF, p[1])
 
 
 def p_expression_variable(p):
     "expression : variable"
-    p[0] = Element(InterpreterBase.VAR_DEF, name=p[1])
+    if isinstance(p[1], FieldRef):
+        p[0] = p[1]
+    else:
+        p[0] = Variable(p[1])
 
 
 def p_func_call(p):
     """expression : NAME LPAREN args RPAREN
     | NAME LPAREN RPAREN"""
     if len(p) == 5:
-        p[0] = Element(InterpreterBase.FCALL_DEF, name=p[1], args=p[3])
+        p[0] = FunctionCall(p[1], p[3])
     else:
-        p[0] = Element(InterpreterBase.FCALL_DEF, name=p[1], args=[])
+        p[0] = FunctionCall(p[1], [])
 
 
 def p_method_call(p):
     """expression : NAME DOT NAME LPAREN args RPAREN
     | NAME DOT NAME LPAREN RPAREN"""
     if len(p) == 7:
-        p[0] = Element(InterpreterBase.MCALL_DEF, objref=p[1], name=p[3], args=p[5])
+        p[0] = MethodCall(p[1], p[3], p[5])
     else:
-        p[0] = Element(InterpreterBase.MCALL_DEF, objref=p[1], name=p[3], args=[])
+        p[0] = MethodCall(p[1], p[3], [])
 
 
 def p_expression_args(p):
@@ -233,13 +242,167 @@ def p_error(p):
         print("Syntax error at EOF")
 
 
-# exported function
-def parse_program(program):
-    ast = yacc.parse(program)
-    if ast is None:
-        raise SyntaxError("Syntax error")
-    return ast
-
-
-# generate our parser
-yacc.yacc()
+# for parsing part of a program, where any syntax error means parsing all of it instead
+def strict_error(p):
+    raise SyntaxError("Syntax error")
+
+
+# exported function. backend "pratt" parses with the recursive-descent parser in
+# brewpratt instead of the PLY grammar above, which builds the same tree faster. Safe to
+# call from any number of threads at once: each parses with a BrewinParser of its own.
+def parse_program(program, backend="ply"):
+    return thread_parser().parse(program, backend)
+
+
+# exported function. Re-parses program after an edit to the source ast was parsed from,
+# which replaced what was between start and old_end with what is now between start and
+# new_end. Only the functions the edit touched are lexed and parsed again, along with
+# whatever is between them and their untouched neighbours; the rest of ast's functions
+# are reused. Returns a new Program, or raises SyntaxError, just as parse_program(program)
+# would, and leaves ast as it was. Only the text parsed again prints messages about
+# illegal characters and syntax errors.
+def reparse_program(ast, program, start, old_end, new_end, backend="ply"):
+    return thread_parser().reparse(ast, program, start, old_end, new_end, backend)
+
+
+# parses every program in sources and returns their ASTs in the same order, raising the
+# SyntaxError of the first one (in that order) that doesn't parse. pool is "thread",
+# "process" or an Executor to run the parses on; with threads they still take turns
+# holding the GIL, so it takes processes to parse on more than one core.
+def parse_many(sources, backend="ply", pool="thread", workers=None):
+    sources = list(sources)
+    if isinstance(pool, Executor):
+        return list(pool.map(parse_program, sources, itertools.repeat(backend)))
+    workers = workers or os.cpu_count() or 1
+    if pool == "thread":
+        executor = ThreadPoolExecutor(max_workers=workers)
+        chunksize = 1
+    elif pool == "process":
+        executor = ProcessPoolExecutor(max_workers=workers)
+        # each chunk is one round trip to a worker, and the ASTs come back pickled
+        chunksize = max(1, len(sources) // (workers * 4))
+    else:
+        raise ValueError(f"Unknown pool {pool}")
+    with executor:
+        return list(executor.map(parse_program, sources, itertools.repeat(backend),
+                                 chunksize=chunksize))
+
+
+# generate our parser, or with FAST_STARTUP (see brewlex) load it straight from
+# parsetab.py, skipping the collection of the rules above and the signature check
+# against them
+def load_parser():
+    if FAST_STARTUP:
+        try:
+            tables = yacc.LRTable()
+            tables.read_table("parsetab")
+            tables.bind_callables(globals())
+            return yacc.LRParser(tables, p_error)
+        except ImportError:
+            pass  # no tables yet, so build them
+    return yacc.yacc()
+
+
+parser = load_parser()
+# the lexer every BrewinParser clones its own from, as parser is the one it copies
+lexer = Lexer()
+
+
+# A parser with its own LR parser, Pratt parser and lexer. PLY's LRParser keeps its
+# stacks on the instance for as long as a parse lasts, so two threads parsing through
+# the one above at the same time would trample each other's; a copy shares only the
+# grammar tables, which parsing just reads. (PLY also points its module globals at the
+# parser while p_error runs, but p_error doesn't use them.) A BrewinParser is only ever
+# used by one thread at a time.
+class BrewinParser:
+    def __init__(self):
+        self.lexer = lexer.clone()
+        self.lr_parser = copy.copy(parser)
+        self.strict_lr_parser = copy.copy(parser)
+        self.strict_lr_parser.errorfunc = strict_error
+        self.pratt_parser = brewpratt.Parser()
+
+    def parse(self, program, backend="ply"):
+        self.lexer.lineno = 1
+        if backend == "ply":
+            ast = self.lr_parser.parse(program, lexer=self.lexer)
+        elif backend == "pratt":
+            ast = self.pratt_parser.parse(program, self.lexer)
+        else:
+            raise ValueError(f"Unknown parser backend {backend}")
+        if ast is None:
+            raise SyntaxError("Syntax error")
+        return ast
+
+    # see reparse_program
+    def reparse(self, ast, program, start, old_end, new_end, backend="ply"):
+        functions = ast.functions
+        # Lexing the new source can first differ from the old where the edit starts, unless
+        # the edit made a */ that closes a comment opened before it (so far one that never
+        # closed, which only happens in the part of a program PLY's error recovery threw
+        # away), or it's on the same line as a " that so far didn't start a string
+        if "*/" in program[max(start - 1, 0):new_end + 1]:
+            reach = 0
+        else:
+            line_start = program.rfind("\n", 0, start) + 1
+            reach = line_start if '"' in program[line_start:start] else start
+        # functions[:first] end before that and functions[last:] start after the edit
+        first = bisect.bisect_left(functions, reach, key=operator.attrgetter("end"))
+        last = bisect.bisect_right(functions, old_end, key=operator.attrgetter("start"))
+        shift = new_end - old_end
+        region_start = functions[first - 1].end if first else 0
+        region_end = functions[last].start + shift if last < len(functions) else len(program)
+        changed = self.parse_region(program, region_start, region_end, backend)
+        if changed is None:
+            return self.parse(program, backend)
+        # the same functions in their new places, sharing everything below them
+        moved = [
+            Function(f.name, f.args, f.statements, f.start + shift, f.end + shift)
+            for f in functions[last:]
+        ]
+        functions = functions[:first] + changed + moved
+        if not functions:
+            # a program needs at least one function, so this is a syntax error
+            return self.parse(program, backend)
+        return Program(functions)
+
+    # The functions in program[region_start:region_end], or None if they have to be
+    # parsed along with the rest of the program: when they have a syntax error, which
+    # could make PLY's error recovery throw away functions outside the region, or when
+    # a token runs across region_end, as when the edit opened a comment that only
+    # closes in a later function.
+    def parse_region(self, program, region_start, region_end, backend):
+        if backend != "ply" and backend != "pratt":
+            raise ValueError(f"Unknown parser backend {backend}")
+        self.lexer.lineno = 1
+        self.lexer.input(program, region_start)
+        tokens = []
+        boundary = len(program)
+        for token in self.lexer:
+            if token.lexpos >= region_end:
+                boundary = token.lexpos
+                break
+            tokens.append(token)
+        if boundary != region_end:
+            return None
+        if not tokens:
+            return []
+        try:
+            if backend == "ply":
+                next_token = functools.partial(next, iter(tokens), None)
+                return self.strict_lr_parser.parse(lexer=self.lexer, tokenfunc=next_token).functions
+            return self.pratt_parser.parse_functions(iter(tokens))
+        except (SyntaxError, brewpratt.ParseError):
+            return None
+
+
+local_parsers = threading.local()
+
+
+# the calling thread's BrewinParser, made the first time the thread parses
+def thread_parser():
+    try:
+        return local_parsers.parser
+    except AttributeError:
+        local_parsers.parser = BrewinParser()
+        return local_parsers.parser
@@ -0,0 +1,253 @@
+# Lowers a Brewin function (or lambda) AST into flat bytecode for the "vm" engine
+# of interpreterv4. Each function becomes a Code object holding two parallel lists:
+# ops (integer opcodes) and args (the operand for each opcode).
+from element import FIELD_REF_DEF
+from intbase import InterpreterBase
+from type_valuev3 import Type, is_interned, new_value
+
+# opcodes, roughly ordered by how often they run in loop-heavy programs
+LOAD_NAME = 1  # push value of variable/function; arg = var node
+LOAD_LITERAL = 2  # push a fresh Value; arg = (type, python value)
+BINARY_OP = 3  # pop two operands, push result; arg = operator node
+ASSIGN = 4  # pop value and assign it as is; arg = assignment node
+ASSIGN_COPY = 5  # pop value, shallow copy unless it's an object, assign; arg = assignment node
+JUMP_IF_FALSE = 6  # pop condition, jump if false; arg = (target, "if"/"while")
+JUMP = 7  # arg = target
+PUSH_SCOPE = 8
+POP_SCOPE = 9
+RESOLVE_FUNC = 10  # push a pending call for a function; arg = fcall node
+RESOLVE_METHOD = 11  # push a pending call for a method; arg = mcall node
+BIND_ARG = 12  # pop value, bind it to formal #arg of the pending call
+CALL = 13  # pop the pending call and enter it
+RETURN = 14  # pop value, return a by-value copy of it; arg = # of scopes to pop
+RETURN_NIL = 15  # return nil; arg = # of scopes to pop
+POP = 16
+UNARY_OP = 17  # arg = operator
+LOAD_NIL = 18
+MAKE_CLOSURE = 19  # arg = lambda node
+NEW_OBJECT = 20
+PRINT_BEGIN = 21
+PRINT_ARG = 22
+PRINT_END = 23
+OUTPUT_VALUE = 24  # pop value and output it (the prompt for inputi)
+INPUT_INT = 25  # arg = # of args passed to inputi
+JUMP_IF_OBJECT = 26  # jump if top of stack is an object, otherwise pop it; arg = target
+COPY = 27  # replace top of stack with a shallow copy
+LOAD_CONST = 28  # push a shared interned Value; arg = the Value
+LOAD_FIELD = 29  # push value of an object's field; arg = field_ref node
+# if the left operand on top of the stack decides && or || by itself, replace it with
+# the result and jump past the right operand; arg = (target, operator)
+JUMP_IF_DECIDED = 30
+
+
+class Code:
+    def __init__(self, func_ast):
+        self.func_ast = func_ast
+        self.ops = []
+        self.args = []
+
+    def emit(self, op, arg=None):
+        self.ops.append(op)
+        self.args.append(arg)
+        return len(self.ops) - 1
+
+    def patch(self, index, arg):
+        self.args[index] = arg
+
+    def here(self):
+        return len(self.ops)
+
+
+# short_circuit compiles && and || to skip their right operand when the left one decides
+def compile_function(func_ast, short_circuit=False):
+    compiler = _Compiler(func_ast, short_circuit)
+    compiler.compile_body(func_ast.get("statements"))
+    return compiler.code
+
+
+class _Compiler:
+    LITERAL_TYPES = {
+        InterpreterBase.INT_DEF: Type.INT,
+        InterpreterBase.STRING_DEF: Type.STRING,
+        InterpreterBase.BOOL_DEF: Type.BOOL,
+    }
+    BIN_OPS = {"+", "-", "*", "/", "==", "!=", ">", ">=", "<", "<=", "||", "&&"}
+
+    def __init__(self, func_ast, short_circuit=False):
+        self.code = Code(func_ast)
+        self.short_circuit = short_circuit
+        self.depth = 0  # number of block scopes open at the current point
+
+    def compile_body(self, statements):
+        self.code.emit(PUSH_SCOPE)
+        self.depth += 1
+        self.compile_statements(statements)
+        self.code.emit(RETURN_NIL, self.depth)
+
+    def compile_block(self, statements):
+        self.code.emit(PUSH_SCOPE)
+        self.depth += 1
+        self.compile_statements(statements)
+        self.code.emit(POP_SCOPE)
+        self.depth -= 1
+
+    def compile_statements(self, statements):
+        for statement in statements:
+            kind = statement.elem_type
+            if kind == InterpreterBase.FCALL_DEF or kind == InterpreterBase.MCALL_DEF:
+                self.compile_expr(statement)
+                self.code.emit(POP)
+            elif kind == "=":
+                self.compile_assign(statement)
+            elif kind == InterpreterBase.RETURN_DEF:
+                self.compile_return(statement)
+            elif kind == InterpreterBase.IF_DEF:
+                self.compile_if(statement)
+            elif kind == InterpreterBase.WHILE_DEF:
+                self.compile_while(statement)
+            # any other expression statement is never evaluated by the tree walker
+
+    def compile_assign(self, assign_ast):
+        expr_ast = assign_ast.get("expression")
+        self.compile_expr(expr_ast)
+        if expr_ast.elem_type == FIELD_REF_DEF:
+            self.code.emit(ASSIGN, assign_ast)
+        elif has_calls(expr_ast):
+            # the tree walker evaluates a non-object right hand side a second time,
+            # so calls (and their output) happen twice
+            jump = self.code.emit(JUMP_IF_OBJECT)
+            self.compile_expr(expr_ast)
+            self.code.emit(COPY)
+            self.code.patch(jump, self.code.here())
+            self.code.emit(ASSIGN, assign_ast)
+        else:
+            self.code.emit(ASSIGN_COPY, assign_ast)
+
+    def compile_return(self, return_ast):
+        expr_ast = return_ast.get("expression")
+        if expr_ast is None:
+            self.code.emit(RETURN_NIL, self.depth)
+            return
+        self.compile_expr(expr_ast)
+        self.code.emit(RETURN, self.depth)
+
+    def compile_if(self, if_ast):
+        self.compile_expr(if_ast.get("condition"))
+        jump_false = self.code.emit(JUMP_IF_FALSE)
+        self.compile_block(if_ast.get("statements"))
+        else_statements = if_ast.get("else_statements")
+        if else_statements is None:
+            self.code.patch(jump_false, (self.code.here(), InterpreterBase.IF_DEF))
+            return
+        jump_end = self.code.emit(JUMP)
+        self.code.patch(jump_false, (self.code.here(), InterpreterBase.IF_DEF))
+        self.compile_block(else_statements)
+        self.code.patch(jump_end, self.code.here())
+
+    def compile_while(self, while_ast):
+        top = self.code.here()
+        self.compile_expr(while_ast.get("condition"))
+        jump_false = self.code.emit(JUMP_IF_FALSE)
+        self.compile_block(while_ast.get("statements"))
+        self.code.emit(JUMP, top)
+        self.code.patch(jump_false, (self.code.here(), InterpreterBase.WHILE_DEF))
+
+    # Expressions are compiled from a work list instead of by recursing into operands,
+    # so an expression nested arbitrarily deep (say a+a+...+a from a code generator)
+    # never runs into Python's recursion limit. An item on the list is a node still to
+    # compile, an (opcode, arg) pair to emit once the items before it are, or a function
+    # to call at that point (to patch a jump, say).
+    def compile_expr(self, expr_ast):
+        pending = [expr_ast]
+        while pending:
+            item = pending.pop()
+            if type(item) is tuple:
+                self.code.emit(*item)
+            elif callable(item):
+                item()
+            else:
+                pending.extend(reversed(self.expand_expr(item)))
+
+    # emits whatever expr_ast starts with and returns the items that follow it, in order
+    def expand_expr(self, expr_ast):
+        kind = expr_ast.elem_type
+        if kind == InterpreterBase.VAR_DEF:
+            self.code.emit(LOAD_NAME, expr_ast)
+        elif kind == FIELD_REF_DEF:
+            self.code.emit(LOAD_FIELD, expr_ast)
+        elif kind in _Compiler.LITERAL_TYPES:
+            t, val = _Compiler.LITERAL_TYPES[kind], expr_ast.get("val")
+            value = new_value(t, val)
+            if is_interned(value):
+                self.code.emit(LOAD_CONST, value)
+            else:
+                self.code.emit(LOAD_LITERAL, (t, val))
+        elif kind in _Compiler.BIN_OPS:
+            if self.short_circuit and (kind == "&&" or kind == "||"):
+                return self.expand_short_circuit(expr_ast)
+            return [expr_ast.get("op1"), expr_ast.get("op2"), (BINARY_OP, expr_ast)]
+        elif kind == InterpreterBase.FCALL_DEF:
+            return self.expand_fcall(expr_ast)
+        elif kind == InterpreterBase.MCALL_DEF:
+            self.code.emit(RESOLVE_METHOD, expr_ast)
+            return self.expand_args(expr_ast.get("args"))
+        elif kind == InterpreterBase.NEG_DEF or kind == InterpreterBase.NOT_DEF:
+            return [expr_ast.get("op1"), (UNARY_OP, kind)]
+        elif kind == InterpreterBase.NIL_DEF:
+            self.code.emit(LOAD_NIL)
+        elif kind == InterpreterBase.LAMBDA_DEF:
+            self.code.emit(MAKE_CLOSURE, expr_ast)
+        elif kind == InterpreterBase.OBJ_DEF:
+            self.code.emit(NEW_OBJECT)
+        return []
+
+    def expand_short_circuit(self, expr_ast):
+        jump = []
+
+        def emit_jump():
+            jump.append(self.code.emit(JUMP_IF_DECIDED))
+
+        def patch_jump():
+            self.code.patch(jump[0], (self.code.here(), expr_ast.elem_type))
+
+        return [expr_ast.get("op1"), emit_jump, expr_ast.get("op2"), (BINARY_OP, expr_ast), patch_jump]
+
+    def expand_fcall(self, call_ast):
+        func_name = call_ast.get("name")
+        args = call_ast.get("args")
+        if func_name == "print":
+            self.code.emit(PRINT_BEGIN)
+            items = []
+            for arg in args:
+                items += [arg, (PRINT_ARG, None)]
+            return items + [(PRINT_END, None)]
+        if func_name == "inputi":
+            if len(args) == 1:
+                return [args[0], (OUTPUT_VALUE, None), (INPUT_INT, len(args))]
+            self.code.emit(INPUT_INT, len(args))
+            return []
+        self.code.emit(RESOLVE_FUNC, call_ast)
+        return self.expand_args(args)
+
+    def expand_args(self, args):
+        items = []
+        for index, arg in enumerate(args):
+            items += [arg, (BIND_ARG, index)]
+        return items + [(CALL, None)]
+
+
+# whether evaluating an expression can call a function (and so have side effects)
+def has_calls(expr_ast):
+    pending = [expr_ast]
+    while pending:
+        node = pending.pop()
+        kind = node.elem_type
+        if kind == InterpreterBase.FCALL_DEF or kind == InterpreterBase.MCALL_DEF:
+            return True
+        if kind == InterpreterBase.LAMBDA_DEF:
+            continue
+        for key in ("op1", "op2"):
+            sub_ast = node.get(key)
+            if sub_ast is not None:
+                pending.append(sub_ast)
+    return False
@@ -1,19 +1,82 @@
+import copy
+
+from intbase import InterpreterBase
+
+FIELD_REF_DEF = "field_ref"
+
+# Every elem_type the parser produces gets a small integer kind, stored on each node
+# as it's built, so interpreters can dispatch through a table indexed by node kind
+# instead of comparing elem_type against one string after another.
+NODE_TYPES = (
+    InterpreterBase.PROGRAM_DEF,
+    InterpreterBase.FUNC_DEF,
+    InterpreterBase.LAMBDA_DEF,
+    InterpreterBase.ARG_DEF,
+    InterpreterBase.REFARG_DEF,
+    InterpreterBase.FCALL_DEF,
+    InterpreterBase.MCALL_DEF,
+    "=",
+    InterpreterBase.IF_DEF,
+    InterpreterBase.WHILE_DEF,
+    InterpreterBase.RETURN_DEF,
+    InterpreterBase.VAR_DEF,
+    InterpreterBase.INT_DEF,
+    InterpreterBase.STRING_DEF,
+    InterpreterBase.BOOL_DEF,
+    InterpreterBase.NIL_DEF,
+    InterpreterBase.OBJ_DEF,
+    FIELD_REF_DEF,
+    InterpreterBase.NEG_DEF,
+    InterpreterBase.NOT_DEF,
+    "+", "-", "*", "/", "==", "!=", "<", "<=", ">", ">=", "&&", "||",
+)
+NODE_KINDS = {elem_type: kind for kind, elem_type in enumerate(NODE_TYPES)}
+
+
+# turns {elem_type: handler} into a list indexed by node kind, with default for the
+# kinds that have no handler
+def kind_table(handlers, default=None):
+    table = [default] * len(NODE_TYPES)
+    for elem_type, handler in handlers.items():
+        table[NODE_KINDS[elem_type]] = handler
+    return table
+
+
+# AST nodes. Every node type has its own class that keeps its fields in __slots__
+# rather than a per-node dict, which makes the tree about a third of the size and reading a
+# field a plain attribute load. The field names are the ones the interpreters pass to
+# get(), and fields lists them in the order str() prints them.
 class Element:
-    def __init__(self, elem_type, **kwargs):
+    __slots__ = ("elem_type", "kind", "__weakref__")
+    fields = ()
+
+    # nodes with no fields of their own: nil and @
+    def __init__(self, elem_type):
         self.elem_type = elem_type
-        self.dict = {}
-        for key, value in kwargs.items():
-            self.dict[key] = value
+        self.kind = NODE_KINDS[elem_type]
 
     def get(self, key):
-        if key not in self.dict:
-            return None
-        return self.dict[key]
+        return getattr(self, key, None)
+
+    # the fields as a dict, for code that predates get()
+    @property
+    def dict(self):
+        return {field: getattr(self, field) for field in self.fields}
+
+    # Copies of values that hold nodes (closures) share them. The fields a node is
+    # parsed with never change. What is written on nodes after parsing is set per
+    # program, not per value: slot and captures, and Program.symbols, cache_sites and
+    # resolved, by env_v4.resolve_slots once per program (see there), and the
+    # interpreter's fast on BinaryOp and cache on FieldRef and MethodCall, which are
+    # checked against the operands or object every time they are used. So any copy
+    # sees the same nodes.
+    def __deepcopy__(self, memo):
+        return self
 
     def __str__(self):
         s = f"{self.elem_type}: "
-        for key, value in self.dict.items():
-            s += key + ": " + self.__val(value) + ", "
+        for field in self.fields:
+            s += field + ": " + self.__val(getattr(self, field)) + ", "
         return s[0:-2]
 
     def __val(self, v):
@@ -27,3 +90,200 @@ class Element:
                 return "[" + s[0:-2] + "]"
             return "[" + s + "]"
         return str(v)
+
+
+# every node of the tree under root_ast, parents before their children
+def walk(root_ast):
+    pending = [root_ast]
+    while pending:
+        node = pending.pop()
+        yield node
+        for field in node.fields:
+            value = getattr(node, field)
+            if isinstance(value, Element):
+                pending.append(value)
+            elif isinstance(value, list):
+                pending.extend(item for item in value if isinstance(item, Element))
+
+
+# a copy of the tree under root_ast that shares no nodes with it
+def copy_tree(root_ast):
+    copies = {}
+    for node in reversed(list(walk(root_ast))):
+        node_copy = copy.copy(node)
+        for field in node.fields:
+            value = getattr(node, field)
+            if isinstance(value, Element):
+                setattr(node_copy, field, copies[id(value)])
+            elif isinstance(value, list):
+                setattr(
+                    node_copy,
+                    field,
+                    [copies[id(item)] if isinstance(item, Element) else item for item in value],
+                )
+        copies[id(node)] = node_copy
+    return copies[id(root_ast)]
+
+
+# symbols and cache_sites are set by env_v4.resolve_slots, on the program it resolves:
+# this one, or the copy it then keeps as resolved
+class Program(Element):
+    __slots__ = ("functions", "symbols", "cache_sites", "resolved")
+    fields = ("functions",)
+
+    def __init__(self, functions):
+        super().__init__(InterpreterBase.PROGRAM_DEF)
+        self.functions = functions
+
+
+# start and end are where the function is in the program's source, from its func up to
+# just past its closing brace, for brewparse.reparse_program
+class Function(Element):
+    __slots__ = ("name", "args", "statements", "start", "end")
+    fields = ("name", "args", "statements")
+
+    def __init__(self, name, args, statements, start=None, end=None):
+        super().__init__(InterpreterBase.FUNC_DEF)
+        self.name = name
+        self.args = args
+        self.statements = statements
+        self.start = start
+        self.end = end
+
+
+class Lambda(Element):
+    __slots__ = ("args", "statements", "captures")
+    fields = ("args", "statements")
+
+    def __init__(self, args, statements):
+        super().__init__(InterpreterBase.LAMBDA_DEF)
+        self.args = args
+        self.statements = statements
+
+
+# a formal parameter, arg or refarg
+class Argument(Element):
+    __slots__ = ("name", "slot")
+    fields = ("name",)
+
+    def __init__(self, elem_type, name):
+        super().__init__(elem_type)
+        self.name = name
+
+
+# name is the variable assigned to, or a FieldRef when assigning to an object's field
+class Assignment(Element):
+    __slots__ = ("name", "expression", "slot")
+    fields = ("name", "expression")
+
+    def __init__(self, name, expression):
+        super().__init__("=")
+        self.name = name
+        self.expression = expression
+
+
+class If(Element):
+    __slots__ = ("condition", "statements", "else_statements")
+    fields = ("condition", "statements", "else_statements")
+
+    def __init__(self, condition, statements, else_statements):
+        super().__init__(InterpreterBase.IF_DEF)
+        self.condition = condition
+        self.statements = statements
+        self.else_statements = else_statements
+
+
+class While(Element):
+    __slots__ = ("condition", "statements")
+    fields = ("condition", "statements")
+
+    def __init__(self, condition, statements):
+        super().__init__(InterpreterBase.WHILE_DEF)
+        self.condition = condition
+        self.statements = statements
+
+
+class Return(Element):
+    __slots__ = ("expression",)
+    fields = ("expression",)
+
+    def __init__(self, expression):
+        super().__init__(InterpreterBase.RETURN_DEF)
+        self.expression = expression
+
+
+# neg and !
+class UnaryOp(Element):
+    __slots__ = ("op1",)
+    fields = ("op1",)
+
+    def __init__(self, elem_type, op1):
+        super().__init__(elem_type)
+        self.op1 = op1
+
+
+# fast is the interpreter's operator specialized for the operand types last seen here
+class BinaryOp(Element):
+    __slots__ = ("op1", "op2", "fast")
+    fields = ("op1", "op2")
+
+    def __init__(self, elem_type, op1, op2):
+        super().__init__(elem_type)
+        self.op1 = op1
+        self.op2 = op2
+        self.fast = None
+
+
+# int, string and bool constants
+class Literal(Element):
+    __slots__ = ("val",)
+    fields = ("val",)
+
+    def __init__(self, elem_type, val):
+        super().__init__(elem_type)
+        self.val = val
+
+
+class Variable(Element):
+    __slots__ = ("name", "slot")
+    fields = ("name",)
+
+    def __init__(self, name):
+        super().__init__(InterpreterBase.VAR_DEF)
+        self.name = name
+
+
+# obj.member, as an expression or the target of an assignment. slot is the slot of obj;
+# cache is the interpreter's inline cache for reading the member.
+class FieldRef(Element):
+    __slots__ = ("obj", "member", "slot", "cache")
+    fields = ("obj", "member")
+
+    def __init__(self, obj, member):
+        super().__init__(FIELD_REF_DEF)
+        self.obj = obj
+        self.member = member
+        self.cache = None
+
+
+class FunctionCall(Element):
+    __slots__ = ("name", "args")
+    fields = ("name", "args")
+
+    def __init__(self, name, args):
+        super().__init__(InterpreterBase.FCALL_DEF)
+        self.name = name
+        self.args = args
+
+
+# slot is the slot of objref; cache is the interpreter's inline cache for finding the method
+class MethodCall(Element):
+    __slots__ = ("objref", "name", "args", "slot", "cache")
+    fields = ("objref", "name", "args")
+
+    def __init__(self, objref, name, args):
+        super().__init__(InterpreterBase.MCALL_DEF)
+        self.objref = objref
+        self.name = name
+        self.args = args
+        self.cache = None
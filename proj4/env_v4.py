@@ -0,0 +1,273 @@
+# The EnvironmentManager class keeps a mapping between each variable name (aka symbol)
+# in a brewin program and the Value object, which stores a type, and a value.
+#
+# Scoping in v4 is dynamic (a function sees the variables of whoever called it), so a
+# name can't be bound to a fixed frame ahead of time. Instead resolve_slots() gives every
+# distinct name in the program a slot index, and the environment keeps one stack of live
+# bindings per slot with the innermost binding on top. Reading a variable is then a single
+# index into that array no matter how deeply blocks and calls are nested; entering and
+# leaving a scope pushes and pops only the bindings that scope made.
+import threading
+
+from element import FIELD_REF_DEF, Program, copy_tree, walk
+from intbase import InterpreterBase
+from type_valuev3 import Type, Value
+
+
+class EnvironmentManager:
+    def __init__(self, symbols=None):
+        # copied so names first seen at run time don't leak into a table shared by other runs
+        self.symbols = {} if symbols is None else dict(symbols)  # name -> slot
+        self.bindings = [[] for _ in range(len(self.symbols))]  # slot -> stack of Values
+        self.scopes = [set()]  # slots bound by each scope, innermost last
+
+    # returns a VariableDef object
+    def get(self, symbol):
+        slot = self.symbols.get(symbol)
+        if slot is None:
+            return None
+        return self.get_slot(slot)
+
+    def get_slot(self, slot):
+        stack = self.bindings[slot]
+        if stack:
+            return stack[-1]
+        return None
+
+    def set(self, symbol, value, force_new_var_creation=False):
+        self.set_slot(self.__slot_of(symbol), value, force_new_var_creation)
+
+    def set_slot(self, slot, value, force_new_var_creation=False):
+        stack = self.bindings[slot]
+        scope = self.scopes[-1]
+        if stack and (not force_new_var_creation or slot in scope):
+            stack[-1] = value
+            return
+
+        # symbol not found anywhere in the environment (or we must shadow it)
+        stack.append(value)
+        scope.add(slot)
+
+    # create a new symbol in the top-most environment, regardless of whether that symbol exists
+    # in a lower environment
+    def create(self, symbol, value):
+        self.set(symbol, value, force_new_var_creation=True)
+
+    # used when we enter a nested block to create a new environment for that block
+    def push(self, env=None):
+        self.scopes.append(set())
+        if env is not None:
+            for symbol, value in env.items():
+                self.create(symbol, value)
+
+    # used when we exit a nested block to discard the environment for that block
+    def pop(self):
+        bindings = self.bindings
+        for slot in self.scopes.pop():
+            bindings[slot].pop()
+
+    # the number of scopes currently pushed
+    def depth(self):
+        return len(self.scopes)
+
+    # pops scopes until only depth of them are left
+    def pop_to(self, depth):
+        while len(self.scopes) > depth:
+            self.pop()
+
+    # whether binding every name in names in a new scope would hide all the variables
+    # bound by the scopes above depth
+    def hidden_by(self, depth, names):
+        slots = {self.symbols.get(symbol) for symbol in names}
+        for scope in self.scopes[depth:]:
+            if not scope <= slots:
+                return False
+        return True
+
+    # snapshot of the variables a closure created right now should capture; captures
+    # is a tuple of (name, slot) pairs from resolve_slots(), or None for all of them.
+    # Objects and closures are left out since calls never restore them.
+    def capture(self, captures):
+        if captures is None:
+            bound = self.__enumerate()
+        else:
+            bound = ((var_name, self.get_slot(slot)) for var_name, slot in captures)
+        return CapturedEnv(
+            tuple(
+                (var_name, value.t, value.v)
+                for var_name, value in bound
+                if value is not None and value.t not in CapturedEnv.UNCAPTURED_TYPES
+            )
+        )
+
+    def __slot_of(self, symbol):
+        slot = self.symbols.get(symbol)
+        if slot is None:
+            slot = len(self.symbols)
+            self.symbols[symbol] = slot
+            self.bindings.append([])
+        return slot
+
+    def __enumerate(self):
+        for var_name, slot in self.symbols.items():
+            stack = self.bindings[slot]
+            if stack:
+                yield (var_name, stack[-1])
+
+    def __iter__(self):
+        return self.__enumerate()
+
+
+# The variables captured by a closure. The snapshot is immutable, so copies of the
+# closure (made whenever it's passed by value or returned) share it; each copy only
+# gets its own Value cells, which calls may update, once it is first called.
+class CapturedEnv:
+    UNCAPTURED_TYPES = (Type.OBJECT, Type.CLOSURE)
+
+    def __init__(self, snapshot=()):
+        self.snapshot = snapshot  # tuple of (name, type, value)
+        self.cells = None
+
+    def __deepcopy__(self, memo):
+        if self.cells is None:
+            return CapturedEnv(self.snapshot)
+        return CapturedEnv(tuple((var_name, cell.t, cell.v) for var_name, cell in self.cells))
+
+    def __iter__(self):
+        if self.cells is None:
+            self.cells = [(var_name, Value(t, v)) for var_name, t, v in self.snapshot]
+        return iter(self.cells)
+
+
+NAME_NODES = (InterpreterBase.VAR_DEF, "=", InterpreterBase.ARG_DEF, InterpreterBase.REFARG_DEF)
+OBJECT_NODES = {FIELD_REF_DEF: "obj", InterpreterBase.MCALL_DEF: "objref"}
+BUILTIN_FUNCS = ("print", "inputi")
+
+
+# Gives every var and = node (and every formal parameter name) of a program a slot
+# in the environment, stored on the node as its slot attribute. A field_ref (a.b) or
+# method call (a.f()) gets the slot of its object, a; an assignment to a field leaves
+# that to its field_ref. Each lambda node also gets a captures attribute
+# listing the (name, slot) pairs its closure has to capture (see resolve_captures).
+#
+# Returns the program as resolved, with its name -> slot table as its symbols, and the
+# field_ref and method call nodes, whose inline caches the interpreter clears, as its
+# cache_sites. The
+# annotations only depend on the program, so a tree brewcache hands to every
+# interpreter is resolved once, in place, and the same way whoever resolves it.
+# reparse_program, though, builds new programs out of an old one's nodes, and two
+# programs can give the same node different slots. So the first program to resolve a
+# node claims it, and a program with functions another has claimed resolves a copy of
+# them instead, in a new program node kept as the original's resolved attribute.
+def resolve_slots(program_ast):
+    if getattr(program_ast, "symbols", None) is not None:
+        return program_ast
+    resolved = getattr(program_ast, "resolved", None)
+    if resolved is not None:
+        return resolved
+
+    with resolve_lock:
+        functions = [
+            copy_tree(func_def) if _claimed(func_def) else func_def
+            for func_def in program_ast.functions
+        ]
+        if all(a is b for a, b in zip(functions, program_ast.functions)):
+            resolved = program_ast
+        else:
+            resolved = Program(functions)
+
+        symbols = {"this": 0}
+        lambdas = []
+        cache_sites = []
+        for node in walk(resolved):
+            var_name = _var_name(node)
+            if var_name is not None:
+                if var_name not in symbols:
+                    symbols[var_name] = len(symbols)
+                node.slot = symbols[var_name]
+                if node.elem_type in OBJECT_NODES:
+                    cache_sites.append(node)
+            elif node.elem_type == InterpreterBase.LAMBDA_DEF:
+                lambdas.append(node)
+        resolve_captures(resolved, lambdas, symbols)
+
+        resolved.symbols = symbols
+        resolved.cache_sites = cache_sites
+        if resolved is not program_ast:
+            program_ast.resolved = resolved
+    return resolved
+
+
+resolve_lock = threading.Lock()
+
+
+# whether a program other than the one being resolved has annotated the nodes of a
+# function. reparse_program only shares whole functions, so the first node that
+# resolving annotates tells for all of them.
+def _claimed(func_ast):
+    for node in walk(func_ast):
+        if _var_name(node) is not None:
+            return hasattr(node, "slot")
+        if node.elem_type == InterpreterBase.LAMBDA_DEF:
+            return hasattr(node, "captures")
+    return False
+
+
+# Scoping is dynamic, so a lambda's body can see a captured variable either directly
+# or from any function it calls. A lambda therefore captures the names used in its own
+# body plus those used by every top-level function it can reach through calls by name.
+# A call through a variable or a method call could run anything, and then the lambda
+# captures every variable, as it always did before.
+def resolve_captures(program_ast, lambdas, symbols):
+    func_names = {func_def.get("name") for func_def in program_ast.get("functions")}
+    func_refs = {}
+    for func_def in program_ast.get("functions"):
+        names, calls, unknown = func_refs.get(func_def.get("name"), (set(), set(), False))
+        func_names_used, func_calls, func_unknown = _references(func_def, func_names)
+        func_refs[func_def.get("name")] = (
+            names | func_names_used, calls | func_calls, unknown or func_unknown
+        )
+
+    for lambda_ast in lambdas:
+        names, calls, unknown = _references(lambda_ast, func_names)
+        pending, seen = list(calls), set(calls)
+        while pending and not unknown:
+            callee_names, callee_calls, unknown = func_refs[pending.pop()]
+            names |= callee_names
+            for callee in callee_calls - seen:
+                seen.add(callee)
+                pending.append(callee)
+        if unknown:
+            lambda_ast.captures = None
+        else:
+            lambda_ast.captures = tuple((var_name, symbols[var_name]) for var_name in sorted(names))
+
+
+# names used, functions called by name and whether anything else is called in a subtree
+def _references(root_ast, func_names):
+    names, calls, unknown = set(), set(), False
+    for node in walk(root_ast):
+        kind = node.elem_type
+        var_name = _var_name(node)
+        if var_name is not None:
+            names.add(var_name)
+        if kind == InterpreterBase.FCALL_DEF:
+            func_name = node.get("name")
+            if func_name in func_names:
+                calls.add(func_name)
+            elif func_name not in BUILTIN_FUNCS:
+                unknown = True
+        elif kind == InterpreterBase.MCALL_DEF:
+            unknown = True
+    return names, calls, unknown
+
+
+# the variable a node reads or binds, if any
+def _var_name(node):
+    kind = node.elem_type
+    if kind in NAME_NODES:
+        var_name = node.get("name")
+        return var_name if isinstance(var_name, str) else None
+    if kind in OBJECT_NODES:
+        return node.get(OBJECT_NODES[kind])
+    return None
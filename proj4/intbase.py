@@ -1,5 +1,9 @@
 # Base class for our interpreter
+import mmap
+import sys
+from collections import deque
 from enum import Enum
+from itertools import islice
 
 
 class ErrorType(Enum):
@@ -9,6 +13,141 @@ class ErrorType(Enum):
     # Add others here
 
 
+# Output sinks. An interpreter given one sends each line its program prints to the sink
+# instead of printing it and keeping it in output_log, and get_output() returns whatever
+# lines the sink keeps. The base class keeps nothing.
+class OutputSink:
+    def write(self, line):
+        pass
+
+    # called at the end of every run
+    def flush(self):
+        pass
+
+    def lines(self):
+        return []
+
+
+# Throws every line away
+class DiscardSink(OutputSink):
+    pass
+
+
+# Keeps only the last capacity lines
+class RingSink(OutputSink):
+    def __init__(self, capacity=1000):
+        self.buffer = deque(maxlen=capacity)
+
+    def write(self, line):
+        self.buffer.append(line)
+
+    def lines(self):
+        return list(self.buffer)
+
+
+# Writes to a text stream (stdout by default) flush_lines lines at a time, each batch
+# in a single write call
+class StreamSink(OutputSink):
+    def __init__(self, stream=None, flush_lines=1024):
+        self.stream = sys.stdout if stream is None else stream
+        self.flush_lines = flush_lines
+        self.pending = []
+
+    def write(self, line):
+        self.pending.append(str(line))
+        if len(self.pending) >= self.flush_lines:
+            self.__write_pending()
+
+    def flush(self):
+        self.__write_pending()
+        self.stream.flush()
+
+    def __write_pending(self):
+        if self.pending:
+            self.pending.append("")
+            self.stream.write("\n".join(self.pending))
+            self.pending.clear()
+
+
+# A StreamSink that writes to the file at path, which it owns until close()
+class FileSink(StreamSink):
+    def __init__(self, path, flush_lines=1024):
+        super().__init__(open(path, "w"), flush_lines)
+
+    def close(self):
+        self.flush()
+        self.stream.close()
+
+
+# Input sources. An interpreter whose inp is one reads its input from it one line at a
+# time, as the program asks for it, rather than from a list built up front. next_line()
+# returns None once the input runs out, like the end of an inp list.
+class InputSource:
+    def next_line(self):
+        return None
+
+
+# Reads lines from any iterable, e.g. a generator or an open file, read_ahead lines at a
+# time. Trailing newlines are dropped, as input() does. Lines may be str, or bytes (as
+# from a file opened in binary mode), which are decoded with encoding; anything else is
+# a TypeError as soon as it is read.
+class IterSource(InputSource):
+    def __init__(self, lines, read_ahead=1024, encoding="utf-8"):
+        self.lines = iter(lines)
+        self.read_ahead = read_ahead
+        self.encoding = encoding
+        self.buffer = []
+        self.cursor = 0
+        self.line_number = 0
+
+    def next_line(self):
+        if self.cursor == len(self.buffer):
+            self.buffer = list(islice(self.lines, self.read_ahead))
+            self.cursor = 0
+            if not self.buffer:
+                return None
+        line = self.buffer[self.cursor]
+        self.cursor += 1
+        self.line_number += 1
+        if not isinstance(line, str):
+            if not isinstance(line, (bytes, bytearray)):
+                raise TypeError(
+                    f"input line {self.line_number} is {type(line).__name__}, not str or bytes"
+                )
+            line = line.decode(self.encoding)
+        return line.rstrip("\r\n")
+
+
+# Reads the lines of the file at path through a read-only memory map, finding each
+# newline only when the line is asked for, so the file is never read in as a whole
+class MmapSource(InputSource):
+    def __init__(self, path, encoding="utf-8"):
+        self.encoding = encoding
+        self.position = 0
+        with open(path, "rb") as input_file:
+            # an empty file can't be mapped
+            if input_file.seek(0, 2) == 0:
+                self.map = b""
+                return
+            self.map = mmap.mmap(input_file.fileno(), 0, access=mmap.ACCESS_READ)
+        if hasattr(self.map, "madvise") and hasattr(mmap, "MADV_SEQUENTIAL"):
+            self.map.madvise(mmap.MADV_SEQUENTIAL)
+
+    def next_line(self):
+        start = self.position
+        if start >= len(self.map):
+            return None
+        end = self.map.find(b"\n", start)
+        if end < 0:
+            end = len(self.map)
+        self.position = end + 1
+        return self.map[start:end].decode(self.encoding).rstrip("\r")
+
+    def close(self):
+        if isinstance(self.map, mmap.mmap):
+            self.map.close()
+
+
 class InterpreterBase:
     # AST node types
     PROGRAM_DEF = "program"
@@ -34,9 +173,14 @@ class InterpreterBase:
     NOT_DEF = "!"
 
     # methods
-    def __init__(self, console_output=True, inp=None):
+    def __init__(self, console_output=True, inp=None, output_sink=None):
         self.console_output = console_output
-        self.inp = inp  # if not none, then read input from passed-in list
+        # if not none, then read input from passed-in list or InputSource; any other
+        # iterator over lines (e.g. an open file) is read through an IterSource
+        if inp is not None and not isinstance(inp, InputSource) and hasattr(inp, "__next__"):
+            inp = IterSource(inp)
+        self.inp = inp
+        self.output_sink = output_sink  # if not none, an OutputSink that gets all output
         self.reset()
 
     # Call to reset I/O for another run of the program
@@ -51,6 +195,8 @@ class InterpreterBase:
         pass
 
     def get_input(self):
+        if isinstance(self.inp, InputSource):
+            return self.inp.next_line()
         if not self.inp:
             return input()  # Get input from keyboard if not input list provided
 
@@ -75,11 +221,21 @@ class InterpreterBase:
         raise Exception(f"{error_type} on line {line_num}{description}")
 
     def output(self, v):
+        if self.output_sink is not None:
+            self.output_sink.write(v)
+            return
         if self.console_output:
             print(v)
         self.output_log.append(v)
 
+    # writes out anything the output sink is holding back
+    def flush_output(self):
+        if self.output_sink is not None:
+            self.output_sink.flush()
+
     def get_output(self):
+        if self.output_sink is not None:
+            return self.output_sink.lines()
         return self.output_log
 
     def get_error_type_and_line(self):
@@ -2,45 +2,232 @@ import copy
 from enum import Enum
 
 from brewparse import parse_program
-from env_v3 import EnvironmentManager
+from bytecode_v4 import (
+    ASSIGN,
+    ASSIGN_COPY,
+    BINARY_OP,
+    BIND_ARG,
+    CALL,
+    COPY,
+    INPUT_INT,
+    JUMP,
+    JUMP_IF_DECIDED,
+    JUMP_IF_FALSE,
+    JUMP_IF_OBJECT,
+    LOAD_CONST,
+    LOAD_FIELD,
+    LOAD_LITERAL,
+    LOAD_NAME,
+    LOAD_NIL,
+    MAKE_CLOSURE,
+    NEW_OBJECT,
+    OUTPUT_VALUE,
+    POP,
+    POP_SCOPE,
+    PRINT_ARG,
+    PRINT_BEGIN,
+    PRINT_END,
+    PUSH_SCOPE,
+    RESOLVE_FUNC,
+    RESOLVE_METHOD,
+    RETURN,
+    RETURN_NIL,
+    UNARY_OP,
+    compile_function,
+    has_calls,
+)
+from element import FIELD_REF_DEF, FieldRef, kind_table
+from env_v4 import CapturedEnv, EnvironmentManager, resolve_slots
 from intbase import InterpreterBase, ErrorType
-from type_valuev3 import Closure, Type, Value, Object, create_value, get_printable
+from optimize_v4 import fold_constants
+from type_valuev3 import (
+    Closure,
+    Type,
+    Value,
+    Epoch,
+    Object,
+    NIL,
+    TRUE,
+    bool_value,
+    copy_value,
+    get_printable,
+    int_value,
+    is_interned,
+    new_value,
+)
 
 TRACE = False
 
 class ExecStatus(Enum):
     CONTINUE = 1
     RETURN = 2
+    TAIL_CALL = 3  # return f(...): the value is (closure, env) of the call still to run
+
+
+# what a compiled return f(...) gives back in the closure engine: the call still to run
+class TailCall:
+    __slots__ = ("closure", "env")
+
+    def __init__(self, closure, env):
+        self.closure = closure
+        self.env = env
 
 
 # Main interpreter class
 class Interpreter(InterpreterBase):
     # constants
-    NIL_VALUE = create_value(InterpreterBase.NIL_DEF)
-    TRUE_VALUE = create_value(InterpreterBase.TRUE_DEF)
+    NIL_VALUE = NIL
+    TRUE_VALUE = TRUE
     BIN_OPS = {"+", "-", "*", "/", "==", "!=", ">", ">=", "<", "<=", "||", "&&"}
+    # the int and string operators on the operands' Python values; op_to_lambda wraps
+    # them, and a node whose operands are both of one of these types calls them directly
+    FAST_OPS = {
+        Type.INT: {
+            "+": lambda x, y: int_value(x + y),
+            "-": lambda x, y: int_value(x - y),
+            "*": lambda x, y: int_value(x * y),
+            "/": lambda x, y: int_value(x // y),
+            "==": lambda x, y: bool_value(x == y),
+            "!=": lambda x, y: bool_value(x != y),
+            "<": lambda x, y: bool_value(x < y),
+            "<=": lambda x, y: bool_value(x <= y),
+            ">": lambda x, y: bool_value(x > y),
+            ">=": lambda x, y: bool_value(x >= y),
+        },
+        Type.STRING: {
+            "+": lambda x, y: Value(Type.STRING, x + y),
+            "==": lambda x, y: bool_value(x == y),
+            "!=": lambda x, y: bool_value(x != y),
+        },
+    }
+    LITERAL_TYPES = {
+        InterpreterBase.INT_DEF: Type.INT,
+        InterpreterBase.STRING_DEF: Type.STRING,
+        InterpreterBase.BOOL_DEF: Type.BOOL,
+    }
+    UNARY_OPS = {
+        InterpreterBase.NEG_DEF: (Type.INT, lambda x: int_value(-1 * x)),
+        InterpreterBase.NOT_DEF: (Type.BOOL, lambda x: bool_value(not x)),
+    }
+    # "tree" walks the AST directly, "vm" compiles each function to bytecode first,
+    # "closure" compiles each AST node into a Python closure first. The vm keeps its
+    # call frames and operands in lists of its own rather than on the Python stack, so
+    # it's the engine to use for deep recursion or very deeply nested expressions.
+    ENGINES = {"tree", "vm", "closure"}
+    # functions __call_func runs itself rather than through a closure
+    BUILTIN_FUNCS = {"print", "inputi"}
 
     # methods
-    def __init__(self, console_output=True, inp=None, trace_output=TRACE):
-        super().__init__(console_output, inp)
+    # ast_cache is an optional brewcache.ASTCache used to skip re-parsing programs
+    # profiler is an optional profile_v4.Profiler that records where the tree engine spends time
+    # optimize folds constant expressions and drops dead if/while arms before running
+    # short_circuit makes && and || skip their right operand when the left one decides
+    # the result (by default both operands are always evaluated)
+    def __init__(self, console_output=True, inp=None, trace_output=TRACE, engine="tree",
+                 ast_cache=None, profiler=None, optimize=True, short_circuit=False,
+                 output_sink=None):
+        super().__init__(console_output, inp, output_sink)
+        if engine not in Interpreter.ENGINES:
+            raise ValueError(f"Unknown engine {engine}")
         self.trace_output = trace_output
+        self.trace_statement = print
+        self.engine = engine
+        self.ast_cache = ast_cache
+        self.optimize = optimize
+        self.short_circuit = short_circuit
+        self.profiler = profiler
+        # tail calls run in the caller's loop in __run_closure, which would hide them
+        # from the profiler, so they're only eliminated when not profiling
+        self.tail_calls = profiler is None
+        if profiler is not None:
+            if engine != "tree":
+                raise ValueError("Profiling is only supported by the tree engine")
+            self.__install_profiler()
         self.__setup_ops()
+        self.__setup_handlers()
+
+    # routes calls and statements through the profiler by shadowing the methods that run
+    # them with instance attributes, so an unprofiled interpreter runs the plain methods
+    def __install_profiler(self):
+        profiler = self.profiler
+        call_func, call_mcall = self.__call_func, self.__call_mcall
+        self.__call_func = lambda call_ast: profiler.call(
+            call_ast.get("name"), call_func, call_ast
+        )
+        self.__call_mcall = lambda call_ast: profiler.call(
+            call_ast.get("objref") + "." + call_ast.get("name"), call_mcall, call_ast
+        )
+
+        # statements are counted through the tracing hook in __run_statements
+        if self.trace_output:
+            def trace_statement(statement):
+                print(statement)
+                profiler.count_statement(statement)
+
+            self.trace_statement = trace_statement
+        else:
+            self.trace_statement = profiler.count_statement
+        self.trace_output = True
 
     # run a program that's provided in a string
     # usese the provided Parser found in brewparse.py to parse the program
     # into an abstract syntax tree (ast)
     def run(self, program):
-        ast = parse_program(program)
-        self.__set_up_function_table(ast)
-        self.env = EnvironmentManager()
-        main_func = self.__get_func_by_name("main", 0)
-        if main_func is None:
-            super().error(ErrorType.NAME_ERROR, f"Function main not found")
-        self.__run_statements(main_func.func_ast.get("statements"))
+        resolved = None
+        try:
+            if self.ast_cache is not None:
+                ast = self.ast_cache.parse(program)
+            else:
+                ast = parse_program(program)
+            # slots come from the tree as parsed, so the nodes folding leaves shared
+            # keep the same slots whichever interpreter folded them, and however it did
+            ast = resolved = resolve_slots(ast)
+            symbols = ast.symbols
+            # the objects of a run and what it caches about them are its own, so a
+            # cached program keeps nothing of them once the run is over
+            self.epoch = Epoch()
+            Interpreter.__clear_caches(resolved)
+            if self.optimize:
+                ast = fold_constants(ast, self.__eval_constant)
+            self.__set_up_function_table(ast)
+            self.env = EnvironmentManager(symbols)
+            main_func = self.__get_func_by_name("main", 0)
+            if main_func is None:
+                super().error(ErrorType.NAME_ERROR, f"Function main not found")
+            if self.engine == "vm":
+                self.code_cache = {}
+                self.__run_vm(main_func)
+            elif self.engine == "closure":
+                self.compiled_bodies = {}
+                self.__run_compiled(main_func, {})
+            elif self.profiler is not None:
+                self.profiler.call("main", self.__run_closure, main_func, {})
+            else:
+                # main goes through the call loop too, so a return f(...) in it is run
+                self.__run_closure(main_func, {})
+        finally:
+            if resolved is not None:
+                Interpreter.__clear_caches(resolved)
+            super().flush_output()
+
+    @staticmethod
+    def __clear_caches(program_ast):
+        for site_ast in program_ast.cache_sites:
+            site_ast.cache = None
+
+    # the Value of an expression of literals and operators for fold_constants, or None if
+    # evaluating it is an error, which is then left for the program to run into
+    def __eval_constant(self, expr_ast):
+        error_type, error_line = self.error_type, self.error_line
+        try:
+            return self.__eval_expr(expr_ast)
+        except Exception:
+            self.error_type, self.error_line = error_type, error_line
+            return None
 
     def __set_up_function_table(self, ast):
         self.func_name_to_ast = {}
-        empty_env = EnvironmentManager()
+        empty_env = CapturedEnv()
         for func_def in ast.get("functions"):
             func_name = func_def.get("name")
             num_params = len(func_def.get("args"))
@@ -90,57 +277,51 @@ class Interpreter(InterpreterBase):
         self.env.push()
         for statement in statements:
             if self.trace_output:
-                print(statement)
-            status = ExecStatus.CONTINUE
-            if statement.elem_type == InterpreterBase.FCALL_DEF:
-                self.__call_func(statement)
-            elif statement.elem_type == "=":
-                self.__assign(statement)
-            elif statement.elem_type == InterpreterBase.RETURN_DEF:
-                status, return_val = self.__do_return(statement)
-            elif statement.elem_type == Interpreter.IF_DEF:
-                status, return_val = self.__do_if(statement)
-            elif statement.elem_type == Interpreter.WHILE_DEF:
-                status, return_val = self.__do_while(statement)
-            
-            #ADDED
-            elif statement.elem_type == Interpreter.MCALL_DEF:
-                self.__call_mcall(statement)
-
-            if status == ExecStatus.RETURN:
-                self.env.pop()
-                return (status, return_val)
+                self.trace_statement(statement)
+            handler = self.statement_handlers[statement.kind]
+            if handler is None:
+                continue
+            result = handler(statement)
+            if result is not None and result[0] != ExecStatus.CONTINUE:
+                # a pending tail call still sees this scope; __run_closure pops it
+                if result[0] == ExecStatus.RETURN:
+                    self.env.pop()
+                return result
 
         self.env.pop()
         return (ExecStatus.CONTINUE, Interpreter.NIL_VALUE)
 
+    # a call used as a statement; its value is discarded
+    def __exec_call(self, call_ast):
+        self.__call_func(call_ast)
+
+    def __exec_mcall(self, call_ast):
+        self.__call_mcall(call_ast)
+
     # ADDED
     def __call_mcall(self, call_ast):
+        target_closure, new_env = self.__resolve_method(call_ast)
+        self.__prepare_params(target_closure.func_ast, call_ast, new_env)
+        return self.__run_closure(target_closure, new_env)
+
+    # finds the closure for a method call and sets up its environment
+    def __resolve_method(self, call_ast):
         obj_name, mem_name = call_ast.get("objref"), call_ast.get("name")
 
         # Check if object exists
-        name = obj_name + "." + mem_name
-        obj_name, mem_name = self.__parse_obj_with_field(name)
+        obj_value = self.__get_object(obj_name, call_ast.slot)
 
         # Check if call is a closure call
-        object = self.env.get(obj_name).value()
-        member = object.ret_member(mem_name)
+        member = self.__lookup_member(call_ast, obj_value.value(), mem_name)
         if member == None:
             super().error(ErrorType.NAME_ERROR, f"Member function {mem_name} not found under {obj_name}")
         if member.type() != Type.CLOSURE:
             super().error(ErrorType.TYPE_ERROR, f"Member {mem_name} under {obj_name} is not a closure")
 
-        # Call mcall
         target_closure = member.value()
-        target_ast = target_closure.func_ast
-
-        new_env = {"this": self.env.get(obj_name)}
+        new_env = {"this": obj_value}
         self.__prepare_env_with_closed_variables(target_closure, new_env)
-        self.__prepare_params(target_ast,call_ast, new_env)
-        self.env.push(new_env)
-        _, return_val = self.__run_statements(target_ast.get("statements"))
-        self.env.pop()
-        return return_val
+        return target_closure, new_env
 
 
     def __call_func(self, call_ast):
@@ -150,21 +331,59 @@ class Interpreter(InterpreterBase):
         if func_name == "inputi":
             return self.__call_input(call_ast)
 
+        target_closure, new_env = self.__resolve_func(call_ast)
+        self.__prepare_params(target_closure.func_ast, call_ast, new_env)
+        return self.__run_closure(target_closure, new_env)
+
+    # Runs a function's body with new_env as its first scope. When the body ends with a
+    # tail call (see __do_return), the callee runs in this same loop instead of a nested
+    # Python call, so tail recursion is limited by memory rather than the Python stack.
+    # Scoping is dynamic, so the caller's variables stay visible to the callee; they
+    # are only dropped early when the callee's parameters hide every one of them.
+    def __run_closure(self, target_closure, new_env):
+        env = self.env
+        base = frame_base = env.depth()
+        tail_called = False
+        while True:
+            env.push(new_env)
+            status, return_val = self.__run_statements(target_closure.func_ast.get("statements"))
+            if status != ExecStatus.TAIL_CALL:
+                break
+            target_closure, new_env = return_val
+            tail_called = True
+            if env.hidden_by(frame_base, new_env):
+                env.pop_to(frame_base)
+            else:
+                frame_base = env.depth()
+        env.pop_to(base)
+        if tail_called:
+            # the copy the caller's own return would have made
+            return copy_value(return_val)
+        return return_val
+
+    # resolves the function or method a return statement calls and evaluates its
+    # arguments, all in the caller's environment as an ordinary call would
+    def __prepare_tail_call(self, call_ast):
+        if call_ast.elem_type == InterpreterBase.MCALL_DEF:
+            target_closure, new_env = self.__resolve_method(call_ast)
+        else:
+            target_closure, new_env = self.__resolve_func(call_ast)
+        self.__prepare_params(target_closure.func_ast, call_ast, new_env)
+        return (ExecStatus.TAIL_CALL, (target_closure, new_env))
+
+    # finds the closure for a (non built-in) function call and sets up its environment
+    def __resolve_func(self, call_ast):
+        func_name = call_ast.get("name")
         actual_args = call_ast.get("args")
         target_closure = self.__get_func_by_name(func_name, len(actual_args))
         if target_closure == None:
             super().error(ErrorType.NAME_ERROR, f"Function {func_name} not found")
         if target_closure.type != Type.CLOSURE:
             super().error(ErrorType.TYPE_ERROR, f"Function {func_name} is changed to non-function type.")
-        target_ast = target_closure.func_ast
 
         new_env = {}
         self.__prepare_env_with_closed_variables(target_closure, new_env)
-        self.__prepare_params(target_ast,call_ast, new_env)
-        self.env.push(new_env)
-        _, return_val = self.__run_statements(target_ast.get("statements"))
-        self.env.pop()
-        return return_val
+        return target_closure, new_env
 
     def __prepare_env_with_closed_variables(self, target_closure, temp_env):
         for var_name, value in target_closure.captured_env:
@@ -174,21 +393,27 @@ class Interpreter(InterpreterBase):
 
 
     def __prepare_params(self, target_ast, call_ast, temp_env):
+        self.__check_arg_count(target_ast, call_ast)
+        for formal_ast, actual_ast in zip(target_ast.get("args"), call_ast.get("args")):
+            temp_env[formal_ast.get("name")] = self.__bind_arg(
+                formal_ast, self.__eval_expr(actual_ast)
+            )
+
+    def __check_arg_count(self, target_ast, call_ast):
         actual_args = call_ast.get("args")
-        formal_args = target_ast.get("args")
-        if len(actual_args) != len(formal_args):
+        if len(actual_args) != len(target_ast.get("args")):
             super().error(
                 ErrorType.NAME_ERROR,
                 f"Function {target_ast.get('name')} with {len(actual_args)} args not found",
             )
 
-        for formal_ast, actual_ast in zip(formal_args, actual_args):
-            if formal_ast.elem_type == InterpreterBase.REFARG_DEF:
-                result = self.__eval_expr(actual_ast)
-            else:
-                result = copy.deepcopy(self.__eval_expr(actual_ast))
-            arg_name = formal_ast.get("name")
-            temp_env[arg_name] = result
+    @staticmethod
+    def __bind_arg(formal_ast, result):
+        if formal_ast.elem_type == InterpreterBase.REFARG_DEF:
+            if is_interned(result):
+                return Value(result.t, result.v)
+            return result
+        return copy_value(result)
 
     def __call_print(self, call_ast):
         output = ""
@@ -209,26 +434,28 @@ class Interpreter(InterpreterBase):
             )
         inp = super().get_input()
         if call_ast.get("name") == "inputi":
-            return Value(Type.INT, int(inp))
+            return int_value(int(inp))
         if call_ast.get("name") == "inputs":
             return Value(Type.STRING, inp)
 
     def __assign(self, assign_ast):
-        var_name = assign_ast.get("name")
         evaluated_obj = self.__eval_expr(assign_ast.get("expression"))
 
-        if assign_ast.get("expression").elem_type == InterpreterBase.VAR_DEF and "." in assign_ast.get("expression").get("name"):
+        if assign_ast.get("expression").elem_type == FIELD_REF_DEF:
             src_value_obj = evaluated_obj
         elif evaluated_obj.type() == Type.OBJECT:
             src_value_obj = evaluated_obj
         else:
             src_value_obj = copy.copy(self.__eval_expr(assign_ast.get("expression")))
+        self.__assign_value(assign_ast, src_value_obj)
 
+    def __assign_value(self, assign_ast, src_value_obj):
+        var_name = assign_ast.get("name")
         # ADDED
         # Handle object field assignment
-        if "." in var_name:
-            obj_name, member_name = self.__parse_obj_with_field(var_name)
-            targ_obj = self.env.get(obj_name).value()
+        if isinstance(var_name, FieldRef):
+            member_name = var_name.get("member")
+            targ_obj = self.__get_object(var_name.get("obj"), var_name.slot).value()
             if member_name == "proto":
                 if src_value_obj.type() == Type.OBJECT:
                     targ_obj.add_proto(src_value_obj)
@@ -240,9 +467,9 @@ class Interpreter(InterpreterBase):
                 targ_obj.push_member(member_name, src_value_obj)
 
         else:
-            target_value_obj = self.env.get(var_name)
+            target_value_obj = self.env.get_slot(assign_ast.slot)
             if target_value_obj is None:
-                self.env.set(var_name, src_value_obj)
+                self.env.set_slot(assign_ast.slot, src_value_obj)
             else:
                             # if a close is changed to another type such as int, we cannot make function calls on it any more 
                 if target_value_obj.t == Type.CLOSURE and src_value_obj.t != Type.CLOSURE:
@@ -251,54 +478,50 @@ class Interpreter(InterpreterBase):
         
 
     def __eval_expr(self, expr_ast):
-        if expr_ast.elem_type == InterpreterBase.NIL_DEF:
-            return Interpreter.NIL_VALUE
-        if expr_ast.elem_type == InterpreterBase.INT_DEF:
-            return Value(Type.INT, expr_ast.get("val"))
-        if expr_ast.elem_type == InterpreterBase.STRING_DEF:
-            return Value(Type.STRING, expr_ast.get("val"))
-        if expr_ast.elem_type == InterpreterBase.BOOL_DEF:
-            return Value(Type.BOOL, expr_ast.get("val"))
-        if expr_ast.elem_type == InterpreterBase.VAR_DEF:
-            return self.__eval_name(expr_ast)
-        if expr_ast.elem_type == InterpreterBase.FCALL_DEF:
-            return self.__call_func(expr_ast)
-        if expr_ast.elem_type in Interpreter.BIN_OPS:
-            return self.__eval_op(expr_ast)
-        if expr_ast.elem_type == Interpreter.NEG_DEF:
-            return self.__eval_unary(expr_ast, Type.INT, lambda x: -1 * x)
-        if expr_ast.elem_type == Interpreter.NOT_DEF:
-            return self.__eval_unary(expr_ast, Type.BOOL, lambda x: not x)
-        if expr_ast.elem_type == Interpreter.LAMBDA_DEF:
-            return Value(Type.CLOSURE, Closure(expr_ast, self.env))
+        return self.expr_handlers[expr_ast.kind](expr_ast)
 
-        
-        # ADDED
-        if expr_ast.elem_type == Interpreter.OBJ_DEF:
-            return Value(Type.OBJECT, Object())
-        if expr_ast.elem_type == Interpreter.MCALL_DEF:
-            return self.__call_mcall(expr_ast)
+    # the tree engine dispatches statements and expressions through tables indexed by
+    # node kind. Built after the profiler (if any) is installed, so calls made through
+    # the tables are profiled too.
+    def __setup_handlers(self):
+        # a handler returns None, or (ExecStatus, return value) for control flow
+        self.statement_handlers = kind_table({
+            InterpreterBase.FCALL_DEF: self.__exec_call,
+            "=": self.__assign,
+            InterpreterBase.RETURN_DEF: self.__do_return,
+            InterpreterBase.IF_DEF: self.__do_if,
+            InterpreterBase.WHILE_DEF: self.__do_while,
+            InterpreterBase.MCALL_DEF: self.__exec_mcall,
+        })
+
+        expr_handlers = {
+            InterpreterBase.NIL_DEF: lambda expr_ast: Interpreter.NIL_VALUE,
+            InterpreterBase.INT_DEF: lambda expr_ast: int_value(expr_ast.get("val")),
+            InterpreterBase.STRING_DEF: lambda expr_ast: Value(Type.STRING, expr_ast.get("val")),
+            InterpreterBase.BOOL_DEF: lambda expr_ast: bool_value(expr_ast.get("val")),
+            InterpreterBase.VAR_DEF: self.__eval_name,
+            FIELD_REF_DEF: self.__eval_field,
+            InterpreterBase.FCALL_DEF: self.__call_func,
+            InterpreterBase.LAMBDA_DEF: lambda expr_ast: Value(
+                Type.CLOSURE, Closure(expr_ast, self.env.capture(expr_ast.captures))
+            ),
+            InterpreterBase.OBJ_DEF: lambda expr_ast: Value(Type.OBJECT, Object(self.epoch)),
+            InterpreterBase.MCALL_DEF: self.__call_mcall,
+        }
+        for oper in Interpreter.BIN_OPS:
+            expr_handlers[oper] = self.__eval_op
+        if self.short_circuit:
+            expr_handlers["&&"] = expr_handlers["||"] = self.__eval_short_circuit
+        for oper, (t, f) in Interpreter.UNARY_OPS.items():
+            expr_handlers[oper] = lambda expr_ast, t=t, f=f: self.__eval_unary(expr_ast, t, f)
+        self.expr_handlers = kind_table(expr_handlers, default=lambda expr_ast: None)
 
     def __eval_name(self, name_ast):
         var_name = name_ast.get("name")
-        val = self.env.get(var_name)
+        val = self.env.get_slot(name_ast.slot)
         if val is not None:
             return val
-        # ADDED
-        if "." in var_name:
-            obj_name, mem_name = self.__parse_obj_with_field(var_name)
-            object = self.env.get(obj_name).value()
-            if mem_name == 'proto':
-                if object.proto == None:
-                    super().error(ErrorType.NAME_ERROR, f"Proto not found under {obj_name}")
-                else:
-                    return object.proto
-            val = object.ret_member(mem_name)
-            if val == None:
-                super().error(ErrorType.NAME_ERROR, f"Member field {mem_name} not found under {obj_name}")
-            return val
-            
-            
+
         closure = self.__get_func_by_name(var_name, None)
         if closure is None:
             super().error(
@@ -306,30 +529,110 @@ class Interpreter(InterpreterBase):
             )
         return Value(Type.CLOSURE, closure)
 
-    
+    # ADDED
+    def __eval_field(self, field_ast):
+        obj_name, mem_name = field_ast.get("obj"), field_ast.get("member")
+        object = self.__get_object(obj_name, field_ast.slot).value()
+        if mem_name == 'proto':
+            if object.proto == None:
+                super().error(ErrorType.NAME_ERROR, f"Proto not found under {obj_name}")
+            else:
+                return object.proto
+        val = self.__lookup_member(field_ast, object, mem_name)
+        if val == None:
+            super().error(ErrorType.NAME_ERROR, f"Member field {mem_name} not found under {obj_name}")
+        return val
+
+    # Finds a member of object for the field_ref or mcall node site_ast. A member of the
+    # object itself or of its first prototype is found as ret_member() would find it;
+    # past that, the node's inline cache holds (first prototype, epoch count, holder),
+    # which stays right for objects with that first prototype until the run's epoch
+    # moves, since neither object has been given the member (or it would be found first).
+    def __lookup_member(self, site_ast, object, mem_name):
+        members = object.members
+        if mem_name in members:
+            return members[mem_name]
+        proto = object.proto
+        if proto is None:
+            return None
+        first = proto.v
+        if mem_name in first.members:
+            return first.members[mem_name]
+        cache = site_ast.cache
+        if cache is not None and cache[0] is first and cache[1] == self.epoch.count:
+            return cache[2].members[mem_name]
+
+        holder = object.find_holder(mem_name)
+        if holder is None:
+            return None
+        site_ast.cache = (first, self.epoch.count, holder)
+        return holder.members[mem_name]
+
 
     def __eval_op(self, arith_ast):
-        left_value_obj = self.__eval_expr(arith_ast.get("op1"))
-        right_value_obj = self.__eval_expr(arith_ast.get("op2"))
+        left_value_obj = self.__eval_expr(arith_ast.op1)
+        right_value_obj = self.__eval_expr(arith_ast.op2)
+        fast = arith_ast.fast
+        if fast is not None and left_value_obj.t is fast[0] and right_value_obj.t is fast[0]:
+            return fast[1](left_value_obj.v, right_value_obj.v)
+        return self.__apply_node_op(arith_ast, left_value_obj, right_value_obj)
 
+    def __eval_short_circuit(self, arith_ast):
+        left_value_obj = self.__eval_expr(arith_ast.op1)
+        result = Interpreter.__decided_by(arith_ast.elem_type, left_value_obj)
+        if result is not None:
+            return result
+        right_value_obj = self.__eval_expr(arith_ast.op2)
+        return self.__apply_op(arith_ast.elem_type, left_value_obj, right_value_obj)
 
+    # the result of && or || when its left operand decides it alone (false for &&, true
+    # for ||, ints counting as bools as in __bin_op_promotion), otherwise None. Any other
+    # type needs the right operand evaluated too, and then fails as it always did.
+    @staticmethod
+    def __decided_by(oper, left_value_obj):
+        t = left_value_obj.type()
+        if t == Type.BOOL:
+            truth = left_value_obj.value()
+        elif t == Type.INT:
+            truth = left_value_obj.value() != 0
+        else:
+            return None
+        if oper == "&&":
+            return None if truth else bool_value(False)
+        return bool_value(True) if truth else None
+
+    # Applies arith_ast's operator the general way, then specializes the node for the
+    # operand types just seen: when both are ints, or both strings, the engines call the
+    # FAST_OPS entry directly as long as the types stay the same, skipping promotion and
+    # the type checks (which can't change anything for those types). Any other pair of
+    # types clears the specialization.
+    def __apply_node_op(self, arith_ast, left_value_obj, right_value_obj):
+        result = self.__apply_op(arith_ast.elem_type, left_value_obj, right_value_obj)
+        t = left_value_obj.t
+        fast_op = None
+        if t is right_value_obj.t and t in Interpreter.FAST_OPS:
+            fast_op = Interpreter.FAST_OPS[t].get(arith_ast.elem_type)
+        arith_ast.fast = None if fast_op is None else (t, fast_op)
+        return result
+
+    def __apply_op(self, oper, left_value_obj, right_value_obj):
         left_value_obj, right_value_obj = self.__bin_op_promotion(
-            arith_ast.elem_type, left_value_obj, right_value_obj
+            oper, left_value_obj, right_value_obj
         )
 
         if not self.__compatible_types(
-            arith_ast.elem_type, left_value_obj, right_value_obj
+            oper, left_value_obj, right_value_obj
         ):
             super().error(
                 ErrorType.TYPE_ERROR,
-                f"Incompatible types for {arith_ast.elem_type} operation",
+                f"Incompatible types for {oper} operation",
             )
-        if arith_ast.elem_type not in self.op_to_lambda[left_value_obj.type()]:
+        if oper not in self.op_to_lambda[left_value_obj.type()]:
             super().error(
                 ErrorType.TYPE_ERROR,
-                f"Incompatible operator {arith_ast.elem_type} for type {left_value_obj.type()}",
+                f"Incompatible operator {oper} for type {left_value_obj.type()}",
             )
-        f = self.op_to_lambda[left_value_obj.type()][arith_ast.elem_type]
+        f = self.op_to_lambda[left_value_obj.type()][oper]
         return f(left_value_obj, right_value_obj)
 
     # bool and int, int and bool for and/or/==/!= -> coerce int to bool
@@ -360,11 +663,11 @@ class Interpreter(InterpreterBase):
 
     @staticmethod
     def __int_to_bool(value):
-        return Value(Type.BOOL, value.value() != 0)
+        return bool_value(value.value() != 0)
 
     @staticmethod
     def __bool_to_int(value):
-        return Value(Type.INT, 1 if value.value() else 0)
+        return int_value(1 if value.value() else 0)
 
     def __compatible_types(self, oper, obj1, obj2):
         # DOCUMENT: allow comparisons ==/!= of anything against anything
@@ -374,113 +677,71 @@ class Interpreter(InterpreterBase):
 
     def __eval_unary(self, arith_ast, t, f):
         value_obj = self.__eval_expr(arith_ast.get("op1"))
-        value_obj = self.__unary_op_promotion(arith_ast.elem_type, value_obj)
+        return self.__apply_unary(arith_ast.elem_type, value_obj, t, f)
+
+    def __apply_unary(self, oper, value_obj, t, f):
+        value_obj = self.__unary_op_promotion(oper, value_obj)
 
         if value_obj.type() != t:
             super().error(
                 ErrorType.TYPE_ERROR,
-                f"Incompatible type for {arith_ast.elem_type} operation",
+                f"Incompatible type for {oper} operation",
             )
-        return Value(t, f(value_obj.value()))
+        return f(value_obj.value())
 
     def __setup_ops(self):
         self.op_to_lambda = {}
-        # set up operations on integers
-        self.op_to_lambda[Type.INT] = {}
-        self.op_to_lambda[Type.INT]["+"] = lambda x, y: Value(
-            x.type(), x.value() + y.value()
-        )
-        self.op_to_lambda[Type.INT]["-"] = lambda x, y: Value(
-            x.type(), x.value() - y.value()
-        )
-        self.op_to_lambda[Type.INT]["*"] = lambda x, y: Value(
-            x.type(), x.value() * y.value()
-        )
-        self.op_to_lambda[Type.INT]["/"] = lambda x, y: Value(
-            x.type(), x.value() // y.value()
-        )
-        self.op_to_lambda[Type.INT]["=="] = lambda x, y: Value(
-            Type.BOOL, x.value() == y.value()
-        )
-        self.op_to_lambda[Type.INT]["!="] = lambda x, y: Value(
-            Type.BOOL, x.value() != y.value()
-        )
-        self.op_to_lambda[Type.INT]["<"] = lambda x, y: Value(
-            Type.BOOL, x.value() < y.value()
-        )
-        self.op_to_lambda[Type.INT]["<="] = lambda x, y: Value(
-            Type.BOOL, x.value() <= y.value()
-        )
-        self.op_to_lambda[Type.INT][">"] = lambda x, y: Value(
-            Type.BOOL, x.value() > y.value()
-        )
-        self.op_to_lambda[Type.INT][">="] = lambda x, y: Value(
-            Type.BOOL, x.value() >= y.value()
-        )
-        #  set up operations on strings
-        self.op_to_lambda[Type.STRING] = {}
-        self.op_to_lambda[Type.STRING]["+"] = lambda x, y: Value(
-            x.type(), x.value() + y.value()
-        )
-        self.op_to_lambda[Type.STRING]["=="] = lambda x, y: Value(
-            Type.BOOL, x.value() == y.value()
-        )
-        self.op_to_lambda[Type.STRING]["!="] = lambda x, y: Value(
-            Type.BOOL, x.value() != y.value()
-        )
+        # set up operations on integers and strings
+        for t, ops in Interpreter.FAST_OPS.items():
+            self.op_to_lambda[t] = {
+                oper: lambda x, y, f=f: f(x.value(), y.value()) for oper, f in ops.items()
+            }
         #  set up operations on bools
         self.op_to_lambda[Type.BOOL] = {}
-        self.op_to_lambda[Type.BOOL]["&&"] = lambda x, y: Value(
-            x.type(), x.value() and y.value()
+        self.op_to_lambda[Type.BOOL]["&&"] = lambda x, y: bool_value(
+            x.value() and y.value()
         )
-        self.op_to_lambda[Type.BOOL]["||"] = lambda x, y: Value(
-            x.type(), x.value() or y.value()
+        self.op_to_lambda[Type.BOOL]["||"] = lambda x, y: bool_value(
+            x.value() or y.value()
         )
-        self.op_to_lambda[Type.BOOL]["=="] = lambda x, y: Value(
-            Type.BOOL, x.value() == y.value()
+        self.op_to_lambda[Type.BOOL]["=="] = lambda x, y: bool_value(
+            x.value() == y.value()
         )
-        self.op_to_lambda[Type.BOOL]["!="] = lambda x, y: Value(
-            Type.BOOL, x.value() != y.value()
+        self.op_to_lambda[Type.BOOL]["!="] = lambda x, y: bool_value(
+            x.value() != y.value()
         )
 
         #  set up operations on nil
         self.op_to_lambda[Type.NIL] = {}
-        self.op_to_lambda[Type.NIL]["=="] = lambda x, y: Value(
-            Type.BOOL, x.value() == y.value()
+        self.op_to_lambda[Type.NIL]["=="] = lambda x, y: bool_value(
+            x.value() == y.value()
         )
-        self.op_to_lambda[Type.NIL]["!="] = lambda x, y: Value(
-            Type.BOOL, x.value() != y.value()
+        self.op_to_lambda[Type.NIL]["!="] = lambda x, y: bool_value(
+            x.value() != y.value()
         )
 
         #  set up operations on closures
         self.op_to_lambda[Type.CLOSURE] = {}
-        self.op_to_lambda[Type.CLOSURE]["=="] = lambda x, y: Value(
-            Type.BOOL, x.value() == y.value()
+        self.op_to_lambda[Type.CLOSURE]["=="] = lambda x, y: bool_value(
+            x.value() == y.value()
         )
-        self.op_to_lambda[Type.CLOSURE]["!="] = lambda x, y: Value(
-            Type.BOOL, x.value() != y.value()
+        self.op_to_lambda[Type.CLOSURE]["!="] = lambda x, y: bool_value(
+            x.value() != y.value()
         )
 
         #  set up operations on objects
         # ADDED
         self.op_to_lambda[Type.OBJECT] = {}
-        self.op_to_lambda[Type.OBJECT]["=="] = lambda x, y: Value(
-            Type.BOOL, x.value() == y.value()
+        self.op_to_lambda[Type.OBJECT]["=="] = lambda x, y: bool_value(
+            x.value() == y.value()
         )
-        self.op_to_lambda[Type.OBJECT]["!="] = lambda x, y: Value(
-            Type.BOOL, x.value() != y.value()
+        self.op_to_lambda[Type.OBJECT]["!="] = lambda x, y: bool_value(
+            x.value() != y.value()
         )
 
     def __do_if(self, if_ast):
         cond_ast = if_ast.get("condition")
-        result = self.__eval_expr(cond_ast)
-        if result.type() == Type.INT:
-            result = Interpreter.__int_to_bool(result)
-        if result.type() != Type.BOOL:
-            super().error(
-                ErrorType.TYPE_ERROR,
-                "Incompatible type for if condition",
-            )
+        result = self.__check_condition(self.__eval_expr(cond_ast), Interpreter.IF_DEF)
         if result.value():
             statements = if_ast.get("statements")
             status, return_val = self.__run_statements(statements)
@@ -497,39 +758,444 @@ class Interpreter(InterpreterBase):
         cond_ast = while_ast.get("condition")
         run_while = Interpreter.TRUE_VALUE
         while run_while.value():
-            run_while = self.__eval_expr(cond_ast)
-            if run_while.type() == Type.INT:
-                run_while = Interpreter.__int_to_bool(run_while)
-            if run_while.type() != Type.BOOL:
-                super().error(
-                    ErrorType.TYPE_ERROR,
-                    "Incompatible type for while condition",
-                )
+            run_while = self.__check_condition(
+                self.__eval_expr(cond_ast), Interpreter.WHILE_DEF
+            )
             if run_while.value():
                 statements = while_ast.get("statements")
                 status, return_val = self.__run_statements(statements)
-                if status == ExecStatus.RETURN:
+                if status != ExecStatus.CONTINUE:
                     return status, return_val
 
         return (ExecStatus.CONTINUE, Interpreter.NIL_VALUE)
 
+    # coerces an if/while condition to a bool
+    def __check_condition(self, result, statement_type):
+        if result.type() == Type.INT:
+            result = Interpreter.__int_to_bool(result)
+        if result.type() != Type.BOOL:
+            super().error(
+                ErrorType.TYPE_ERROR,
+                f"Incompatible type for {statement_type} condition",
+            )
+        return result
+
     def __do_return(self, return_ast):
         expr_ast = return_ast.get("expression")
         if expr_ast is None:
             return (ExecStatus.RETURN, Interpreter.NIL_VALUE)
-        value_obj = copy.deepcopy(self.__eval_expr(expr_ast))
+        if self.tail_calls and (
+            expr_ast.elem_type == InterpreterBase.MCALL_DEF
+            or (
+                expr_ast.elem_type == InterpreterBase.FCALL_DEF
+                and expr_ast.get("name") not in Interpreter.BUILTIN_FUNCS
+            )
+        ):
+            return self.__prepare_tail_call(expr_ast)
+        value_obj = copy_value(self.__eval_expr(expr_ast))
         return (ExecStatus.RETURN, value_obj)
 
 
     # ADDED
-    def __parse_obj_with_field(self, var_name):
-        if "." in var_name:
-            obj_name, member_name = var_name.split('.')[0], var_name.split('.')[1]
-        if self.env.get(obj_name) == None:
+    # the Value of the object a field_ref or method call goes through, found by the
+    # slot resolve_slots() gave the node
+    def __get_object(self, obj_name, slot):
+        obj_value = self.env.get_slot(slot)
+        if obj_value is None:
             super().error(ErrorType.NAME_ERROR, f"Object {obj_name} not found")
-        if self.env.get(obj_name).type() != Type.OBJECT:
+        if obj_value.type() != Type.OBJECT:
             super().error(ErrorType.TYPE_ERROR, f"Variable {obj_name} is not an object")
-        return obj_name, member_name
+        return obj_value
+
+    # bytecode engine: runs functions compiled by bytecode_v4 in a single dispatch
+    # loop, keeping Brewin call frames on a list instead of the Python stack
+    def __code_for(self, func_ast):
+        code = self.code_cache.get(func_ast)
+        if code is None:
+            code = compile_function(func_ast, self.short_circuit)
+            self.code_cache[func_ast] = code
+        return code
+
+    def __run_vm(self, main_closure):
+        env = self.env
+        stack = []
+        frames = []
+        code = self.__code_for(main_closure.func_ast)
+        ops, args = code.ops, code.args
+        pc = 0
+        while True:
+            op = ops[pc]
+            arg = args[pc]
+            pc += 1
+            if op == LOAD_NAME:
+                stack.append(self.__eval_name(arg))
+            elif op == LOAD_FIELD:
+                stack.append(self.__eval_field(arg))
+            elif op == LOAD_LITERAL:
+                stack.append(Value(arg[0], arg[1]))
+            elif op == LOAD_CONST:
+                stack.append(arg)
+            elif op == BINARY_OP:
+                right_value_obj = stack.pop()
+                left_value_obj = stack[-1]
+                fast = arg.fast
+                if fast is not None and left_value_obj.t is fast[0] and right_value_obj.t is fast[0]:
+                    stack[-1] = fast[1](left_value_obj.v, right_value_obj.v)
+                else:
+                    stack[-1] = self.__apply_node_op(arg, left_value_obj, right_value_obj)
+            elif op == ASSIGN:
+                self.__assign_value(arg, stack.pop())
+            elif op == ASSIGN_COPY:
+                src_value_obj = stack.pop()
+                if src_value_obj.type() != Type.OBJECT:
+                    src_value_obj = copy.copy(src_value_obj)
+                self.__assign_value(arg, src_value_obj)
+            elif op == JUMP_IF_FALSE:
+                if not self.__check_condition(stack.pop(), arg[1]).value():
+                    pc = arg[0]
+            elif op == JUMP:
+                pc = arg
+            elif op == PUSH_SCOPE:
+                env.push()
+            elif op == POP_SCOPE:
+                env.pop()
+            elif op == RESOLVE_FUNC:
+                target_closure, new_env = self.__resolve_func(arg)
+                self.__check_arg_count(target_closure.func_ast, arg)
+                stack.append((target_closure, new_env))
+            elif op == RESOLVE_METHOD:
+                target_closure, new_env = self.__resolve_method(arg)
+                self.__check_arg_count(target_closure.func_ast, arg)
+                stack.append((target_closure, new_env))
+            elif op == BIND_ARG:
+                result = stack.pop()
+                target_closure, new_env = stack[-1]
+                formal_ast = target_closure.func_ast.get("args")[arg]
+                new_env[formal_ast.get("name")] = Interpreter.__bind_arg(formal_ast, result)
+            elif op == CALL:
+                target_closure, new_env = stack.pop()
+                env.push(new_env)
+                frames.append((ops, args, pc))
+                code = self.__code_for(target_closure.func_ast)
+                ops, args = code.ops, code.args
+                pc = 0
+            elif op == RETURN or op == RETURN_NIL:
+                if op == RETURN:
+                    return_val = copy_value(stack.pop())
+                else:
+                    return_val = Interpreter.NIL_VALUE
+                for _ in range(arg):
+                    env.pop()
+                if not frames:
+                    return
+                env.pop()  # the call's parameters and captured variables
+                ops, args, pc = frames.pop()
+                stack.append(return_val)
+            elif op == POP:
+                stack.pop()
+            elif op == UNARY_OP:
+                t, f = Interpreter.UNARY_OPS[arg]
+                stack[-1] = self.__apply_unary(arg, stack[-1], t, f)
+            elif op == LOAD_NIL:
+                stack.append(Interpreter.NIL_VALUE)
+            elif op == MAKE_CLOSURE:
+                stack.append(Value(Type.CLOSURE, Closure(arg, env.capture(arg.captures))))
+            elif op == NEW_OBJECT:
+                stack.append(Value(Type.OBJECT, Object(self.epoch)))
+            elif op == JUMP_IF_DECIDED:
+                result = Interpreter.__decided_by(arg[1], stack[-1])
+                if result is not None:
+                    stack[-1] = result
+                    pc = arg[0]
+            elif op == JUMP_IF_OBJECT:
+                if stack[-1].type() == Type.OBJECT:
+                    pc = arg
+                else:
+                    stack.pop()
+            elif op == COPY:
+                stack[-1] = copy.copy(stack[-1])
+            elif op == PRINT_BEGIN:
+                stack.append("")
+            elif op == PRINT_ARG:
+                result = stack.pop()
+                stack[-1] = stack[-1] + get_printable(result)
+            elif op == PRINT_END:
+                super().output(stack.pop())
+                stack.append(Interpreter.NIL_VALUE)
+            elif op == OUTPUT_VALUE:
+                super().output(get_printable(stack.pop()))
+            elif op == INPUT_INT:
+                if arg > 1:
+                    super().error(
+                        ErrorType.NAME_ERROR, "No inputi() function that takes > 1 parameter"
+                    )
+                stack.append(int_value(int(super().get_input())))
+
+
+    # closure engine: every AST node is compiled once into a Python closure, so running
+    # it no longer dispatches on elem_type or looks up the node's fields. A compiled
+    # statement returns None to continue, the Value being returned, or a TailCall.
+    def __compiled_body(self, func_ast):
+        body = self.compiled_bodies.get(func_ast)
+        if body is None:
+            body = self.__compile_block(func_ast.get("statements"))
+            self.compiled_bodies[func_ast] = body
+        return body
+
+    def __compile_block(self, statements):
+        env = self.env
+        compiled = []
+        for statement in statements:
+            compiled_statement = self.__compile_statement(statement)
+            if compiled_statement is not None:
+                compiled.append(compiled_statement)
+
+        def run_block():
+            env.push()
+            for statement in compiled:
+                return_val = statement()
+                if return_val is not None:
+                    # a pending tail call still sees this scope; the call loop pops it
+                    if type(return_val) is not TailCall:
+                        env.pop()
+                    return return_val
+            env.pop()
+            return None
+
+        return run_block
+
+    def __compile_statement(self, statement):
+        kind = statement.elem_type
+        if kind == InterpreterBase.FCALL_DEF or kind == InterpreterBase.MCALL_DEF:
+            call = self.__compile_expr(statement)
+
+            def run_call():
+                call()
+
+            return run_call
+        if kind == "=":
+            return self.__compile_assign(statement)
+        if kind == InterpreterBase.RETURN_DEF:
+            return self.__compile_return(statement)
+        if kind == InterpreterBase.IF_DEF:
+            return self.__compile_if(statement)
+        if kind == InterpreterBase.WHILE_DEF:
+            return self.__compile_while(statement)
+        # any other expression statement is never evaluated by the tree walker
+        return None
+
+    def __compile_assign(self, assign_ast):
+        expr_ast = assign_ast.get("expression")
+        expr = self.__compile_expr(expr_ast)
+        assign_value = self.__assign_value
+
+        if expr_ast.elem_type == FIELD_REF_DEF:
+            def run_assign():
+                assign_value(assign_ast, expr())
+        elif has_calls(expr_ast):
+            # like the tree walker, evaluate a non-object right hand side twice
+            def run_assign():
+                src_value_obj = expr()
+                if src_value_obj.type() != Type.OBJECT:
+                    src_value_obj = copy.copy(expr())
+                assign_value(assign_ast, src_value_obj)
+        else:
+            def run_assign():
+                src_value_obj = expr()
+                if src_value_obj.type() != Type.OBJECT:
+                    src_value_obj = copy.copy(src_value_obj)
+                assign_value(assign_ast, src_value_obj)
+
+        return run_assign
+
+    def __compile_return(self, return_ast):
+        expr_ast = return_ast.get("expression")
+        if expr_ast is None:
+            return lambda: Interpreter.NIL_VALUE
+        if expr_ast.elem_type == InterpreterBase.MCALL_DEF:
+            prepare = self.__compile_prepare(expr_ast, self.__resolve_method)
+            return lambda: TailCall(*prepare())
+        if (
+            expr_ast.elem_type == InterpreterBase.FCALL_DEF
+            and expr_ast.get("name") not in Interpreter.BUILTIN_FUNCS
+        ):
+            prepare = self.__compile_prepare(expr_ast, self.__resolve_func)
+            return lambda: TailCall(*prepare())
+        expr = self.__compile_expr(expr_ast)
+        return lambda: copy_value(expr())
+
+    def __compile_if(self, if_ast):
+        condition = self.__compile_expr(if_ast.get("condition"))
+        statements = self.__compile_block(if_ast.get("statements"))
+        else_statements = None
+        if if_ast.get("else_statements") is not None:
+            else_statements = self.__compile_block(if_ast.get("else_statements"))
+        check_condition = self.__check_condition
+
+        def run_if():
+            if check_condition(condition(), Interpreter.IF_DEF).value():
+                return statements()
+            if else_statements is not None:
+                return else_statements()
+            return None
+
+        return run_if
+
+    def __compile_while(self, while_ast):
+        condition = self.__compile_expr(while_ast.get("condition"))
+        statements = self.__compile_block(while_ast.get("statements"))
+        check_condition = self.__check_condition
+
+        def run_while():
+            while check_condition(condition(), Interpreter.WHILE_DEF).value():
+                return_val = statements()
+                if return_val is not None:
+                    return return_val
+            return None
+
+        return run_while
+
+    def __compile_expr(self, expr_ast):
+        kind = expr_ast.elem_type
+        if kind == InterpreterBase.VAR_DEF:
+            eval_name = self.__eval_name
+            return lambda: eval_name(expr_ast)
+        if kind == FIELD_REF_DEF:
+            eval_field = self.__eval_field
+            return lambda: eval_field(expr_ast)
+        if kind in Interpreter.LITERAL_TYPES:
+            t, val = Interpreter.LITERAL_TYPES[kind], expr_ast.get("val")
+            value = new_value(t, val)
+            if is_interned(value):
+                return lambda: value
+            return lambda: Value(t, val)
+        if self.short_circuit and (kind == "&&" or kind == "||"):
+            op1 = self.__compile_expr(expr_ast.get("op1"))
+            op2 = self.__compile_expr(expr_ast.get("op2"))
+            decided_by, apply_op = Interpreter.__decided_by, self.__apply_op
+
+            def run_short_circuit():
+                left_value_obj = op1()
+                result = decided_by(kind, left_value_obj)
+                if result is not None:
+                    return result
+                return apply_op(kind, left_value_obj, op2())
+
+            return run_short_circuit
+        if kind in Interpreter.BIN_OPS:
+            op1 = self.__compile_expr(expr_ast.get("op1"))
+            op2 = self.__compile_expr(expr_ast.get("op2"))
+            apply_node_op = self.__apply_node_op
+
+            def run_op():
+                left_value_obj, right_value_obj = op1(), op2()
+                fast = expr_ast.fast
+                if fast is not None and left_value_obj.t is fast[0] and right_value_obj.t is fast[0]:
+                    return fast[1](left_value_obj.v, right_value_obj.v)
+                return apply_node_op(expr_ast, left_value_obj, right_value_obj)
+
+            return run_op
+        if kind == InterpreterBase.FCALL_DEF:
+            return self.__compile_fcall(expr_ast)
+        if kind == InterpreterBase.MCALL_DEF:
+            return self.__compile_call(expr_ast, self.__resolve_method)
+        if kind in Interpreter.UNARY_OPS:
+            op1 = self.__compile_expr(expr_ast.get("op1"))
+            t, f = Interpreter.UNARY_OPS[kind]
+            apply_unary = self.__apply_unary
+            return lambda: apply_unary(kind, op1(), t, f)
+        if kind == InterpreterBase.NIL_DEF:
+            return lambda: Interpreter.NIL_VALUE
+        if kind == InterpreterBase.LAMBDA_DEF:
+            env, captures = self.env, expr_ast.captures
+            return lambda: Value(Type.CLOSURE, Closure(expr_ast, env.capture(captures)))
+        if kind == InterpreterBase.OBJ_DEF:
+            epoch = self.epoch
+            return lambda: Value(Type.OBJECT, Object(epoch))
+        return lambda: None
+
+    def __compile_fcall(self, call_ast):
+        func_name = call_ast.get("name")
+        if func_name == "print":
+            return self.__compile_print(call_ast)
+        if func_name == "inputi":
+            return self.__compile_input(call_ast)
+        return self.__compile_call(call_ast, self.__resolve_func)
+
+    # returns a function that resolves the call and binds its arguments, giving back the
+    # closure to run and its environment
+    def __compile_prepare(self, call_ast, resolve):
+        args = [self.__compile_expr(arg) for arg in call_ast.get("args")]
+        check_arg_count = self.__check_arg_count
+        bind_arg = Interpreter.__bind_arg
+
+        def prepare():
+            target_closure, new_env = resolve(call_ast)
+            target_ast = target_closure.func_ast
+            check_arg_count(target_ast, call_ast)
+            for formal_ast, arg in zip(target_ast.get("args"), args):
+                new_env[formal_ast.get("name")] = bind_arg(formal_ast, arg())
+            return target_closure, new_env
+
+        return prepare
+
+    def __compile_call(self, call_ast, resolve):
+        prepare = self.__compile_prepare(call_ast, resolve)
+        run_compiled = self.__run_compiled
+
+        def call():
+            return run_compiled(*prepare())
+
+        return call
+
+    # runs tail calls in a loop the same way as __run_closure does for the tree walker
+    def __run_compiled(self, target_closure, new_env):
+        env = self.env
+        base = frame_base = env.depth()
+        tail_called = False
+        while True:
+            env.push(new_env)
+            return_val = self.__compiled_body(target_closure.func_ast)()
+            if type(return_val) is not TailCall:
+                break
+            target_closure, new_env = return_val.closure, return_val.env
+            tail_called = True
+            if env.hidden_by(frame_base, new_env):
+                env.pop_to(frame_base)
+            else:
+                frame_base = env.depth()
+        env.pop_to(base)
+        if return_val is None:
+            return_val = Interpreter.NIL_VALUE
+        if tail_called:
+            return copy_value(return_val)
+        return return_val
+
+    def __compile_print(self, call_ast):
+        args = [self.__compile_expr(arg) for arg in call_ast.get("args")]
+        output = self.output
+
+        def call_print():
+            printed = ""
+            for arg in args:
+                printed = printed + get_printable(arg())
+            output(printed)
+            return Interpreter.NIL_VALUE
+
+        return call_print
+
+    def __compile_input(self, call_ast):
+        args = [self.__compile_expr(arg) for arg in call_ast.get("args")]
+        output, error, get_input = self.output, self.error, self.get_input
+
+        def call_input():
+            if len(args) == 1:
+                output(get_printable(args[0]()))
+            elif len(args) > 1:
+                error(ErrorType.NAME_ERROR, "No inputi() function that takes > 1 parameter")
+            return int_value(int(get_input()))
+
+        return call_input
 
 
 if __name__ == "__main__":
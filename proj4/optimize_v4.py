@@ -0,0 +1,101 @@
+# Constant folding for interpreterv4, done on a program's AST each time it runs.
+# An operator whose operands are all literals becomes a literal of its result, and an
+# if or while whose condition is a literal loses the arm that can never run. Results are
+# computed by the interpreter's own evaluator, so the int/bool coercions come out exactly
+# as they would at run time. An expression whose evaluation fails (a type error, say, or
+# a division by zero) is left as it is, to fail when and if the program reaches it.
+import copy
+import operator
+
+from element import BinaryOp, Element, If, Literal, UnaryOp, walk
+from intbase import InterpreterBase
+from type_valuev3 import Type
+
+CONSTANT_NODES = {
+    InterpreterBase.INT_DEF,
+    InterpreterBase.STRING_DEF,
+    InterpreterBase.BOOL_DEF,
+    InterpreterBase.NIL_DEF,
+}
+LITERAL_DEFS = {
+    Type.INT: InterpreterBase.INT_DEF,
+    Type.STRING: InterpreterBase.STRING_DEF,
+    Type.BOOL: InterpreterBase.BOOL_DEF,
+}
+
+
+# Returns program_ast folded, without changing it: the AST can be shared (through
+# brewcache, say) with interpreters that fold differently, or not at all. Nodes with
+# something folded under them are copied, and the rest are shared with program_ast.
+# evaluate(expr_ast) returns the Value of an expression made only of literals and
+# operators, or None if evaluating it is an error.
+def fold_constants(program_ast, evaluate):
+    folded = {}  # id of a node -> its copy with the folded fields
+    # reversed, so a node's operands are folded before the node itself
+    for node in reversed(list(walk(program_ast))):
+        changes = {}
+        for field in node.fields:
+            value = getattr(node, field)
+            if isinstance(value, Element):
+                new_value = folded.get(id(value), value)
+                if isinstance(new_value, (BinaryOp, UnaryOp)):
+                    new_value = _fold_expr(new_value, evaluate)
+            elif isinstance(value, list):
+                new_value = _fold_list([folded.get(id(item), item) for item in value], evaluate)
+                if len(new_value) == len(value) and all(map(operator.is_, new_value, value)):
+                    new_value = value
+            else:
+                continue
+            if new_value is not value:
+                changes[field] = new_value
+        if changes:
+            node_copy = copy.copy(node)
+            for field, new_value in changes.items():
+                setattr(node_copy, field, new_value)
+            folded[id(node)] = node_copy
+    return folded.get(id(program_ast), program_ast)
+
+
+def _fold_expr(expr_ast, evaluate):
+    if expr_ast.op1.elem_type not in CONSTANT_NODES:
+        return expr_ast
+    if isinstance(expr_ast, BinaryOp) and expr_ast.op2.elem_type not in CONSTANT_NODES:
+        return expr_ast
+    value = evaluate(expr_ast)
+    if value is None or value.type() not in LITERAL_DEFS:
+        return expr_ast
+    return Literal(LITERAL_DEFS[value.type()], value.value())
+
+
+# folds the expressions in a list of call arguments, or drops the dead arms of the ifs
+# and whiles in a list of statements
+def _fold_list(items, evaluate):
+    folded = []
+    for item in items:
+        if isinstance(item, (BinaryOp, UnaryOp)):
+            item = _fold_expr(item, evaluate)
+        elif item.elem_type == InterpreterBase.IF_DEF:
+            condition = _constant_condition(item.condition)
+            if condition is True:
+                if item.else_statements is not None:
+                    item = If(item.condition, item.statements, None)
+            elif condition is False:
+                if item.else_statements is None:
+                    continue
+                # still a block of its own, so variables it creates go away after it
+                item = If(Literal(InterpreterBase.BOOL_DEF, True), item.else_statements, None)
+        elif item.elem_type == InterpreterBase.WHILE_DEF:
+            if _constant_condition(item.condition) is False:
+                continue
+        folded.append(item)
+    return folded
+
+
+# True or False for a literal condition that would pass the interpreter's condition
+# check, otherwise None (any other literal is a type error at run time)
+def _constant_condition(condition_ast):
+    if condition_ast.elem_type == InterpreterBase.BOOL_DEF:
+        return condition_ast.val
+    if condition_ast.elem_type == InterpreterBase.INT_DEF:
+        return condition_ast.val != 0
+    return None
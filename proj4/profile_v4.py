@@ -0,0 +1,67 @@
+# Opt-in profiler for interpreterv4's tree engine. Pass a Profiler to the Interpreter
+# and it records, per Brewin function, how often it was called and its self and total
+# time, plus how many statements of each kind ran. The Interpreter only routes calls
+# through the profiler when one is given, so leaving it off costs nothing.
+import time
+
+
+class Profiler:
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.calls = {}  # function name -> # of calls
+        self.total_time = {}  # function name -> seconds, not counting recursive re-entry twice
+        self.self_time = {}  # function name -> seconds spent outside the functions it called
+        self.statements = {}  # statement type (fcall, mcall, =, if, while, return) -> count
+        self.stacks = {}  # "main;f;g" -> seconds of self time spent in that call stack
+        self.frames = []  # [name, start time, time spent in callees] per active call
+        self.active = {}  # function name -> # of its calls currently on the stack
+
+    # runs func(*args) as a call of the Brewin function called name
+    def call(self, name, func, *args):
+        self.__enter(name)
+        try:
+            return func(*args)
+        finally:
+            self.__exit()
+
+    def count_statement(self, statement):
+        kind = statement.elem_type
+        self.statements[kind] = self.statements.get(kind, 0) + 1
+
+    def __enter(self, name):
+        self.calls[name] = self.calls.get(name, 0) + 1
+        self.active[name] = self.active.get(name, 0) + 1
+        self.frames.append([name, self.clock(), 0.0])
+
+    def __exit(self):
+        stack_key = ";".join(frame[0] for frame in self.frames)
+        name, start, callee_time = self.frames.pop()
+        elapsed = self.clock() - start
+        self.self_time[name] = self.self_time.get(name, 0.0) + elapsed - callee_time
+        self.stacks[stack_key] = self.stacks.get(stack_key, 0.0) + elapsed - callee_time
+        self.active[name] -= 1
+        if self.active[name] == 0:
+            self.total_time[name] = self.total_time.get(name, 0.0) + elapsed
+        if self.frames:
+            self.frames[-1][2] += elapsed
+
+    # a table of functions by self time, then the statement counts
+    def report(self):
+        lines = [f"{'function':24} {'calls':>8} {'self (s)':>10} {'total (s)':>10}"]
+        for name in sorted(self.calls, key=lambda name: -self.self_time.get(name, 0.0)):
+            lines.append(
+                f"{name:24} {self.calls[name]:8} {self.self_time.get(name, 0.0):10.4f} "
+                f"{self.total_time.get(name, 0.0):10.4f}"
+            )
+        lines.append("")
+        lines.append(f"{'statement':24} {'count':>8}")
+        for kind, count in sorted(self.statements.items(), key=lambda item: -item[1]):
+            lines.append(f"{kind:24} {count:8}")
+        return "\n".join(lines)
+
+    # writes "main;f;g <microseconds>" lines, the collapsed stack format read by
+    # flamegraph.pl and speedscope
+    def dump_collapsed(self, path):
+        with open(path, "w") as collapsed_file:
+            for stack_key, seconds in sorted(self.stacks.items()):
+                collapsed_file.write(f"{stack_key} {round(seconds * 1e6)}\n")
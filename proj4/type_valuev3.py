@@ -20,11 +20,31 @@ class Closure:
         self.func_ast = func_ast
         self.type = Type.CLOSURE
 
-class Object:
+# Counts the changes that can make a cached prototype lookup stale (see Object). Each
+# interpreter run has its own, shared by every object the run makes, so nothing one run
+# caches is taken for another's.
+class Epoch:
+    __slots__ = ("count",)
+
     def __init__(self):
+        self.count = 0
+
+    # shared by an object and its copies
+    def __deepcopy__(self, memo):
+        return self
+
+
+class Object:
+    # epoch moves whenever an object that has been searched as a prototype gains a
+    # member, any object's proto is set, or a variable holding an object (which may be
+    # some object's proto) is overwritten. Lookups cached under an older count that went
+    # past their object's own members are stale.
+    def __init__(self, epoch):
         self.members = {}
         self.proto = None
         self.type = Type.OBJECT
+        self.epoch = epoch
+        self.is_proto = False
 
     def ret_member(self, member):
         if member in self.members:
@@ -38,10 +58,24 @@ class Object:
                     next_proto = next_proto.value().proto
 
         return None
+
+    # the object whose members hold member: this one or one along its proto chain, or
+    # None. Every prototype searched is marked, so that adding members to it later
+    # invalidates lookups cached from this search.
+    def find_holder(self, member):
+        holder = self
+        while member not in holder.members:
+            if holder.proto is None:
+                return None
+            holder = holder.proto.value()
+            holder.is_proto = True
+        return holder
     
     def push_member(self, member, value):
         if member not in self.members:
             self.members[member] = ""
+            if self.is_proto:
+                self.epoch.count += 1
         
         if value.type() == Type.CLOSURE:
             self.members[member] = value
@@ -54,11 +88,10 @@ class Object:
             self.proto = None
         else:
             self.proto = new_proto
+        self.epoch.count += 1
 
         
 
-
-
 # Create a field called self.proto.
 # Self.proto can only point to one additional class.
 # That class can only point to one additional class, and so forth.
@@ -67,6 +100,8 @@ class Object:
 
 # Represents a value, which has a type and its value
 class Value:
+    __slots__ = ("t", "v")
+
     def __init__(self, t, v=None):
         self.t = t
         self.v = v
@@ -78,9 +113,15 @@ class Value:
         return self.t
 
     def set(self, other):
+        if self.t == Type.OBJECT:
+            # this Value may be an object's proto
+            self.v.epoch.count += 1
         self.t = other.t
         self.v = other.v
 
+    def __copy__(self):
+        return Value(self.t, self.v)
+
 
 def create_value(val):
     if val == InterpreterBase.TRUE_DEF:
@@ -97,6 +138,52 @@ def create_value(val):
         raise ValueError("Unknown value type")
 
 
+# Shared, preallocated Values for nil, true, false and small ints, so evaluating
+# literals and operators doesn't allocate a new Value each time. A shared Value must
+# never be stored as a variable: anything that binds a Value to a name without
+# copying it (ref parameters) has to check is_interned() first.
+NIL = create_value(InterpreterBase.NIL_DEF)  # the same nil the interpreters have always used
+TRUE = Value(Type.BOOL, True)
+FALSE = Value(Type.BOOL, False)
+SMALL_INT_MIN = -5
+SMALL_INT_MAX = 256
+SMALL_INTS = tuple(Value(Type.INT, i) for i in range(SMALL_INT_MIN, SMALL_INT_MAX + 1))
+
+
+def int_value(i):
+    if SMALL_INT_MIN <= i <= SMALL_INT_MAX:
+        return SMALL_INTS[i - SMALL_INT_MIN]
+    return Value(Type.INT, i)
+
+
+def bool_value(b):
+    return TRUE if b else FALSE
+
+
+# a Value of type t holding v, shared if there's an interned one for it
+def new_value(t, v):
+    if t == Type.INT:
+        return int_value(v)
+    if t == Type.BOOL:
+        return bool_value(v)
+    return Value(t, v)
+
+
+def is_interned(val):
+    if val.t == Type.INT:
+        return SMALL_INT_MIN <= val.v <= SMALL_INT_MAX and SMALL_INTS[val.v - SMALL_INT_MIN] is val
+    return val is NIL or val is TRUE or val is FALSE
+
+
+# copy of a value for passing or returning it by value. Primitives can't be changed
+# through a copy, so they only need a fresh Value cell; objects and closures can, so
+# they're deep copied.
+def copy_value(val):
+    if val.t == Type.OBJECT or val.t == Type.CLOSURE:
+        return copy.deepcopy(val)
+    return Value(val.t, val.v)
+
+
 def get_printable(val):
     if val.type() == Type.INT:
         return str(val.value())